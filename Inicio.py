@@ -5,12 +5,32 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
-from sodapy import Socrata
+import json
+import time
 
 # Importar módulos locales
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import asignar_tipos_datos, DataCleaner
+from utils import COLUMNAS_AGRUPACION, validar_rangos
+from carga_socrata import construir_consulta_soql, consulta_variables_analisis
+from cache_ingesta import CACHE_INGESTA, clave_ingesta, hash_contenido
+from carga_archivos import listar_hojas_excel, leer_encabezado_excel
+from ingesta import analizar_archivo_fuera_de_memoria, ingerir_archivo, ingerir_socrata
+from fuera_de_memoria import TAMANO_MINIMO_FUERA_DE_MEMORIA
+from calidad_datos import generar_recomendaciones
+from limpieza import PASOS_LIMPIEZA, PASOS_POR_DEFECTO
+from tareas import GESTOR_TAREAS, TareaIngesta
+from comparacion import comparar_dataframes, resumen_diferencias
+
+# Copy-on-Write para todo el proceso: las copias superficiales y los subconjuntos
+# comparten memoria hasta que alguien los modifica, así los DataFrames de la sesión
+# (df_original, df, caché de ingesta, agente de datos) se comparten sin copias
+# defensivas. Se activa aquí porque todas las páginas corren en el mismo proceso y
+# los datos de la sesión solo se cargan desde esta página.
+pd.set_option('mode.copy_on_write', True)
+
+# Segundos entre actualizaciones de la página mientras hay cargas en segundo plano
+INTERVALO_SONDEO = 0.7
 
 # Configuración de la página
 st.set_page_config(
@@ -39,17 +59,122 @@ if 'agent' not in st.session_state:
     st.session_state.agent = None
 if 'agent_config_key' not in st.session_state:
     st.session_state.agent_config_key = None
+if 'tareas_suscritas' not in st.session_state:
+    st.session_state.tareas_suscritas = set()
+if 'tarea_api' not in st.session_state:
+    st.session_state.tarea_api = None
+if 'diff_datos' not in st.session_state:
+    st.session_state.diff_datos = None
+if 'clave_datos' not in st.session_state:
+    # Identifica la carga de los DataFrames de la sesión (clave de ingesta o consulta a la API)
+    st.session_state.clave_datos = None
+if 'ingesta_archivo' not in st.session_state:
+    # (clave, resultado) de la última carga de archivo; comparte los DataFrames de la sesión
+    st.session_state.ingesta_archivo = None
+if 'analisis_por_bloques' not in st.session_state:
+    # (clave, resultado) del último archivo analizado sin cargarlo en memoria
+    st.session_state.analisis_por_bloques = None
+if 'estado_incremental' not in st.session_state:
+    # (clave, EstadoIncremental, último refresco) de df_original para agregarle filas
+    # nuevas desde la página de análisis; la clave parte de clave_datos
+    st.session_state.estado_incremental = None
+
+# Se activa si alguna carga en segundo plano sigue en curso en esta ejecución
+hay_tareas_en_curso = False
+
+
+def mostrar_memoria(memoria: tuple):
+    antes, despues = memoria
+    st.caption(
+        f"🗜️ Memoria en sesión: {antes / 1024**2:.1f} MB → {despues / 1024**2:.1f} MB "
+        f"({(1 - despues / antes) * 100 if antes else 0:.0f}% menos)"
+    )
+
+
+def hash_archivo_subido(uploaded_file) -> str:
+    """Hash del contenido del archivo; se calcula una sola vez por archivo subido en la sesión"""
+    file_id = getattr(uploaded_file, 'file_id', None)
+    guardado = st.session_state.get('hash_archivo')
+    if file_id is not None and guardado and guardado[0] == file_id:
+        return guardado[1]
+    hash_archivo = hash_contenido(uploaded_file.getvalue())
+    st.session_state.hash_archivo = (file_id, hash_archivo)
+    return hash_archivo
+
+
+def seguir_tarea(clave: str, lanzar) -> TareaIngesta:
+    """Suscribe la sesión a la tarea una sola vez (las re-ejecuciones solo la consultan)"""
+    if clave in st.session_state.tareas_suscritas:
+        tarea = GESTOR_TAREAS.obtener(clave)
+        if tarea is not None:
+            return tarea
+    tarea = lanzar()
+    st.session_state.tareas_suscritas.add(clave)
+    return tarea
+
+
+def olvidar_tarea(clave: str):
+    st.session_state.tareas_suscritas.discard(clave)
+    GESTOR_TAREAS.descartar(clave)
+
+
+def mostrar_tarea(tarea: TareaIngesta):
+    """Progreso de una carga en curso (filas, etapa, tiempos) con botón de cancelación"""
+    estado = tarea.instantanea()
+    fraccion = min(estado['filas'] / estado['total'], 1.0) if estado['total'] else 0.0
+    texto = f"⏳ {estado['etapa'] or 'en cola'} · {estado['filas']:,}"
+    if estado['total']:
+        texto += f" / {estado['total']:,}"
+    st.progress(fraccion, text=f"{texto} filas · {estado['segundos']:.0f} s")
+    if estado['tiempos']:
+        st.caption(" · ".join(f"{etapa}: {seg:.1f} s" for etapa, seg in estado['tiempos'].items()))
+    if st.button("⛔ Cancelar carga", key=f"cancelar_{tarea.clave}"):
+        GESTOR_TAREAS.cancelar(tarea.clave)
+        st.session_state.tareas_suscritas.discard(tarea.clave)
+        st.rerun()
+
+
+def mostrar_analisis_por_bloques(resultado: dict):
+    """Estadísticos e ICD de un archivo analizado por bloques (sus datos no quedan en la sesión)"""
+    icd = resultado['icd']
+    st.success(f"✅ Archivo analizado por bloques: {resultado['filas']:,} filas en {resultado['segundos']:.1f} s")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("🎯 ICD", f"{icd['emoji']} {icd['icd_total']:.1f} / 100", help=f"Calidad {icd['nivel_calidad']}")
+    with col2:
+        st.metric("📏 Filas", f"{resultado['filas']:,}")
+    with col3:
+        st.metric("🗑️ Filas duplicadas", f"{resultado['filas_duplicadas']:,}")
+    
+    st.dataframe(
+        pd.DataFrame({'Dimensión': list(icd['desglose']), 'Puntaje': list(icd['desglose'].values())}),
+        use_container_width=True, hide_index=True
+    )
+    for recomendacion in generar_recomendaciones(icd):
+        st.markdown(recomendacion)
+    
+    if resultado['estadisticos'] is not None:
+        st.markdown("#### 📊 Estadísticos")
+        st.dataframe(resultado['estadisticos'], use_container_width=True, hide_index=True)
+    st.caption(
+        "Cuantiles aproximados (KLL) y precisión por IQR con conteos exactos; "
+        "los datos no se cargan en la sesión, así que las demás páginas no los ven"
+    )
+    if os.path.exists(resultado['ruta_outliers']):
+        with open(resultado['ruta_outliers'], 'rb') as archivo_outliers:
+            st.download_button(
+                label="📥 Descargar filas con outliers (CSV)", data=archivo_outliers.read(),
+                file_name="outliers.csv", mime="text/csv", use_container_width=True
+            )
 
 
-def load_data_from_socrata(domain: str, dataset_id: str, limit: int, app_token: str = None) -> tuple:
-    """Carga datos desde Socrata API"""
-    try:
-        client = Socrata(domain, app_token, timeout=30)
-        results = client.get(dataset_id, limit=limit)
-        df = pd.DataFrame.from_records(results)
-        return df, None
-    except Exception as e:
-        return None, str(e)
+def mostrar_tarea_terminada(tarea: TareaIngesta) -> bool:
+    """Muestra cancelación o error; devuelve True si el usuario pidió reintentar"""
+    if tarea.estado == 'cancelada':
+        st.warning("⛔ Carga cancelada")
+    else:
+        st.error(f"❌ Error al cargar datos: {tarea.error}")
+    return st.button("🔁 Reintentar", key=f"reintentar_{tarea.clave}")
 
 
 # ============================================================================
@@ -72,17 +197,29 @@ with st.sidebar:
         
         with st.expander("ℹ️ Tipos de datos"):
             numeric_cols = st.session_state.df.select_dtypes(include=[np.number]).columns
-            text_cols = st.session_state.df.select_dtypes(include=['object']).columns
+            text_cols = st.session_state.df.select_dtypes(include=['object', 'category', 'string']).columns
             
             st.write(f"**Numéricas:** {len(numeric_cols)}")
             st.write(f"**Texto:** {len(text_cols)}")
             
             null_total = st.session_state.df.isnull().sum().sum()
             st.write(f"**Valores nulos:** {null_total}")
+            
+            fuera_de_rango = validar_rangos(st.session_state.df)
+            if fuera_de_rango:
+                st.write("**Fuera de rango (esquema):**")
+                for col, info in fuera_de_rango.items():
+                    minimo = '-∞' if info['minimo'] is None else info['minimo']
+                    maximo = '∞' if info['maximo'] is None else info['maximo']
+                    st.caption(f"{col}: {info['cantidad']} valores fuera de [{minimo}, {maximo}]")
         
         if st.button("🗑️ Limpiar todo", use_container_width=True):
             st.session_state.df = None
             st.session_state.df_original = None
+            st.session_state.ingesta_archivo = None
+            st.session_state.clave_datos = None
+            st.session_state.diff_datos = None
+            st.session_state.estado_incremental = None
             st.session_state.agent = None
             st.session_state.agent_config_key = None
             st.session_state.data_source = None
@@ -97,6 +234,11 @@ with st.sidebar:
 
 st.header("📁 Cargar Datos")
 
+modo_compacto = st.checkbox(
+    "🗜️ Modo compacto de memoria", value=False, key="modo_compacto",
+    help="Texto repetido como categorías, resto del texto en Arrow y mediciones en float32 (sin pérdida)"
+)
+
 subtab1, subtab2 = st.tabs(["📁 Archivo CSV/Excel", "🌐 API Socrata"])
 
 with subtab1:
@@ -106,44 +248,145 @@ with subtab1:
         help="Formatos soportados: CSV, Excel (.xlsx, .xls)"
     )
     
-    if uploaded_file is not None:
+    lectura_por_bloques = st.checkbox(
+        "⚡ Lectura por bloques (archivos grandes)", value=False, key="lectura_bloques",
+        help="Lee y tipa el CSV o la hoja de Excel (.xlsx) por bloques para limitar el uso de memoria"
+    )
+    
+    analizar_sin_cargar = False
+    if (uploaded_file is not None and uploaded_file.name.endswith('.csv')
+            and uploaded_file.size >= TAMANO_MINIMO_FUERA_DE_MEMORIA):
+        analizar_sin_cargar = st.checkbox(
+            "🧮 Analizar sin cargar en memoria", value=False, key="fuera_de_memoria",
+            help="Recorre el archivo por bloques y calcula solo estadísticos e ICD (precisión por IQR); "
+                 "los datos no quedan disponibles para las demás páginas"
+        )
+    
+    aplicar_limpieza = st.checkbox("🧹 Aplicar limpieza automática", value=False, key="clean_file")
+    pasos_limpieza = PASOS_POR_DEFECTO
+    if aplicar_limpieza:
+        pasos_limpieza = st.multiselect(
+            "Pasos de limpieza:", options=list(PASOS_LIMPIEZA), default=PASOS_POR_DEFECTO,
+            format_func=PASOS_LIMPIEZA.get, key="pasos_limpieza"
+        )
+    
+    if uploaded_file is not None and analizar_sin_cargar:
         try:
-            if uploaded_file.name.endswith('.csv'):
-                df_raw = pd.read_csv(uploaded_file, on_bad_lines='skip')
-            else:
-                df_raw = pd.read_excel(uploaded_file)
+            clave_bloques = 'bloques:' + hash_archivo_subido(uploaded_file)
+            analisis = st.session_state.analisis_por_bloques
+            if analisis is None or analisis[0] != clave_bloques:
+                contenido, nombre = uploaded_file.getvalue(), uploaded_file.name
+                tarea = seguir_tarea(clave_bloques, lambda: GESTOR_TAREAS.lanzar(
+                    clave_bloques, lambda t: analizar_archivo_fuera_de_memoria(contenido, nombre, t),
+                    descripcion=nombre
+                ))
+                if tarea.en_curso:
+                    mostrar_tarea(tarea)
+                    hay_tareas_en_curso = True
+                elif tarea.estado == 'completada':
+                    if analisis is not None and os.path.exists(analisis[1]['ruta_outliers']):
+                        os.remove(analisis[1]['ruta_outliers'])
+                    st.session_state.analisis_por_bloques = (clave_bloques, tarea.resultado)
+                    olvidar_tarea(clave_bloques)
+                elif mostrar_tarea_terminada(tarea):
+                    olvidar_tarea(clave_bloques)
+                    st.rerun()
             
-            df_raw = asignar_tipos_datos(df_raw)
-            st.session_state.df_original = df_raw.copy()
-            
-            if st.checkbox("🧹 Aplicar limpieza automática", value=False, key="clean_file"):
-                with st.spinner("🧹 Limpiando datos..."):
-                    df_clean, report = DataCleaner.clean_dataframe(df_raw)
-                    st.session_state.df = df_clean
-                    st.session_state.cleaning_report = report
-                    st.session_state.data_source = f"Archivo: {uploaded_file.name}"
-                
-                st.success("✅ Limpieza completada")
-                with st.expander("📋 Ver reporte de limpieza", expanded=True):
-                    for item in report:
-                        st.write(item)
-            else:
-                st.session_state.df = df_raw.copy()
-                st.session_state.data_source = f"Archivo: {uploaded_file.name} (sin limpiar)"
-                st.info("📊 Usando datos originales (sin limpieza)")
+            analisis = st.session_state.analisis_por_bloques
+            if analisis is not None and analisis[0] == clave_bloques:
+                mostrar_analisis_por_bloques(analisis[1])
+        except Exception as e:
+            st.error(f"❌ Error al analizar el archivo: {str(e)}")
+    
+    elif uploaded_file is not None:
+        try:
+            opciones_ingesta = {
+                'nombre': uploaded_file.name, 'por_bloques': lectura_por_bloques,
+                'limpieza': aplicar_limpieza, 'compacto': modo_compacto,
+                'pasos_limpieza': pasos_limpieza if aplicar_limpieza else None
+            }
+            if uploaded_file.name.endswith('.xlsx') and lectura_por_bloques:
+                col_hoja, col_columnas = st.columns([1, 2])
+                with col_hoja:
+                    hoja = st.selectbox("📑 Hoja:", options=listar_hojas_excel(uploaded_file), key="hoja_excel")
+                with col_columnas:
+                    columnas_excel = st.multiselect(
+                        "📋 Columnas a cargar (vacío = todas):",
+                        options=leer_encabezado_excel(uploaded_file, hoja), key="columnas_excel"
+                    )
+                opciones_ingesta.update({'hoja': hoja, 'columnas': columnas_excel})
             
-            st.success(f"✅ Archivo cargado exitosamente: {uploaded_file.name}")
+            clave = clave_ingesta(hash_archivo_subido(uploaded_file), opciones_ingesta)
+            resultado = CACHE_INGESTA.obtener(clave)
+            if resultado is None and st.session_state.ingesta_archivo is not None:
+                # Resultado ya copiado en la sesión aunque haya salido de CACHE_INGESTA
+                clave_sesion, resultado_sesion = st.session_state.ingesta_archivo
+                if clave_sesion == clave:
+                    resultado = resultado_sesion
             
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("📏 Filas", st.session_state.df.shape[0])
-            with col2:
-                st.metric("📊 Columnas", st.session_state.df.shape[1])
-            with col3:
-                st.metric("💾 Tamaño", f"{st.session_state.df.memory_usage(deep=True).sum() / 1024:.1f} KB")
+            if resultado is None:
+                contenido, nombre = uploaded_file.getvalue(), uploaded_file.name
+                tarea = seguir_tarea(clave, lambda: GESTOR_TAREAS.lanzar(
+                    clave, lambda t: ingerir_archivo(contenido, nombre, opciones_ingesta, t, clave_cache=clave),
+                    descripcion=nombre
+                ))
+                if tarea.en_curso:
+                    mostrar_tarea(tarea)
+                    hay_tareas_en_curso = True
+                elif tarea.estado == 'completada':
+                    resultado = tarea.resultado
+                elif mostrar_tarea_terminada(tarea):
+                    olvidar_tarea(clave)
+                    st.rerun()
             
-            with st.expander("👀 Vista previa de datos", expanded=False):
-                st.dataframe(st.session_state.df.head(10), use_container_width=True)
+            if resultado is not None:
+                # El gestor no debe retener los DataFrames una vez que están en la sesión
+                olvidar_tarea(clave)
+                # Solo una carga nueva reemplaza los DataFrames: los de la sesión pueden
+                # tener filas agregadas después (página de análisis)
+                if st.session_state.ingesta_archivo is None or st.session_state.ingesta_archivo[0] != clave:
+                    st.session_state.ingesta_archivo = (clave, resultado)
+                    st.session_state.df_original = resultado['df_original']
+                    st.session_state.df = resultado['df']
+                    # Mismo contenido y opciones de ingesta producen los mismos DataFrames
+                    st.session_state.clave_datos = clave
+                
+                if resultado['info_lectura']:
+                    info_lectura = resultado['info_lectura']
+                    st.caption(
+                        f"⚡ {info_lectura['filas']:,} filas · {info_lectura['filas_por_segundo']:,.0f} filas/s · "
+                        f"{info_lectura.get('lineas_omitidas', 0):,} líneas mal formadas omitidas"
+                    )
+                
+                if aplicar_limpieza:
+                    st.session_state.cleaning_report = resultado['report']
+                    st.session_state.data_source = f"Archivo: {uploaded_file.name}"
+                    
+                    st.success("✅ Limpieza completada")
+                    with st.expander("📋 Ver reporte de limpieza", expanded=True):
+                        for item in resultado['report']:
+                            st.write(item)
+                        if resultado.get('reporte_pasos') is not None:
+                            st.dataframe(resultado['reporte_pasos'], use_container_width=True, hide_index=True)
+                else:
+                    st.session_state.data_source = f"Archivo: {uploaded_file.name} (sin limpiar)"
+                    st.info("📊 Usando datos originales (sin limpieza)")
+                
+                if resultado['memoria']:
+                    mostrar_memoria(resultado['memoria'])
+                
+                st.success(f"✅ Archivo cargado exitosamente: {uploaded_file.name}")
+                
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("📏 Filas", st.session_state.df.shape[0])
+                with col2:
+                    st.metric("📊 Columnas", st.session_state.df.shape[1])
+                with col3:
+                    st.metric("💾 Tamaño", f"{st.session_state.df.memory_usage(deep=True).sum() / 1024:.1f} KB")
+                
+                with st.expander("👀 Vista previa de datos", expanded=False):
+                    st.dataframe(st.session_state.df.head(10), use_container_width=True)
             
         except Exception as e:
             st.error(f"❌ Error al cargar el archivo: {str(e)}")
@@ -162,38 +405,96 @@ with subtab2:
     col3, col4 = st.columns(2)
     
     with col3:
-        limit = st.number_input("📊 Límite de registros:", min_value=100, max_value=50000, value=2000, step=500)
+        cargar_todo = st.checkbox("📥 Cargar todos los registros", value=False)
+        limit = st.number_input("📊 Límite de registros:", min_value=100, max_value=10_000_000, value=2000, step=500,
+                                disabled=cargar_todo)
     
     with col4:
         app_token = st.text_input("🔑 App Token (opcional):", type="password")
+        forzar_completa = st.checkbox("♻️ Ignorar caché y descargar todo", value=False,
+                                      help="Por defecto solo se descargan los registros modificados desde la última carga")
+    
+    with st.expander("🎯 Filtros y columnas (consulta en el servidor)"):
+        solo_variables = st.checkbox(
+            "Descargar solo variables de análisis y columnas de agrupación", value=False,
+            help="Envía $select a la API con las variables estadísticas y " + ", ".join(COLUMNAS_AGRUPACION)
+        )
+        filtros_soql = {}
+        cols_filtro = st.columns(len(COLUMNAS_AGRUPACION))
+        for col_ui, campo in zip(cols_filtro, COLUMNAS_AGRUPACION):
+            with col_ui:
+                valores = st.text_input(f"{campo.capitalize()}:", value="", key=f"filtro_{campo}",
+                                        help="Valores separados por coma (vacío = sin filtro)")
+                filtros_soql[campo] = [v.strip() for v in valores.split(',') if v.strip()]
     
     if st.button("🔄 Cargar desde API", use_container_width=True, type="primary"):
         if domain and dataset_id:
-            with st.spinner("📥 Cargando datos desde API..."):
-                df_raw, error = load_data_from_socrata(domain, dataset_id, limit, app_token if app_token else None)
-                
-                if df_raw is not None:
-                    df_raw = asignar_tipos_datos(df_raw)
-                    st.session_state.df_original = df_raw.copy()
-                    st.session_state.df = df_raw.copy()
-                    st.session_state.data_source = f"API: {domain}/{dataset_id}"
-                    
-                    st.success(f"✅ Datos cargados exitosamente desde API")
-                    
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("📏 Filas", st.session_state.df.shape[0])
-                    with col2:
-                        st.metric("📊 Columnas", st.session_state.df.shape[1])
-                    with col3:
-                        st.metric("💾 Tamaño", f"{st.session_state.df.memory_usage(deep=True).sum() / 1024:.1f} KB")
-                    
-                    with st.expander("👀 Vista previa de datos", expanded=True):
-                        st.dataframe(st.session_state.df.head(10), use_container_width=True)
-                else:
-                    st.error(f"❌ Error al cargar datos: {error}")
+            opciones_api = {
+                'limit': None if cargar_todo else int(limit),
+                'app_token': app_token if app_token else None,
+                'forzar_completa': forzar_completa,
+                'consulta': (consulta_variables_analisis(filtros_soql) if solo_variables
+                             else construir_consulta_soql(filtros=filtros_soql)),
+                'compacto': modo_compacto
+            }
+            # El token no forma parte de la clave: peticiones idénticas comparten la descarga
+            clave_api = 'api:' + json.dumps(
+                {'domain': domain, 'dataset_id': dataset_id,
+                 **{k: v for k, v in opciones_api.items() if k != 'app_token'}},
+                sort_keys=True, default=str
+            )
+            # Un clic nuevo sustituye una carga anterior cancelada o fallida
+            olvidar_tarea(clave_api)
+            st.session_state.tarea_api = (clave_api, domain, dataset_id, opciones_api)
         else:
             st.warning("⚠️ Por favor completa los campos requeridos")
+    
+    if st.session_state.tarea_api is not None:
+        clave_api, domain_api, dataset_api, opciones_api = st.session_state.tarea_api
+        tarea = seguir_tarea(clave_api, lambda: GESTOR_TAREAS.lanzar(
+            clave_api, lambda t: ingerir_socrata(domain_api, dataset_api, opciones_api, t),
+            descripcion=f"{domain_api}/{dataset_api}"
+        ))
+        
+        if tarea.en_curso:
+            mostrar_tarea(tarea)
+            hay_tareas_en_curso = True
+        elif tarea.estado == 'completada':
+            resultado = tarea.resultado
+            st.session_state.df_original = resultado['df_original']
+            st.session_state.df = resultado['df']
+            st.session_state.data_source = f"API: {domain_api}/{dataset_api}"
+            # La misma consulta puede traer datos nuevos: cada carga tiene su propia clave
+            st.session_state.clave_datos = (clave_api, tarea.terminada_en)
+            st.session_state.tarea_api = None
+            st.session_state.ingesta_archivo = None
+            tiempos = tarea.instantanea()['tiempos']
+            olvidar_tarea(clave_api)
+            
+            if resultado['memoria']:
+                mostrar_memoria(resultado['memoria'])
+            
+            st.success(f"✅ Datos cargados exitosamente desde API")
+            info_carga = resultado['info_carga']
+            if info_carga['origen'] == 'cache':
+                st.caption("💾 Copia local vigente: sin llamadas a la API")
+            elif info_carga['origen'] == 'incremental':
+                st.caption(f"🔁 Refresco incremental: {info_carga['filas_actualizadas']:,} filas nuevas o modificadas")
+            st.caption("⏱️ " + " · ".join(f"{etapa}: {seg:.1f} s" for etapa, seg in tiempos.items()))
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("📏 Filas", st.session_state.df.shape[0])
+            with col2:
+                st.metric("📊 Columnas", st.session_state.df.shape[1])
+            with col3:
+                st.metric("💾 Tamaño", f"{st.session_state.df.memory_usage(deep=True).sum() / 1024:.1f} KB")
+            
+            with st.expander("👀 Vista previa de datos", expanded=True):
+                st.dataframe(st.session_state.df.head(10), use_container_width=True)
+        elif mostrar_tarea_terminada(tarea):
+            olvidar_tarea(clave_api)
+            st.rerun()
 
 # Comparación de datos
 if st.session_state.df is not None and st.session_state.df_original is not None:
@@ -209,6 +510,50 @@ if st.session_state.df is not None and st.session_state.df_original is not None:
             st.subheader("✨ Datos Procesados")
             st.write(f"Shape: {st.session_state.df.shape}")
             st.dataframe(st.session_state.df.head(5), use_container_width=True)
+        
+        st.markdown("#### 🧬 Diferencias fila a fila")
+        df_original, df_procesado = st.session_state.df_original, st.session_state.df
+        if df_original is df_procesado:
+            st.info("📊 Los datos no fueron procesados: no hay diferencias")
+        else:
+            # El resultado se conserva mientras no cambie la carga de la sesión
+            clave_diff = st.session_state.clave_datos
+            diff_guardado = st.session_state.diff_datos
+            if diff_guardado is None or diff_guardado[0] != clave_diff:
+                if st.button("🧬 Calcular diferencias", use_container_width=True):
+                    with st.spinner("Comparando filas..."):
+                        st.session_state.diff_datos = (clave_diff, comparar_dataframes(df_original, df_procesado))
+                    diff_guardado = st.session_state.diff_datos
+            
+            if diff_guardado is not None and diff_guardado[0] == clave_diff:
+                diff = diff_guardado[1]
+                for item in resumen_diferencias(diff):
+                    st.write(item)
+                
+                vistas_diff = {
+                    '🗑️ Filas eliminadas': diff['filas_eliminadas'],
+                    '🗑️ Duplicados eliminados': diff['filas_duplicadas'],
+                    '🔢 Celdas convertidas a NaN': diff['celdas_a_nan'],
+                    '⚠️ Filas sin correspondencia': diff['filas_sin_correspondencia'],
+                }
+                vista_diff = st.selectbox(
+                    "Detalle:", options=list(vistas_diff),
+                    format_func=lambda v: f"{v} ({len(vistas_diff[v]):,})", key="vista_diff"
+                )
+                df_detalle = vistas_diff[vista_diff]
+                if len(df_detalle) > 0:
+                    if len(df_detalle) > 1000:
+                        st.caption(f"Mostrando 1.000 de {len(df_detalle):,} filas; descarga el CSV para verlas todas")
+                    st.dataframe(df_detalle.head(1000), use_container_width=True)
+                    st.download_button(
+                        label="📥 Descargar detalle como CSV",
+                        data=df_detalle.to_csv(index=vista_diff != '🔢 Celdas convertidas a NaN').encode('utf-8'),
+                        file_name="diferencias.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+                else:
+                    st.success("✅ Sin diferencias de este tipo")
 
 # Información inicial
 if st.session_state.df is None:
@@ -234,3 +579,9 @@ if st.session_state.df is None:
 st.divider()
 st.caption("📊 Agente datos suelos Agrosavia Powered by SUME | Índice de Calidad de Datos y asistencia con IA")
 
+# Mientras haya cargas en segundo plano la página se refresca sola; el resto
+# de widgets sigue respondiendo entre actualizaciones
+if hay_tareas_en_curso:
+    time.sleep(INTERVALO_SONDEO)
+    st.rerun()
+
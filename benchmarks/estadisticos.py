@@ -0,0 +1,64 @@
+"""
+Comparación de tiempos: reducciones de pandas por separado frente al motor de estadisticas.py
+(21 variables × 500.000 filas). Ejecutar desde la raíz: python benchmarks/estadisticos.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from estadisticas import describir_matriz  # noqa: E402
+from utils import VistaNumerica  # noqa: E402
+
+FILAS, VARIABLES = 500_000, 21
+
+
+def con_pandas(df: pd.DataFrame) -> dict:
+    """Cálculo anterior: una reducción por estadístico y cuartiles IQR por columna"""
+    resultado = {
+        'media': df.mean(), 'mediana': df.median(), 'std': df.std(), 'minimo': df.min(),
+        'q1': df.quantile(0.25), 'q3': df.quantile(0.75), 'maximo': df.max(),
+        'rango': df.max() - df.min(), 'asimetria': df.skew(), 'curtosis': df.kurtosis(),
+        'conteo': df.count(), 'nulos': df.isnull().sum()
+    }
+    for col in df.columns:
+        data = df[col].dropna()
+        q1, q3 = data.quantile(0.25), data.quantile(0.75)
+        ((data < q1 - 1.5 * (q3 - q1)) | (data > q3 + 1.5 * (q3 - q1))).sum()
+    return resultado
+
+
+def con_motor(vista: VistaNumerica) -> dict:
+    desc = describir_matriz(vista.matriz, vista.nulos)
+    iqr = desc['q3'] - desc['q1']
+    with np.errstate(invalid='ignore'):
+        ((vista.matriz < desc['q1'] - 1.5 * iqr) | (vista.matriz > desc['q3'] + 1.5 * iqr)).sum(axis=0)
+    return desc
+
+
+def medir(funcion, *args, repeticiones: int = 3) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(42)
+    matriz = rng.lognormal(size=(FILAS, VARIABLES))
+    matriz[rng.random(matriz.shape) < 0.05] = np.nan
+    df = pd.DataFrame(matriz, columns=[f'var_{i}' for i in range(VARIABLES)])
+    vista = VistaNumerica(df)
+
+    anterior, nuevo = con_pandas(df), con_motor(vista)
+    for clave in ['media', 'std', 'mediana', 'q1', 'q3', 'asimetria', 'curtosis']:
+        np.testing.assert_allclose(nuevo[clave], anterior[clave].to_numpy(), rtol=1e-9)
+
+    t_pandas, t_motor = medir(con_pandas, df), medir(con_motor, vista)
+    print(f"pandas: {t_pandas:.3f} s | motor: {t_motor:.3f} s | {t_pandas / t_motor:.1f}x")
@@ -0,0 +1,62 @@
+"""
+Pico de memoria del análisis por bloques (fuera_de_memoria.py) con archivos CSV de
+tamaño creciente: debe mantenerse constante. Cada archivo se analiza en un proceso
+nuevo y se mide su memoria residente máxima. Ejecutar desde la raíz:
+python benchmarks/fuera_de_memoria.py [filas_por_archivo ...]
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuera_de_memoria import analizar_archivo_por_bloques  # noqa: E402
+from utils import VARIABLES_ESTADISTICAS  # noqa: E402
+
+TAMANOS = [int(t) for t in sys.argv[1:]] or [200_000, 800_000]
+FILAS_ESCRITURA = 100_000
+
+
+def escribir_csv(ruta: str, filas: int):
+    """CSV sintético con el formato de la fuente (coma decimal), escrito por partes"""
+    rng = np.random.default_rng(42)
+    for inicio in range(0, filas, FILAS_ESCRITURA):
+        n = min(FILAS_ESCRITURA, filas - inicio)
+        matriz = np.round(rng.lognormal(1, 0.6, size=(n, len(VARIABLES_ESTADISTICAS))), 2)
+        matriz[rng.random(matriz.shape) < 0.05] = np.nan
+        parte = pd.DataFrame(matriz, columns=VARIABLES_ESTADISTICAS)
+        parte['departamento'] = rng.choice(['Antioquia', 'Boyacá', 'Meta'], n)
+        parte.to_csv(ruta, mode='w' if inicio == 0 else 'a', header=inicio == 0, index=False, decimal=',')
+
+
+def analizar(ruta: str, ruta_outliers: str, cola: multiprocessing.Queue):
+    warnings.filterwarnings('ignore')
+    inicio = time.perf_counter()
+    resultado = analizar_archivo_por_bloques(ruta, ruta_outliers=ruta_outliers)
+    # ru_maxrss en KB (Linux)
+    cola.put((time.perf_counter() - inicio, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+              resultado['icd']['icd_total']))
+
+
+if __name__ == '__main__':
+    contexto = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as directorio:
+        for filas in TAMANOS:
+            ruta = os.path.join(directorio, f'datos_{filas}.csv')
+            escribir_csv(ruta, filas)
+            cola = contexto.Queue()
+            proceso = contexto.Process(target=analizar, args=(ruta, os.path.join(directorio, 'outliers.csv'), cola))
+            proceso.start()
+            segundos, pico, icd = cola.get()
+            proceso.join()
+            print(
+                f"{filas:>10,} filas | archivo {os.path.getsize(ruta) / 1024 ** 2:7.1f} MB | "
+                f"pico {pico:6.1f} MB | {segundos:6.1f} s | ICD {icd}"
+            )
@@ -0,0 +1,52 @@
+"""
+Refresco incremental (incremental.py) frente al recálculo completo de estadísticos e ICD
+al agregar pocas filas a un conjunto grande. Ejecutar desde la raíz:
+python benchmarks/incremental.py [filas] [filas_nuevas]
+"""
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calidad_datos import calcular_indice_calidad_datos, calcular_indice_calidad_incremental  # noqa: E402
+from incremental import EstadoIncremental  # noqa: E402
+from visualizaciones import calcular_estadisticos, calcular_estadisticos_incremental  # noqa: E402
+
+FILAS = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+FILAS_NUEVAS = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+VARIABLES = 10
+
+
+if __name__ == '__main__':
+    warnings.filterwarnings('ignore')
+    rng = np.random.default_rng(42)
+    matriz = np.round(rng.lognormal(1, 0.5, size=(FILAS + FILAS_NUEVAS, VARIABLES)), 2)
+    matriz[rng.random(matriz.shape) < 0.05] = np.nan
+    df = pd.DataFrame(matriz, columns=[f'var_{i}' for i in range(VARIABLES)])
+    base, nuevas = df.iloc[:FILAS], df.iloc[FILAS:]
+
+    inicio = time.perf_counter()
+    estado = EstadoIncremental(base)
+    t_estado = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    refresco = estado.agregar_filas(nuevas)
+    stats_incremental = calcular_estadisticos_incremental(estado)
+    icd_incremental = calcular_indice_calidad_incremental(estado, df)
+    t_incremental = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    stats_completo = calcular_estadisticos(df, None)
+    icd_completo = calcular_indice_calidad_datos(df, None)
+    t_completo = time.perf_counter() - inicio
+
+    exactas = [c for c in stats_completo.columns if c not in ('Outliers K-means', 'Outliers SVM', 'Total Outliers')]
+    pd.testing.assert_frame_equal(stats_incremental[exactas], stats_completo[exactas], rtol=1e-9, check_dtype=False)
+    print(f"estado inicial: {t_estado:.3f} s | reajustes: {refresco['reajustes']}")
+    print(f"incremental: {t_incremental:.3f} s | completo: {t_completo:.3f} s | {t_completo / t_incremental:.1f}x")
+    print(f"ICD incremental: {icd_incremental['icd_total']} | ICD completo: {icd_completo['icd_total']}")
@@ -0,0 +1,54 @@
+"""
+Lectura tipada de CSV (carga_archivos.leer_csv y leer_csv_por_bloques) frente a
+pd.read_csv + asignar_tipos_datos, con decimales con punto y con coma.
+Ejecutar desde la raíz: python benchmarks/lectura_csv.py [filas]
+"""
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carga_archivos import leer_csv, leer_csv_por_bloques  # noqa: E402
+from utils import VARIABLES_ESTADISTICAS, asignar_tipos_datos  # noqa: E402
+
+FILAS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+COLUMNAS = VARIABLES_ESTADISTICAS[:12]
+REPETICIONES = 5
+
+
+def mejor_tiempo(funcion) -> float:
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(42)
+    matriz = np.round(rng.lognormal(1, 0.6, size=(FILAS, len(COLUMNAS))), 2)
+    matriz[rng.random(matriz.shape) < 0.05] = np.nan
+    df = pd.DataFrame(matriz, columns=COLUMNAS)
+    df['departamento'] = rng.choice(['Antioquia', 'Boyacá', 'Meta'], FILAS)
+
+    for decimal in ('.', ','):
+        contenido = df.to_csv(index=False, decimal=decimal).encode('utf-8')
+
+        def base():
+            return asignar_tipos_datos(pd.read_csv(io.BytesIO(contenido)))
+
+        referencia = base()
+        pd.testing.assert_frame_equal(leer_csv(io.BytesIO(contenido)), referencia)
+        pd.testing.assert_frame_equal(leer_csv_por_bloques(io.BytesIO(contenido))[0], referencia)
+
+        t_base = mejor_tiempo(base)
+        t_leer = mejor_tiempo(lambda: leer_csv(io.BytesIO(contenido)))
+        t_bloques = mejor_tiempo(lambda: leer_csv_por_bloques(io.BytesIO(contenido)))
+        print(f"decimal '{decimal}': read_csv + asignar_tipos_datos {t_base:.2f} s | "
+              f"leer_csv {t_leer:.2f} s | leer_csv_por_bloques {t_bloques:.2f} s")
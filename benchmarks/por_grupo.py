@@ -0,0 +1,53 @@
+"""
+Estadísticos por grupo (calcular_estadisticos_por_grupo) con muchos municipios,
+frente a recorrer los grupos con pandas. Ejecutar desde la raíz:
+python benchmarks/por_grupo.py [filas] [municipios]
+"""
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import VARIABLES_ESTADISTICAS, obtener_vista_numerica  # noqa: E402
+from visualizaciones import calcular_estadisticos_por_grupo  # noqa: E402
+
+FILAS = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+MUNICIPIOS = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+
+
+def por_grupo_pandas(df: pd.DataFrame, claves: list) -> pd.DataFrame:
+    """Referencia: describe, asimetría y curtosis de cada grupo por separado"""
+    partes = []
+    for grupo, sub in df.groupby(claves, sort=True):
+        numerico = sub[VARIABLES_ESTADISTICAS]
+        partes.append(pd.concat([numerico.describe().T, numerico.skew(), numerico.kurt()], axis=1))
+    return pd.concat(partes)
+
+
+if __name__ == '__main__':
+    warnings.filterwarnings('ignore')
+    rng = np.random.default_rng(42)
+    matriz = np.round(rng.lognormal(1, 0.6, size=(FILAS, len(VARIABLES_ESTADISTICAS))), 2)
+    matriz[rng.random(matriz.shape) < 0.05] = np.nan
+    df = pd.DataFrame(matriz, columns=VARIABLES_ESTADISTICAS)
+    df['municipio'] = rng.choice([f'municipio_{i}' for i in range(MUNICIPIOS)], FILAS)
+    df['cultivo'] = rng.choice(['Café', 'Maíz', 'Papa', 'Arroz'], FILAS)
+    vista = obtener_vista_numerica(df, VARIABLES_ESTADISTICAS)
+
+    for claves in (['municipio'], ['municipio', 'cultivo']):
+        inicio = time.perf_counter()
+        tabla = calcular_estadisticos_por_grupo(df, VARIABLES_ESTADISTICAS, claves, vista=vista)
+        t_vectorizado = time.perf_counter() - inicio
+        grupos = len(tabla) // len(VARIABLES_ESTADISTICAS)
+        print(f"{' + '.join(claves)}: {grupos:,} grupos | vectorizado {t_vectorizado:.2f} s", end='')
+
+        if claves == ['municipio']:
+            inicio = time.perf_counter()
+            por_grupo_pandas(df, claves)
+            print(f" | pandas por grupo {time.perf_counter() - inicio:.2f} s", end='')
+        print()
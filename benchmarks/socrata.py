@@ -0,0 +1,126 @@
+"""
+Descarga paginada de carga_socrata.py contra un servidor SODA local (http.server) que
+responde count(*), $limit/$offset/$order y $select con latencia fija por petición y
+falla una vez una página con 429 y otra con 503. Comprueba que las filas llegan
+completas y en orden tras los reintentos y compara 1 hilo con MAX_WORKERS.
+Ejecutar desde la raíz: python benchmarks/socrata.py [filas] [tamano_pagina]
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carga_socrata import CAMPO_ID, MAX_WORKERS, TAMANO_PAGINA, cargar_dataset_socrata  # noqa: E402
+
+FILAS = int(sys.argv[1]) if len(sys.argv) > 1 else 120_000
+TAMANO_PAGINA = int(sys.argv[2]) if len(sys.argv) > 2 else TAMANO_PAGINA
+# Latencia simulada del servidor por petición (segundos)
+LATENCIA = 0.2
+VARIABLES = ['ph_agua_suelo', 'materia_organica', 'fosforo_bray_ii']
+
+
+class ServidorSoda(ThreadingHTTPServer):
+    """Dataset en memoria con :id ordenable y fallos programados por $offset"""
+
+    daemon_threads = True
+
+    def __init__(self, filas: int):
+        super().__init__(('127.0.0.1', 0), ManejadorSoda)
+        rng = np.random.default_rng(42)
+        valores = np.round(rng.lognormal(1, 0.5, size=(filas, len(VARIABLES))), 2)
+        # Los números llegan como texto con coma decimal, como en el dataset real
+        self.registros = [
+            {CAMPO_ID: f'row-{i:08d}', ':updated_at': '2024-01-01T00:00:00.000', 'id_muestra': str(i),
+             **{v: f'{x:.2f}'.replace('.', ',') for v, x in zip(VARIABLES, fila)}}
+            for i, fila in enumerate(valores)
+        ]
+        self.fallos = {}
+        self.peticiones = []
+        self.bloqueo = threading.Lock()
+
+    def programar_fallos(self, fallos: dict):
+        """{offset: código HTTP} que se devuelve una sola vez"""
+        self.fallos = dict(fallos)
+        self.peticiones = []
+
+
+class ManejadorSoda(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, codigo: int, cuerpo=None):
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else b''
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        time.sleep(LATENCIA)
+        params = dict(parse_qsl(urlparse(self.path).query))
+        servidor = self.server
+        with servidor.bloqueo:
+            servidor.peticiones.append(params)
+            codigo = servidor.fallos.pop(params.get('$offset'), None)
+        if codigo is not None:
+            return self._responder(codigo)
+
+        select = params.get('$select', ':*, *')
+        if select.startswith('count'):
+            return self._responder(200, [{'count': str(len(servidor.registros))}])
+        inicio = int(params.get('$offset', 0))
+        pagina = servidor.registros[inicio:inicio + int(params.get('$limit', 1000))]
+        if ':*' not in select:
+            # '*' proyecta las columnas de datos; los campos de sistema solo si se piden
+            campos = [c.strip() for c in select.split(',')]
+            pagina = [
+                {k: v for k, v in r.items() if k in campos or ('*' in campos and not k.startswith(':'))}
+                for r in pagina
+            ]
+        self._responder(200, pagina)
+
+
+def descargar(servidor: ServidorSoda, max_workers: int) -> tuple:
+    dominio = f'http://127.0.0.1:{servidor.server_address[1]}'
+    # Fallan una vez la segunda página y la última
+    fallos = {str(TAMANO_PAGINA): 429, str((FILAS - 1) // TAMANO_PAGINA * TAMANO_PAGINA): 503}
+    servidor.programar_fallos(fallos)
+    avance = []
+    inicio = time.perf_counter()
+    df = cargar_dataset_socrata(
+        dominio, 'bench-0000', tamano_pagina=TAMANO_PAGINA, max_workers=max_workers,
+        backoff=0.05, campos_sistema=True, progreso=lambda filas, total: avance.append((filas, total))
+    )
+    segundos = time.perf_counter() - inicio
+    reintentos = sum(p.get('$offset') in fallos for p in servidor.peticiones) - len(fallos)
+    return df, segundos, reintentos, avance
+
+
+if __name__ == '__main__':
+    servidor = ServidorSoda(FILAS)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        esperado = pd.DataFrame.from_records(servidor.registros)
+        for workers in (1, MAX_WORKERS):
+            df, segundos, reintentos, avance = descargar(servidor, workers)
+            assert len(df) == FILAS, f"faltan filas: {len(df)} de {FILAS}"
+            assert df[CAMPO_ID].is_monotonic_increasing and df[CAMPO_ID].is_unique, "filas fuera de orden"
+            assert (df['id_muestra'].to_numpy() == esperado['id_muestra'].to_numpy()).all()
+            for v in VARIABLES:
+                np.testing.assert_array_equal(
+                    df[v].to_numpy(), esperado[v].str.replace(',', '.').astype(float).to_numpy()
+                )
+            assert reintentos == 2 and avance[-1] == (FILAS, FILAS), "reintentos o progreso incorrectos"
+            print(f"{workers} hilo(s): {FILAS:,} filas en {segundos:.2f} s | "
+                  f"{len(avance)} páginas | {reintentos} páginas reintentadas (429 y 503) | completas y en orden")
+    finally:
+        servidor.shutdown()
@@ -0,0 +1,41 @@
+"""
+Concordancia entre el One-Class SVM exacto y el escalable (submuestra estratificada)
+sobre columnas sintéticas con distribuciones típicas de los análisis de suelos.
+Ejecutar desde la raíz: python benchmarks/svm_escalable.py [filas]
+"""
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outliers import concordancia_svm  # noqa: E402
+
+FILAS = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+PRESUPUESTOS = (2000, 5000, 10000)
+
+
+def columnas_sinteticas(filas: int) -> dict:
+    rng = np.random.default_rng(42)
+    bimodal = np.concatenate([rng.normal(5.5, 0.6, filas - filas // 4), rng.normal(7.8, 0.4, filas // 4)])
+    return {
+        'pH (normal, 1 decimal)': np.round(rng.normal(5.8, 0.9, filas), 1),
+        'Materia orgánica (lognormal, 2 decimales)': np.round(rng.lognormal(1.2, 0.6, filas), 2),
+        'Fósforo (cola pesada)': np.round(rng.pareto(2.5, filas) * 10, 2),
+        'pH (bimodal)': np.round(bimodal, 2),
+        'Conteo (entero, muchos empates)': rng.poisson(8, filas).astype(float),
+    }
+
+
+if __name__ == '__main__':
+    warnings.filterwarnings('ignore')
+    filas = []
+    for nombre, valores in columnas_sinteticas(FILAS).items():
+        for max_filas in PRESUPUESTOS:
+            filas.append({'columna': nombre, **concordancia_svm(valores, max_filas)})
+    reporte = pd.DataFrame(filas)
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print(reporte.round(4).to_string(index=False))
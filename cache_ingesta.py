@@ -0,0 +1,101 @@
+"""
+Memoización de la ingesta de archivos entre re-ejecuciones de Streamlit
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils import memoria_dataframe
+
+# Límites del caché compartido por todas las sesiones del servidor
+MAX_BYTES_CACHE = 1024 ** 3
+MAX_ENTRADAS_CACHE = 8
+
+
+def hash_contenido(contenido: bytes) -> str:
+    """Hash SHA-256 del contenido del archivo"""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def clave_ingesta(hash_archivo: str, opciones: Dict) -> str:
+    """Clave del resultado: hash del archivo más las opciones de lectura y limpieza"""
+    return hash_archivo + ':' + json.dumps(opciones, sort_keys=True, default=str)
+
+
+def tamano_resultado(resultado: Any) -> int:
+    """Bytes aproximados de un resultado (suma de los DataFrames y arrays distintos que contiene)"""
+    if isinstance(resultado, pd.DataFrame):
+        return memoria_dataframe(resultado)
+    if isinstance(resultado, np.ndarray):
+        return resultado.nbytes
+    if isinstance(resultado, dict):
+        vistos = {}
+        for valor in resultado.values():
+            if isinstance(valor, (pd.DataFrame, np.ndarray)):
+                vistos[id(valor)] = valor
+        return sum(tamano_resultado(valor) for valor in vistos.values())
+    return 0
+
+
+class CacheLRU:
+    """
+    Caché LRU acotado por número de entradas y por bytes.
+    Al superar cualquiera de los dos límites se expulsan las entradas menos usadas.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES_CACHE, max_entradas: int = MAX_ENTRADAS_CACHE):
+        self.max_bytes = max_bytes
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, clave: str, valor: Any) -> bool:
+        """Guarda el valor; devuelve False si por sí solo excede el límite de bytes"""
+        tamano = tamano_resultado(valor)
+        if tamano > self.max_bytes:
+            return False
+        with self._lock:
+            if clave in self._entradas:
+                self._bytes -= self._entradas.pop(clave)[1]
+            self._entradas[clave] = (valor, tamano)
+            self._bytes += tamano
+            while self._entradas and (
+                self._bytes > self.max_bytes or len(self._entradas) > self.max_entradas
+            ):
+                _, (_, tamano_expulsado) = self._entradas.popitem(last=False)
+                self._bytes -= tamano_expulsado
+        return True
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            return {
+                'entradas': len(self._entradas), 'bytes': self._bytes,
+                'aciertos': self.aciertos, 'fallos': self.fallos
+            }
+
+
+# Instancia única del proceso (compartida entre sesiones y re-ejecuciones)
+CACHE_INGESTA = CacheLRU()
@@ -0,0 +1,187 @@
+"""
+Caché local en Parquet de descargas Socrata con refresco incremental
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from carga_socrata import CAMPO_ACTUALIZADO, CAMPO_ID, cargar_dataset_socrata
+
+# Directorio del caché (configurable por variable de entorno)
+DIRECTORIO_CACHE = os.environ.get(
+    'AGROSAVIA_CACHE_SOCRATA',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache_socrata')
+)
+
+# Tiempo durante el cual una copia en caché se considera fresca sin consultar la API
+TTL_SEGUNDOS = 3600
+
+
+def clave_cache(domain: str, dataset_id: str, consulta: Dict = None) -> str:
+    """Clave determinística a partir del dominio, el dataset y los parámetros de la consulta"""
+    contenido = json.dumps(
+        {'domain': domain.strip().lower(), 'dataset_id': dataset_id.strip(), 'consulta': consulta or {}},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:32]
+
+
+def _rutas(directorio: str, clave: str) -> Tuple[str, str]:
+    return os.path.join(directorio, f"{clave}.parquet"), os.path.join(directorio, f"{clave}.json")
+
+
+def leer_cache(clave: str, directorio: str = None) -> Tuple[Optional[pd.DataFrame], Optional[Dict]]:
+    """Lee la copia en caché y sus metadatos; devuelve (None, None) si no existe o está corrupta"""
+    ruta_datos, ruta_meta = _rutas(directorio or DIRECTORIO_CACHE, clave)
+    if not (os.path.exists(ruta_datos) and os.path.exists(ruta_meta)):
+        return None, None
+    try:
+        with open(ruta_meta, encoding='utf-8') as f:
+            meta = json.load(f)
+        return pd.read_parquet(ruta_datos), meta
+    except Exception:
+        return None, None
+
+
+def escribir_cache(clave: str, df: Optional[pd.DataFrame], meta: Dict, directorio: str = None) -> bool:
+    """
+    Escribe datos y metadatos de forma atómica (archivo temporal + rename).
+    Con df=None solo se actualizan los metadatos.
+    """
+    directorio = directorio or DIRECTORIO_CACHE
+    ruta_datos, ruta_meta = _rutas(directorio, clave)
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        if df is not None:
+            df.to_parquet(ruta_datos + '.tmp', index=False)
+            os.replace(ruta_datos + '.tmp', ruta_datos)
+        with open(ruta_meta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(ruta_meta + '.tmp', ruta_meta)
+        return True
+    except Exception:
+        return False
+
+
+def _max_actualizado(*dfs: pd.DataFrame) -> Optional[str]:
+    maximos = [str(df[CAMPO_ACTUALIZADO].max()) for df in dfs if CAMPO_ACTUALIZADO in df.columns and not df.empty]
+    return max(maximos) if maximos else None
+
+
+def fusionar_cambios(df_cache: pd.DataFrame, df_delta: pd.DataFrame, limit: int = None,
+                     ids_modificados: pd.Series = None) -> pd.DataFrame:
+    """
+    Aplica a la copia en caché las filas modificadas o nuevas que cumplen la consulta
+    (df_delta, mismo :id sustituye) y quita las modificadas que ya no la cumplen
+    (ids_modificados: :id de todas las filas modificadas). Con límite se conservan
+    las primeras `limit` filas por :id, como en la descarga completa.
+    Sin cambios devuelve df_cache tal cual.
+    """
+    salientes = df_cache[CAMPO_ID].isin(df_delta[CAMPO_ID]) if not df_delta.empty else None
+    if ids_modificados is not None and len(ids_modificados) > 0 and not df_cache.empty:
+        modificadas = df_cache[CAMPO_ID].isin(ids_modificados)
+        salientes = modificadas if salientes is None else salientes | modificadas
+    if salientes is None or (df_delta.empty and not salientes.any()):
+        return df_cache
+
+    df = pd.concat([df_cache[~salientes], df_delta], ignore_index=True)
+    df = df.sort_values(CAMPO_ID, kind='stable').reset_index(drop=True)
+    if limit is not None:
+        df = df.head(int(limit))
+    return df
+
+
+def quitar_campos_sistema(df: pd.DataFrame) -> pd.DataFrame:
+    """Elimina las columnas de sistema de Socrata (empiezan por ':')"""
+    columnas_sistema = [c for c in df.columns if str(c).startswith(':')]
+    return df.drop(columns=columnas_sistema) if columnas_sistema else df
+
+
+def cargar_dataset_con_cache(
+    domain: str,
+    dataset_id: str,
+    limit: int = None,
+    app_token: str = None,
+    consulta: Dict = None,
+    directorio: str = None,
+    ttl_segundos: float = TTL_SEGUNDOS,
+    forzar_completa: bool = False,
+    progreso=None,
+    **kwargs
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Carga un dataset Socrata usando el caché local.
+    consulta puede traer 'select' y 'where' (ver carga_socrata.construir_consulta_soql).
+
+    - Copia fresca (dentro del TTL): se devuelve sin ninguna llamada de red.
+    - Copia vencida: se descargan solo las filas con :updated_at posterior a la última
+      descarga que cumplen la consulta (mismos $where y límite) y se fusionan con la
+      copia local; las modificadas que dejaron de cumplirla se quitan. Si con límite
+      la copia llena queda por debajo de él, las filas que entran no están en la copia
+      y se descarga todo de nuevo.
+    - Sin copia (o forzar_completa): descarga completa.
+
+    Las filas eliminadas en el servidor no se detectan de forma incremental; para
+    reflejarlas usar forzar_completa=True.
+    """
+    consulta = dict(consulta or {})
+    consulta['limit'] = limit
+    clave = clave_cache(domain, dataset_id, consulta)
+    where_base = consulta.get('where')
+    select = consulta.get('select')
+
+    df_cache, meta = (None, None) if forzar_completa else leer_cache(clave, directorio)
+    ahora = time.time()
+
+    if df_cache is not None and ahora - meta.get('descargado_en', 0) < ttl_segundos:
+        return quitar_campos_sistema(df_cache), {
+            'origen': 'cache', 'filas_actualizadas': 0, 'clave': clave
+        }
+
+    df = None
+    if df_cache is not None and meta.get('max_actualizado'):
+        filtro = f"{CAMPO_ACTUALIZADO} > '{meta['max_actualizado']}'"
+        where = f"({where_base}) AND {filtro}" if where_base else filtro
+        # Con límite, las filas del resultado son las primeras por :id: basta con
+        # las primeras `limit` modificadas
+        df_delta = cargar_dataset_socrata(
+            domain, dataset_id, limit=limit, app_token=app_token, where=where, select=select,
+            campos_sistema=True, progreso=progreso, **kwargs
+        )
+        modificadas = pd.DataFrame()
+        if where_base:
+            # Modificadas que ya no cumplen el filtro: solo sus :id y fechas
+            modificadas = cargar_dataset_socrata(
+                domain, dataset_id, app_token=app_token, where=filtro,
+                select=f"{CAMPO_ID}, {CAMPO_ACTUALIZADO}", **kwargs
+            )
+        df = fusionar_cambios(df_cache, df_delta, limit, modificadas.get(CAMPO_ID))
+        info = {'origen': 'incremental', 'filas_actualizadas': len(df_delta), 'clave': clave}
+        max_actualizado = _max_actualizado(df_delta, modificadas)
+        if limit is not None and len(df_cache) >= int(limit) and len(df) < int(limit):
+            # Salieron filas de una copia llena: las que entran no están en ella
+            df = None
+
+    if df is None:
+        df = cargar_dataset_socrata(
+            domain, dataset_id, limit=limit, app_token=app_token, where=where_base, select=select,
+            campos_sistema=True, progreso=progreso, **kwargs
+        )
+        info = {'origen': 'completa', 'filas_actualizadas': len(df), 'clave': clave}
+        max_actualizado = _max_actualizado(df)
+
+    nuevo_meta = {
+        'domain': domain, 'dataset_id': dataset_id, 'consulta': consulta,
+        'descargado_en': ahora,
+        'max_actualizado': max(filter(None, [max_actualizado, (meta or {}).get('max_actualizado')]), default=None),
+        'filas': len(df)
+    }
+    # Si no hubo cambios basta con renovar la marca de tiempo de los metadatos
+    sin_cambios = info['origen'] == 'incremental' and df is df_cache
+    info['cache_escrito'] = escribir_cache(clave, None if sin_cambios else df, nuevo_meta, directorio)
+
+    return quitar_campos_sistema(df), info
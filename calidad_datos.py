@@ -3,17 +3,21 @@ Funciones para calcular el Índice de Calidad de Datos (ICD)
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, List
-from sklearn.cluster import KMeans
-from sklearn.svm import OneClassSVM
-from sklearn.preprocessing import StandardScaler
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
 
-from utils import preparar_dataframe_numerico
+from estadisticas import obtener_descriptivos
+from incremental import EstadoIncremental
+from outliers import outliers_columna, precalcular_outliers
+from sketches import ResumenSketches
+from utils import VistaNumerica, obtener_vista_numerica
 
 
-def calcular_completitud(df: pd.DataFrame, variables: List[str] = None) -> Dict:
+def calcular_completitud(df: pd.DataFrame, variables: List[str] = None, vista: VistaNumerica = None) -> Dict:
     """Calcula la completitud de los datos"""
-    df_work = preparar_dataframe_numerico(df, variables)
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables)
+    df_work = vista.df
     
     if df_work.empty:
         return {
@@ -21,11 +25,17 @@ def calcular_completitud(df: pd.DataFrame, variables: List[str] = None) -> Dict:
             'total_nulos': 0, 'total_valores': 0
         }
     
-    total_cells = df_work.shape[0] * df_work.shape[1]
-    non_null_cells = df_work.count().sum()
+    nulos_por_col = pd.Series(vista.nulos.sum(axis=0), index=vista.columnas)
+    return _puntuar_completitud(nulos_por_col, len(df_work))
+
+
+def _puntuar_completitud(nulos_por_col: pd.Series, filas: int) -> Dict:
+    """Puntaje de completitud a partir de los nulos por columna y el número de filas"""
+    total_cells = filas * len(nulos_por_col)
+    non_null_cells = total_cells - nulos_por_col.sum()
     pct_completo = (non_null_cells / total_cells) * 100 if total_cells > 0 else 0
     
-    null_pct_por_col = (df_work.isnull().sum() / len(df_work)) * 100
+    null_pct_por_col = (nulos_por_col / filas) * 100
     columnas_problematicas = null_pct_por_col[null_pct_por_col > 50].to_dict()
     
     score = (pct_completo / 100) * 25
@@ -35,14 +45,16 @@ def calcular_completitud(df: pd.DataFrame, variables: List[str] = None) -> Dict:
     return {
         'score': score, 'pct_completo': pct_completo,
         'columnas_problematicas': columnas_problematicas,
-        'total_nulos': int(df_work.isnull().sum().sum()),
+        'total_nulos': int(nulos_por_col.sum()),
         'total_valores': total_cells
     }
 
 
-def calcular_unicidad(df: pd.DataFrame, variables: List[str] = None) -> Dict:
+def calcular_unicidad(df: pd.DataFrame, variables: List[str] = None, vista: VistaNumerica = None) -> Dict:
     """Calcula la unicidad de los datos"""
-    df_work = preparar_dataframe_numerico(df, variables)
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables)
+    df_work = vista.df
     
     if df_work.empty:
         return {
@@ -51,19 +63,23 @@ def calcular_unicidad(df: pd.DataFrame, variables: List[str] = None) -> Dict:
         }
     
     filas_duplicadas = df_work.duplicated().sum()
-    total_filas = len(df_work)
+    valores_unicos = pd.Series([df_work[col].nunique() for col in vista.columnas], index=vista.columnas)
+    valores_totales = pd.Series(len(df_work) - vista.nulos.sum(axis=0), index=vista.columnas)
+    return _puntuar_unicidad(len(df_work), filas_duplicadas, valores_unicos, valores_totales)
+
+
+def _puntuar_unicidad(total_filas: int, filas_duplicadas: int, valores_unicos: pd.Series,
+                      valores_totales: pd.Series) -> Dict:
+    """Puntaje de unicidad a partir de filas duplicadas y valores distintos/no nulos por columna"""
     pct_registros_unicos = ((total_filas - filas_duplicadas) / total_filas) * 100 if total_filas > 0 else 100
     
     columnas_con_duplicados_altos = {}
-    for col in df_work.columns:
-        valores_unicos = df_work[col].nunique()
-        valores_totales = df_work[col].notna().sum()
-        
-        if valores_totales > 0:
-            pct_unicos = (valores_unicos / valores_totales) * 100
+    for col in valores_unicos.index:
+        if valores_totales[col] > 0:
+            pct_unicos = (valores_unicos[col] / valores_totales[col]) * 100
             if pct_unicos < 20:
                 columnas_con_duplicados_altos[col] = {
-                    'valores_unicos': valores_unicos,
+                    'valores_unicos': valores_unicos[col],
                     'pct_unicidad': pct_unicos
                 }
     
@@ -77,35 +93,40 @@ def calcular_unicidad(df: pd.DataFrame, variables: List[str] = None) -> Dict:
     }
 
 
-def calcular_consistencia(df: pd.DataFrame, variables: List[str] = None) -> Dict:
+def calcular_consistencia(df: pd.DataFrame, variables: List[str] = None, vista: VistaNumerica = None) -> Dict:
     """Calcula la consistencia de los datos"""
     if variables is not None and len(variables) > 0:
         vars_disponibles = [v for v in variables if v in df.columns]
         if vars_disponibles:
-            df_original = df[vars_disponibles].copy()
+            df_original = df[vars_disponibles]
         else:
             return {'score': 15, 'pct_consistente': 100, 'columnas_tipo_mixto': {}, 'valores_inconsistentes': 0}
     else:
-        df_original = df.copy()
+        df_original = df
     
-    df_convertido = preparar_dataframe_numerico(df, variables)
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables)
     
-    if df_convertido.empty:
+    if vista.df.empty:
         return {'score': 15, 'pct_consistente': 100, 'columnas_tipo_mixto': {}, 'valores_inconsistentes': 0}
     
+    valores_perdidos = pd.Series(
+        [vista.nulos[:, j].sum() - df_original[col].isnull().sum() for j, col in enumerate(vista.columnas)],
+        index=vista.columnas
+    )
+    return _puntuar_consistencia(valores_perdidos, df_original.shape[0] * df_original.shape[1])
+
+
+def _puntuar_consistencia(valores_perdidos: pd.Series, total_valores: int) -> Dict:
+    """Puntaje de consistencia a partir de los valores perdidos en la conversión por columna"""
     inconsistencias = 0
     columnas_tipo_mixto = {}
     
-    for col in df_convertido.columns:
-        nulos_original = df_original[col].isnull().sum()
-        nulos_convertido = df_convertido[col].isnull().sum()
-        valores_perdidos = nulos_convertido - nulos_original
-        
-        if valores_perdidos > 0:
-            columnas_tipo_mixto[col] = int(valores_perdidos)
-            inconsistencias += valores_perdidos
+    for col, perdidos in valores_perdidos.items():
+        if perdidos > 0:
+            columnas_tipo_mixto[col] = int(perdidos)
+            inconsistencias += perdidos
     
-    total_valores = df_original.shape[0] * df_original.shape[1]
     pct_consistente = ((total_valores - inconsistencias) / total_valores) * 100 if total_valores > 0 else 100
     score = (pct_consistente / 100) * 15
     
@@ -116,148 +137,156 @@ def calcular_consistencia(df: pd.DataFrame, variables: List[str] = None) -> Dict
     }
 
 
-def calcular_precision_outliers(df: pd.DataFrame, variables_numericas: List[str] = None, metodo: str = 'iqr') -> Dict:
-    """Calcula la precisión basada en detección de outliers"""
-    df_numeric = preparar_dataframe_numerico(df, variables_numericas)
-    
-    if df_numeric.empty:
+def calcular_precision_outliers(df: pd.DataFrame, variables_numericas: List[str] = None, metodo: str = 'iqr',
+                                vista: VistaNumerica = None, parametros_outliers: Dict[str, Dict] = None,
+                                n_procesos: int = 1) -> Dict:
+    """
+    Calcula la precisión basada en detección de outliers.
+    parametros_outliers: parámetros por método que reemplazan a PARAMETROS_OUTLIERS
+    (p. ej. {'svm': {'max_filas': 5000}}).
+    n_procesos > 1: los ajustes de K-means y SVM se reparten antes entre procesos.
+    """
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables_numericas)
+    parametros_outliers = parametros_outliers or {}
+    if n_procesos > 1:
+        metodos = [m for m in ('kmeans', 'svm') if metodo in (m, 'combinado')]
+        precalcular_outliers(vista, metodos, parametros_outliers, n_procesos)
+    
+    if vista.df.empty:
         return {
             'score': 20, 'pct_datos_precisos': 100, 'outliers_por_columna': {},
             'total_outliers': 0, 'total_datos_numericos': 0, 'metodo_usado': metodo,
             'df_outliers_completo': pd.DataFrame(), 'num_filas_con_outliers': 0
         }
     
-    outliers_por_columna = {}
-    total_outliers = 0
-    total_datos = 0
-    todos_indices_outliers = set()
+    metodos = [m for m in ('iqr', 'kmeans', 'svm') if metodo in (m, 'combinado')]
     
-    for col in df_numeric.columns:
-        data = df_numeric[col].dropna()
-        if len(data) == 0:
-            continue
-            
-        n_outliers = 0
-        outlier_info = {'variable': col}
-        
-        n_outliers_iqr = 0
-        n_outliers_kmeans = 0
-        n_outliers_svm = 0
-        indices_outliers_iqr = set()
-        indices_outliers_kmeans = set()
-        indices_outliers_svm = set()
-        
-        # MÉTODO IQR
-        if metodo in ['iqr', 'combinado']:
-            Q1 = data.quantile(0.25)
-            Q3 = data.quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            
-            outliers_iqr_mask = (data < lower_bound) | (data > upper_bound)
-            outliers_iqr = data[outliers_iqr_mask]
-            n_outliers_iqr = len(outliers_iqr)
-            indices_outliers_iqr = set(data[outliers_iqr_mask].index)
-            
-            if metodo == 'iqr':
-                n_outliers = n_outliers_iqr
-                if n_outliers > 0:
-                    outlier_info.update({
-                        'cantidad': n_outliers,
-                        'porcentaje': (n_outliers / len(data)) * 100,
-                        'limite_inferior': lower_bound,
-                        'limite_superior': upper_bound,
-                        'min_outlier': outliers_iqr.min(),
-                        'max_outlier': outliers_iqr.max()
-                    })
-        
-        # MÉTODO K-MEANS
-        if metodo in ['kmeans', 'combinado'] and len(data) >= 3:
-            try:
-                data_reshaped = data.values.reshape(-1, 1)
-                scaler = StandardScaler()
-                data_scaled = scaler.fit_transform(data_reshaped)
-                
-                kmeans = KMeans(n_clusters=min(3, len(data)), random_state=42, n_init=10)
-                kmeans.fit(data_scaled)
-                distances = np.min(kmeans.transform(data_scaled), axis=1)
-                threshold = np.percentile(distances, 90)
-                
-                outliers_kmeans_mask = distances > threshold
-                n_outliers_kmeans = outliers_kmeans_mask.sum()
-                indices_outliers_kmeans = set(data.index[outliers_kmeans_mask])
-                
-                if metodo == 'kmeans':
-                    n_outliers = n_outliers_kmeans
-                    if n_outliers > 0:
-                        outliers_kmeans_data = data[outliers_kmeans_mask]
-                        outlier_info.update({
-                            'cantidad': n_outliers,
-                            'porcentaje': (n_outliers / len(data)) * 100,
-                            'threshold': threshold,
-                            'min_outlier': outliers_kmeans_data.min(),
-                            'max_outlier': outliers_kmeans_data.max()
-                        })
-            except:
-                n_outliers_kmeans = 0
-                indices_outliers_kmeans = set()
+    def columnas():
+        for col in vista.columnas:
+            data = vista.valores_validos(col)
+            if len(data) > 0:
+                yield col, data, {
+                    m: outliers_columna(vista, col, m, **parametros_outliers.get(m, {})) for m in metodos
+                }
+    
+    return _precision_por_columnas(df, columnas(), metodo)
+
+
+def _outliers_de_columna(col: str, data: pd.Series, resultados: Dict[str, Dict], metodo: str) -> tuple:
+    """
+    (n_outliers, outlier_info, índices de outliers) de una columna a partir de sus
+    valores válidos y del resultado de cada detector (formato de outliers_columna)
+    """
+    n_outliers = 0
+    outlier_info = {'variable': col}
+    
+    n_outliers_iqr = 0
+    n_outliers_kmeans = 0
+    n_outliers_svm = 0
+    indices_outliers_iqr = set()
+    indices_outliers_kmeans = set()
+    indices_outliers_svm = set()
+    
+    # MÉTODO IQR
+    if metodo in ['iqr', 'combinado']:
+        resultado_iqr = resultados['iqr']
+        outliers_iqr_mask = resultado_iqr['mascara']
+        outliers_iqr = data[outliers_iqr_mask]
+        n_outliers_iqr = len(outliers_iqr)
+        indices_outliers_iqr = set(data.index[outliers_iqr_mask])
         
-        # MÉTODO SVM
-        if metodo in ['svm', 'combinado'] and len(data) >= 10:
-            try:
-                data_reshaped = data.values.reshape(-1, 1)
-                scaler = StandardScaler()
-                data_scaled = scaler.fit_transform(data_reshaped)
-                
-                svm = OneClassSVM(nu=0.1, kernel='rbf', gamma='auto')
-                predictions = svm.fit_predict(data_scaled)
-                
-                outliers_svm_mask = predictions == -1
-                n_outliers_svm = outliers_svm_mask.sum()
-                indices_outliers_svm = set(data.index[outliers_svm_mask])
-                
-                if metodo == 'svm':
-                    n_outliers = n_outliers_svm
-                    if n_outliers > 0:
-                        outliers_svm_data = data[outliers_svm_mask]
-                        outlier_info.update({
-                            'cantidad': n_outliers,
-                            'porcentaje': (n_outliers / len(data)) * 100,
-                            'min_outlier': outliers_svm_data.min(),
-                            'max_outlier': outliers_svm_data.max()
-                        })
-            except:
-                n_outliers_svm = 0
-                indices_outliers_svm = set()
+        if metodo == 'iqr':
+            n_outliers = n_outliers_iqr
+            if n_outliers > 0:
+                outlier_info.update({
+                    'cantidad': n_outliers,
+                    'porcentaje': (n_outliers / len(data)) * 100,
+                    'limite_inferior': resultado_iqr['limite_inferior'],
+                    'limite_superior': resultado_iqr['limite_superior'],
+                    'min_outlier': outliers_iqr.min(),
+                    'max_outlier': outliers_iqr.max()
+                })
+    
+    # MÉTODO K-MEANS
+    resultado_kmeans = resultados.get('kmeans')
+    if resultado_kmeans is not None:
+        outliers_kmeans_mask = resultado_kmeans['mascara']
+        n_outliers_kmeans = outliers_kmeans_mask.sum()
+        indices_outliers_kmeans = set(data.index[outliers_kmeans_mask])
         
-        # MÉTODO COMBINADO
-        if metodo == 'combinado':
-            indices_unicos = indices_outliers_iqr | indices_outliers_kmeans | indices_outliers_svm
-            n_outliers = len(indices_unicos)
-            
+        if metodo == 'kmeans':
+            n_outliers = n_outliers_kmeans
             if n_outliers > 0:
+                outliers_kmeans_data = data[outliers_kmeans_mask]
                 outlier_info.update({
                     'cantidad': n_outliers,
                     'porcentaje': (n_outliers / len(data)) * 100,
-                    'outliers_iqr': n_outliers_iqr,
-                    'outliers_kmeans': n_outliers_kmeans,
-                    'outliers_svm': n_outliers_svm,
-                    'outliers_unicos': n_outliers,
-                    'overlapping': n_outliers_iqr + n_outliers_kmeans + n_outliers_svm - n_outliers,
-                    'indices_outliers': list(indices_unicos)
+                    'threshold': resultado_kmeans['threshold'],
+                    'min_outlier': outliers_kmeans_data.min(),
+                    'max_outlier': outliers_kmeans_data.max()
                 })
+    
+    # MÉTODO SVM
+    resultado_svm = resultados.get('svm')
+    if resultado_svm is not None:
+        outliers_svm_mask = resultado_svm['mascara']
+        n_outliers_svm = outliers_svm_mask.sum()
+        indices_outliers_svm = set(data.index[outliers_svm_mask])
         
-        # Guardar índices según método
-        if metodo == 'iqr':
-            indices_metodo = indices_outliers_iqr
-        elif metodo == 'kmeans':
-            indices_metodo = indices_outliers_kmeans
-        elif metodo == 'svm':
-            indices_metodo = indices_outliers_svm
-        else:
-            indices_metodo = indices_outliers_iqr | indices_outliers_kmeans | indices_outliers_svm
+        if metodo == 'svm':
+            n_outliers = n_outliers_svm
+            if n_outliers > 0:
+                outliers_svm_data = data[outliers_svm_mask]
+                outlier_info.update({
+                    'cantidad': n_outliers,
+                    'porcentaje': (n_outliers / len(data)) * 100,
+                    'min_outlier': outliers_svm_data.min(),
+                    'max_outlier': outliers_svm_data.max()
+                })
+    
+    # MÉTODO COMBINADO
+    if metodo == 'combinado':
+        indices_unicos = indices_outliers_iqr | indices_outliers_kmeans | indices_outliers_svm
+        n_outliers = len(indices_unicos)
         
+        if n_outliers > 0:
+            outlier_info.update({
+                'cantidad': n_outliers,
+                'porcentaje': (n_outliers / len(data)) * 100,
+                'outliers_iqr': n_outliers_iqr,
+                'outliers_kmeans': n_outliers_kmeans,
+                'outliers_svm': n_outliers_svm,
+                'outliers_unicos': n_outliers,
+                'overlapping': n_outliers_iqr + n_outliers_kmeans + n_outliers_svm - n_outliers,
+                'indices_outliers': list(indices_unicos)
+            })
+    
+    # Guardar índices según método
+    if metodo == 'iqr':
+        indices_metodo = indices_outliers_iqr
+    elif metodo == 'kmeans':
+        indices_metodo = indices_outliers_kmeans
+    elif metodo == 'svm':
+        indices_metodo = indices_outliers_svm
+    else:
+        indices_metodo = indices_outliers_iqr | indices_outliers_kmeans | indices_outliers_svm
+    
+    return n_outliers, outlier_info, indices_metodo
+
+
+def _precision_por_columnas(df: Optional[pd.DataFrame], columnas: Iterable[tuple], metodo: str) -> Dict:
+    """
+    Precisión a partir de (columna, valores válidos, resultados por detector) de
+    cada columna. Sin df no se arma el DataFrame de filas con outliers.
+    """
+    outliers_por_columna = {}
+    total_outliers = 0
+    total_datos = 0
+    todos_indices_outliers = set()
+    
+    for col, data, resultados in columnas:
+        n_outliers, outlier_info, indices_metodo = _outliers_de_columna(col, data, resultados, metodo)
         todos_indices_outliers.update(indices_metodo)
         
         if n_outliers > 0:
@@ -268,31 +297,19 @@ def calcular_precision_outliers(df: pd.DataFrame, variables_numericas: List[str]
         total_outliers += n_outliers
         total_datos += len(data)
     
-    if total_datos > 0:
-        pct_datos_precisos = ((total_datos - total_outliers) / total_datos) * 100
-        if pct_datos_precisos >= 95:
-            score = 20
-        elif pct_datos_precisos >= 85:
-            score = 15 + ((pct_datos_precisos - 85) / 10) * 5
-        elif pct_datos_precisos >= 70:
-            score = 5 + ((pct_datos_precisos - 70) / 15) * 10
-        else:
-            score = (pct_datos_precisos / 70) * 5
-    else:
-        pct_datos_precisos = 100
-        score = 20
+    pct_datos_precisos, score = _puntaje_precision(total_outliers, total_datos)
     
     # Crear DataFrame con filas de outliers
-    if len(todos_indices_outliers) > 0:
+    if len(todos_indices_outliers) > 0 and df is not None:
         df_outliers_completo = df.loc[list(todos_indices_outliers)].copy()
-        variables_outlier = []
-        for idx in df_outliers_completo.index:
-            vars_con_outlier = []
-            for col, info in outliers_por_columna.items():
-                if idx in info.get('indices_outliers', []):
-                    vars_con_outlier.append(col)
-            variables_outlier.append(', '.join(vars_con_outlier) if vars_con_outlier else '')
-        df_outliers_completo['variables_con_outlier'] = variables_outlier
+        # Variables con outlier por fila en una sola pasada sobre los índices de cada columna
+        variables_por_indice = defaultdict(list)
+        for col, info in outliers_por_columna.items():
+            for idx in info.get('indices_outliers', []):
+                variables_por_indice[idx].append(col)
+        df_outliers_completo['variables_con_outlier'] = [
+            ', '.join(variables_por_indice.get(idx, [])) for idx in df_outliers_completo.index
+        ]
     else:
         df_outliers_completo = pd.DataFrame()
     
@@ -305,28 +322,51 @@ def calcular_precision_outliers(df: pd.DataFrame, variables_numericas: List[str]
     }
 
 
-def calcular_variabilidad(df: pd.DataFrame, variables_numericas: List[str] = None) -> Dict:
+def _puntaje_precision(total_outliers: float, total_datos: int) -> tuple:
+    """(pct_datos_precisos, score) a partir del total de outliers y de datos numéricos"""
+    if total_datos > 0:
+        pct_datos_precisos = ((total_datos - total_outliers) / total_datos) * 100
+        if pct_datos_precisos >= 95:
+            score = 20
+        elif pct_datos_precisos >= 85:
+            score = 15 + ((pct_datos_precisos - 85) / 10) * 5
+        elif pct_datos_precisos >= 70:
+            score = 5 + ((pct_datos_precisos - 70) / 15) * 10
+        else:
+            score = (pct_datos_precisos / 70) * 5
+    else:
+        pct_datos_precisos = 100
+        score = 20
+    return pct_datos_precisos, score
+
+
+def calcular_variabilidad(df: pd.DataFrame, variables_numericas: List[str] = None,
+                          vista: VistaNumerica = None) -> Dict:
     """Calcula la variabilidad mediante el Coeficiente de Variación (CV)."""
-    df_numeric = preparar_dataframe_numerico(df, variables_numericas)
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables_numericas)
     
-    if df_numeric.empty:
+    if vista.df.empty:
         return {
             'score': 15, 'cv_promedio': 0, 'cv_por_columna': {},
             'columnas_variabilidad_extrema': {}, 'pct_variabilidad_adecuada': 100
         }
 
+    return _puntuar_variabilidad(vista.columnas, obtener_descriptivos(vista))
+
+
+def _puntuar_variabilidad(columnas: List[str], desc: Dict[str, np.ndarray]) -> Dict:
+    """Puntaje de variabilidad a partir de conteo, media, desviación, mínimo y máximo por columna"""
     cv_por_columna = {}
     columnas_variabilidad_extrema = {}
     cvs_validos = []
 
-    for col in df_numeric.columns:
-        data = df_numeric[col].dropna()
-
-        if len(data) <= 1:
+    for j, col in enumerate(columnas):
+        if desc['conteo'][j] <= 1:
             continue
 
-        mean = data.mean()
-        std = data.std()
+        mean = desc['media'][j]
+        std = desc['std'][j]
 
         # Manejo seguro cuando la media es muy pequeña
         if abs(mean) < 1e-9:
@@ -337,10 +377,10 @@ def calcular_variabilidad(df: pd.DataFrame, variables_numericas: List[str] = Non
         cv_por_columna[col] = cv
         cvs_validos.append(abs(cv))
 
-        # Detectar variabilidad extrema
+        # Detectar variabilidad extrema (máximo > mínimo: más de un valor distinto)
         if cv == 0:
             columnas_variabilidad_extrema[col] = {'cv': cv, 'problema': 'Variabilidad nula'}
-        elif abs(cv) < 1 and data.nunique() > 1:
+        elif abs(cv) < 1 and desc['maximo'][j] > desc['minimo'][j]:
             columnas_variabilidad_extrema[col] = {'cv': cv, 'problema': 'Variabilidad extremadamente baja'}
         elif abs(cv) > 200:
             columnas_variabilidad_extrema[col] = {'cv': cv, 'problema': 'Variabilidad excesiva'}
@@ -395,16 +435,30 @@ def calcular_indice_calidad_datos(
     df: pd.DataFrame, 
     variables_numericas: List[str] = None,
     columnas_esperadas: List[str] = None,
-    metodo_outliers: str = 'iqr'
+    metodo_outliers: str = 'iqr',
+    vista: VistaNumerica = None,
+    parametros_outliers: Dict[str, Dict] = None,
+    n_procesos: int = 1
 ) -> Dict:
     """Calcula el Índice de Calidad de Datos completo (0-100)"""
-    completitud = calcular_completitud(df, variables_numericas)
-    unicidad = calcular_unicidad(df, variables_numericas)
-    consistencia = calcular_consistencia(df, variables_numericas)
-    precision = calcular_precision_outliers(df, variables_numericas, metodo=metodo_outliers)
-    variabilidad = calcular_variabilidad(df, variables_numericas)
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables_numericas)
+    completitud = calcular_completitud(df, variables_numericas, vista=vista)
+    unicidad = calcular_unicidad(df, variables_numericas, vista=vista)
+    consistencia = calcular_consistencia(df, variables_numericas, vista=vista)
+    precision = calcular_precision_outliers(
+        df, variables_numericas, metodo=metodo_outliers, vista=vista,
+        parametros_outliers=parametros_outliers, n_procesos=n_procesos
+    )
+    variabilidad = calcular_variabilidad(df, variables_numericas, vista=vista)
     integridad = calcular_integridad(df, columnas_esperadas)
     
+    return _resultado_icd(completitud, unicidad, consistencia, precision, variabilidad, integridad)
+
+
+def _resultado_icd(completitud: Dict, unicidad: Dict, consistencia: Dict, precision: Dict,
+                   variabilidad: Dict, integridad: Dict) -> Dict:
+    """Suma las seis dimensiones y asigna el nivel de calidad"""
     icd_total = (
         completitud['score'] + unicidad['score'] + consistencia['score'] +
         precision['score'] + variabilidad['score'] + integridad['score']
@@ -440,6 +494,107 @@ def calcular_indice_calidad_datos(
     }
 
 
+def _precision_desde_resumen(resumen: ResumenSketches, outliers_iqr: Dict = None) -> Dict:
+    """
+    Precisión por IQR. Sin outliers_iqr se usan los límites y conteos estimados del
+    resumen; con él (formato de ResumenSketches.outliers_iqr, p. ej. contado en una
+    segunda pasada) los conteos son exactos respecto a esos límites.
+    """
+    estimado = outliers_iqr is None
+    iqr = resumen.outliers_iqr() if estimado else outliers_iqr
+    validos = resumen.filas - resumen.nulos
+    outliers_por_columna = {}
+    for j, col in enumerate(resumen.variables):
+        n_outliers = int(iqr['conteo'][j])
+        if n_outliers > 0:
+            outliers_por_columna[col] = {
+                'variable': col, 'cantidad': n_outliers,
+                'porcentaje': (n_outliers / validos[j]) * 100,
+                'limite_inferior': iqr['limite_inferior'][j],
+                'limite_superior': iqr['limite_superior'][j]
+            }
+            if 'min_outlier' in iqr:
+                outliers_por_columna[col].update({
+                    'min_outlier': iqr['min_outlier'][j], 'max_outlier': iqr['max_outlier'][j]
+                })
+    total_outliers = int(iqr['conteo'].sum())
+    total_datos = int(validos.sum())
+    pct_datos_precisos, score = _puntaje_precision(total_outliers, total_datos)
+    precision = {
+        'score': score, 'pct_datos_precisos': pct_datos_precisos,
+        'outliers_por_columna': outliers_por_columna,
+        'total_outliers': total_outliers, 'total_datos_numericos': total_datos,
+        'metodo_usado': 'iqr', 'df_outliers_completo': pd.DataFrame(), 'estimado': estimado
+    }
+    if 'filas_con_outliers' in iqr:
+        precision['num_filas_con_outliers'] = iqr['filas_con_outliers']
+    return precision
+
+
+def calcular_indice_calidad_desde_resumen(resumen: ResumenSketches, columnas_esperadas: List[str] = None,
+                                          outliers_iqr: Dict = None, filas_duplicadas: int = None) -> Dict:
+    """
+    ICD a partir de un ResumenSketches, para datos que llegan por bloques.
+    Completitud, consistencia, variabilidad e integridad son exactas; la unicidad
+    usa los conteos de HyperLogLog (filas duplicadas dentro de la cota de error se
+    dan como 0 y se marcan como estimadas) y la precisión el método IQR con los
+    cuartiles del KLL (K-means y SVM necesitan todos los datos). Ver cotas en sketches.py.
+    outliers_iqr y filas_duplicadas: conteos exactos de una segunda pasada (ver
+    fuera_de_memoria.py); sustituyen a los estimados.
+    """
+    variables = resumen.variables
+    estimadas = filas_duplicadas is None and bool(variables)
+    if filas_duplicadas is None:
+        filas_duplicadas = resumen.filas_duplicadas() if variables else 0
+    validos = pd.Series(resumen.filas - resumen.nulos, index=variables)
+
+    completitud = _puntuar_completitud(pd.Series(resumen.nulos, index=variables), resumen.filas)
+    unicidad = _puntuar_unicidad(
+        resumen.filas, filas_duplicadas,
+        pd.Series(np.round(resumen.valores_distintos()).astype(np.int64), index=variables), validos
+    )
+    # Filas duplicadas estimadas con HLL: por debajo de la cota se dan como 0
+    unicidad['duplicadas_estimadas'] = estimadas
+    unicidad['cota_filas_duplicadas'] = resumen.cota_filas_duplicadas() if estimadas else 0.0
+    consistencia = _puntuar_consistencia(
+        pd.Series(resumen.nulos - resumen.nulos_originales, index=variables), resumen.filas * len(variables)
+    )
+    precision = _precision_desde_resumen(resumen, outliers_iqr)
+    variabilidad = _puntuar_variabilidad(variables, resumen.descriptivos())
+    integridad = calcular_integridad(pd.DataFrame(columns=resumen.columnas_datos), columnas_esperadas)
+    return _resultado_icd(completitud, unicidad, consistencia, precision, variabilidad, integridad)
+
+
+def calcular_indice_calidad_incremental(estado: EstadoIncremental, df: pd.DataFrame = None,
+                                        columnas_esperadas: List[str] = None, metodo_outliers: str = 'iqr') -> Dict:
+    """
+    ICD a partir de un EstadoIncremental (filas agregadas, ver incremental.py).
+    Todo coincide con el cálculo desde cero salvo K-means y SVM, que usan el último
+    ajuste de cada variable. df (datos completos de la versión) solo se usa para
+    el DataFrame de filas con outliers.
+    """
+    variables = estado.variables
+    validos = pd.Series(estado.validos, index=variables)
+
+    completitud = _puntuar_completitud(pd.Series(estado.nulos, index=variables), estado.filas)
+    unicidad = _puntuar_unicidad(
+        estado.filas, estado.filas_duplicadas, pd.Series(estado.distintos, index=variables), validos
+    )
+    consistencia = _puntuar_consistencia(
+        pd.Series(estado.nulos - estado.nulos_originales, index=variables), estado.filas * len(variables)
+    )
+    metodos = [m for m in ('iqr', 'kmeans', 'svm') if metodo_outliers in (m, 'combinado')]
+    columnas = (
+        (col, pd.Series(estado.valores_validos(j), index=estado.etiquetas_validas(j)),
+         {m: estado.resultado_outliers(m, j) for m in metodos})
+        for j, col in enumerate(variables) if validos[col] > 0
+    )
+    precision = _precision_por_columnas(df, columnas, metodo_outliers)
+    variabilidad = _puntuar_variabilidad(variables, estado.descriptivos())
+    integridad = calcular_integridad(pd.DataFrame(columns=estado.columnas_datos), columnas_esperadas)
+    return _resultado_icd(completitud, unicidad, consistencia, precision, variabilidad, integridad)
+
+
 def generar_recomendaciones(resultado_icd: Dict) -> List[str]:
     """Genera recomendaciones basadas en el ICD calculado"""
     recomendaciones = []
@@ -453,9 +608,14 @@ def generar_recomendaciones(resultado_icd: Dict) -> List[str]:
     
     if detalles['unicidad']['filas_duplicadas'] > 0:
         n_dup = detalles['unicidad']['filas_duplicadas']
-        recomendaciones.append(
-            f"⚠️ **{n_dup} filas duplicadas detectadas**: Revisar si son errores de carga."
-        )
+        if detalles['unicidad'].get('duplicadas_estimadas'):
+            recomendaciones.append(
+                f"⚠️ **~{n_dup} filas duplicadas (estimado)**: Revisar si son errores de carga."
+            )
+        else:
+            recomendaciones.append(
+                f"⚠️ **{n_dup} filas duplicadas detectadas**: Revisar si son errores de carga."
+            )
     
     if detalles['precision']['score'] < 15:
         n_out = detalles['precision']['total_outliers']
@@ -0,0 +1,338 @@
+"""
+Carga de archivos CSV y Excel por bloques con memoria acotada
+"""
+import io
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils import ESQUEMA_POR_COLUMNA, asignar_tipos_datos, opciones_lectura_csv, separador_decimal_esquema
+
+# Filas por bloque al leer archivos grandes
+TAMANO_BLOQUE = 50000
+
+# Filas por lote al recorrer hojas de Excel en modo solo lectura
+TAMANO_LOTE_EXCEL = 10000
+
+# Filas de muestra para deducir el separador decimal de un CSV
+FILAS_MUESTRA_DECIMAL = 200
+
+
+class _ContadorLineasOmitidas:
+    """on_bad_lines del motor python: cuenta cada línea mal formada y la omite"""
+
+    def __init__(self):
+        self.omitidas = 0
+
+    def __call__(self, linea: List[str]) -> None:
+        self.omitidas += 1
+        return None
+
+
+class LecturaCancelable(io.RawIOBase):
+    """
+    Archivo binario de solo lectura que llama a cancelacion antes de cada lectura
+    del archivo envuelto. read_csv y openpyxl leen por búferes (unos 256 KB el
+    parser C), así que la excepción que lance cancelacion interrumpe incluso la
+    lectura de un archivo completo en una sola llamada.
+    """
+
+    def __init__(self, archivo, cancelacion: Callable[[], None]):
+        super().__init__()
+        self._archivo = archivo
+        self._cancelacion = cancelacion
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self._archivo.seekable()
+
+    def seek(self, posicion: int, desde: int = io.SEEK_SET) -> int:
+        return self._archivo.seek(posicion, desde)
+
+    def tell(self) -> int:
+        return self._archivo.tell()
+
+    def readinto(self, destino) -> int:
+        self._cancelacion()
+        return self._archivo.readinto(destino)
+
+
+class AlmacenColumnar:
+    """
+    Acumula bloques ya tipados como listas de arrays por columna y los une
+    columna a columna, de modo que nunca coexisten dos copias completas del dataset.
+    """
+
+    def __init__(self):
+        self.columnas: Dict[str, List[np.ndarray]] = {}
+        self.filas = 0
+
+    def agregar(self, bloque: pd.DataFrame):
+        for col in bloque.columns:
+            self.columnas.setdefault(col, []).append(bloque[col].to_numpy())
+        self.filas += len(bloque)
+
+    def a_dataframe(self) -> pd.DataFrame:
+        datos = {}
+        for col in list(self.columnas.keys()):
+            partes = self.columnas.pop(col)
+            datos[col] = partes[0] if len(partes) == 1 else np.concatenate(partes)
+            del partes
+        self.filas = 0
+        return pd.DataFrame(datos, copy=False)
+
+
+def _opciones_csv(archivo, usecols: List[str] = None, **kwargs_csv) -> Tuple[pd.Index, Dict]:
+    """
+    Encabezado y argumentos de read_csv: esquema, kwargs_csv y el separador
+    decimal de las columnas del esquema según una muestra del archivo (el que
+    más aparece en sus valores, o el del esquema si la muestra no decide).
+    """
+    muestra = pd.read_csv(archivo, nrows=FILAS_MUESTRA_DECIMAL, dtype=str, on_bad_lines='skip', **kwargs_csv)
+    if hasattr(archivo, 'seek'):
+        archivo.seek(0)
+    encabezado = muestra.columns
+    numericas = [c for c in encabezado if c in ESQUEMA_POR_COLUMNA and (usecols is None or c in usecols)]
+
+    separador = None
+    if numericas and 'decimal' not in kwargs_csv:
+        valores = pd.Series(muestra[numericas].to_numpy().ravel()).dropna()
+        comas = int(valores.str.contains(',', regex=False).sum())
+        puntos = int(valores.str.contains('.', regex=False).sum())
+        separador = (',' if comas > puntos else '.') if comas != puntos else separador_decimal_esquema(numericas)
+
+    opciones = opciones_lectura_csv(list(encabezado), usecols, separador)
+    opciones.update(kwargs_csv)
+    return encabezado, opciones
+
+
+def leer_csv(archivo, usecols: List[str] = None, **kwargs_csv) -> pd.DataFrame:
+    """
+    Lee un CSV completo tipando en el parser según el esquema de utils
+    (float directo para columnas numéricas, texto para el resto).
+    """
+    _, opciones = _opciones_csv(archivo, usecols, **kwargs_csv)
+    df = pd.read_csv(archivo, on_bad_lines='skip', **opciones)
+    return asignar_tipos_datos(df)
+
+
+def leer_csv_por_bloques(
+    archivo,
+    tamano_bloque: int = TAMANO_BLOQUE,
+    progreso: Callable[[Dict], None] = None,
+    usecols: List[str] = None,
+    **kwargs_csv
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Lee un CSV en bloques de tamaño fijo, tipa cada bloque con asignar_tipos_datos
+    y lo agrega a un almacén columnar. El pico de memoria es del orden de un bloque
+    más el resultado tipado.
+
+    Las columnas numéricas del esquema se convierten a float en el parser y el
+    resto se lee directamente como texto. Por defecto usa el motor python, que
+    permite contar las líneas mal formadas omitidas; con engine='c' la lectura es
+    más rápida y lineas_omitidas queda en None.
+    progreso recibe un diccionario con filas, lineas_omitidas, segundos y filas_por_segundo.
+    """
+    almacen = AlmacenColumnar()
+    inicio = time.perf_counter()
+
+    # Tipado en el parser según el esquema; el texto no se infiere (igual en todos los bloques)
+    encabezado, opciones = _opciones_csv(archivo, usecols, **kwargs_csv)
+    # Solo el motor python avisa de cada línea omitida (a una función propia de esta lectura);
+    # con engine='c' explícito se omiten sin contarlas
+    opciones.setdefault('engine', 'python')
+    contador = _ContadorLineasOmitidas() if opciones['engine'] == 'python' else None
+    info = {
+        'filas': 0, 'lineas_omitidas': 0 if contador is not None else None, 'bloques': 0,
+        'segundos': 0.0, 'filas_por_segundo': 0.0
+    }
+    lector = pd.read_csv(
+        archivo, chunksize=tamano_bloque, on_bad_lines=contador if contador is not None else 'skip', **opciones
+    )
+
+    for bloque in lector:
+        almacen.agregar(asignar_tipos_datos(bloque))
+        del bloque
+
+        segundos = time.perf_counter() - inicio
+        info.update({
+            'filas': almacen.filas,
+            'lineas_omitidas': contador.omitidas if contador is not None else None,
+            'bloques': info['bloques'] + 1,
+            'segundos': segundos,
+            'filas_por_segundo': almacen.filas / segundos if segundos > 0 else 0.0
+        })
+        if progreso is not None:
+            progreso(dict(info))
+
+    if almacen.filas == 0:
+        return asignar_tipos_datos(pd.DataFrame(columns=opciones.get('usecols', encabezado))), info
+    return almacen.a_dataframe(), info
+
+
+def iterar_bloques_archivo(ruta: str, tamano_bloque: int = TAMANO_BLOQUE, usecols: List[str] = None,
+                           cancelacion: Callable[[], None] = None, **kwargs_csv) -> Iterator[pd.DataFrame]:
+    """
+    Recorre un CSV o un Parquet en bloques tipados con asignar_tipos_datos sin
+    acumularlos (en memoria hay un solo bloque a la vez). El índice de cada bloque
+    es la posición de sus filas en el archivo; las líneas mal formadas del CSV se omiten.
+    cancelacion se llama antes de cada bloque y, en el CSV, en cada lectura del
+    archivo (LecturaCancelable); la excepción que lance interrumpe el recorrido.
+    """
+    if str(ruta).lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        archivo = pq.ParquetFile(ruta)
+        # Columnas de índice que pandas guarda en el Parquet (no son datos)
+        columnas = usecols or [c for c in archivo.schema_arrow.names if not c.startswith('__index_level_')]
+        inicio, bloques = 0, 0
+        for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=columnas):
+            if cancelacion is not None:
+                cancelacion()
+            bloque = lote.to_pandas()
+            bloque.index = pd.RangeIndex(inicio, inicio + len(bloque))
+            inicio, bloques = inicio + len(bloque), bloques + 1
+            yield asignar_tipos_datos(bloque)
+        if bloques == 0:
+            # Sin filas: un bloque vacío con las columnas, como el lector de CSV
+            yield asignar_tipos_datos(archivo.schema_arrow.empty_table().select(columnas).to_pandas())
+        return
+
+    _, opciones = _opciones_csv(ruta, usecols, **kwargs_csv)
+    with open(ruta, 'rb') as archivo:
+        fuente = LecturaCancelable(archivo, cancelacion) if cancelacion is not None else archivo
+        with pd.read_csv(fuente, chunksize=tamano_bloque, on_bad_lines='skip', **opciones) as lector:
+            for bloque in lector:
+                if cancelacion is not None:
+                    cancelacion()
+                yield asignar_tipos_datos(bloque)
+
+
+def _abrir_libro_excel(archivo):
+    """Abre el libro en modo solo lectura (sin cargar el modelo completo de celdas)"""
+    from openpyxl import load_workbook
+
+    if hasattr(archivo, 'seek'):
+        archivo.seek(0)
+    return load_workbook(archivo, read_only=True, data_only=True)
+
+
+def listar_hojas_excel(archivo) -> List[str]:
+    """Devuelve los nombres de las hojas del libro"""
+    libro = _abrir_libro_excel(archivo)
+    try:
+        return list(libro.sheetnames)
+    finally:
+        libro.close()
+
+
+def _nombres_columnas(fila_encabezado) -> List[str]:
+    """Nombres de columnas como los generaría pandas (celdas vacías → 'Unnamed: i')"""
+    return [
+        str(valor) if valor is not None else f"Unnamed: {i}"
+        for i, valor in enumerate(fila_encabezado)
+    ]
+
+
+def leer_encabezado_excel(archivo, hoja: str = None) -> List[str]:
+    """Lee solo la fila de encabezados de la hoja"""
+    libro = _abrir_libro_excel(archivo)
+    try:
+        ws = libro[hoja] if hoja else libro.worksheets[0]
+        for fila in ws.iter_rows(min_row=1, max_row=1, values_only=True):
+            return _nombres_columnas(fila)
+        return []
+    finally:
+        libro.close()
+
+
+def _lote_a_dataframe(lote: List[tuple], indices: List[int], columnas: List[str]) -> pd.DataFrame:
+    """Convierte un lote de filas (tuplas) en DataFrame tipado con asignar_tipos_datos"""
+    matriz = np.empty((len(lote), len(indices)), dtype=object)
+    for i, fila in enumerate(lote):
+        matriz[i] = [fila[j] for j in indices]
+    df_lote = pd.DataFrame(matriz, columns=columnas)
+    # Celdas vacías como NaN, igual que pd.read_excel
+    df_lote = df_lote.where(df_lote.notna(), np.nan)
+    return asignar_tipos_datos(df_lote)
+
+
+def leer_excel_por_bloques(
+    archivo,
+    hoja: str = None,
+    columnas: List[str] = None,
+    tamano_lote: int = TAMANO_LOTE_EXCEL,
+    progreso: Callable[[Dict], None] = None
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Lee una hoja de Excel (.xlsx) recorriendo filas en modo solo lectura y valores,
+    tipando cada lote con las mismas reglas de asignar_tipos_datos.
+
+    - hoja: nombre de la hoja (por defecto la primera).
+    - columnas: subconjunto de columnas a conservar (por defecto todas).
+    """
+    info = {'filas': 0, 'lotes': 0, 'segundos': 0.0, 'filas_por_segundo': 0.0}
+    inicio = time.perf_counter()
+    almacen = AlmacenColumnar()
+
+    libro = _abrir_libro_excel(archivo)
+    try:
+        ws = libro[hoja] if hoja else libro.worksheets[0]
+        # Las dimensiones guardadas en el archivo pueden ser incorrectas
+        ws.reset_dimensions()
+        filas = ws.iter_rows(values_only=True)
+
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return pd.DataFrame(), info
+        nombres = _nombres_columnas(encabezado)
+
+        if columnas:
+            faltantes = [c for c in columnas if c not in nombres]
+            if faltantes:
+                raise ValueError(f"Columnas no encontradas en la hoja: {faltantes}")
+            indices = [nombres.index(c) for c in columnas]
+        else:
+            indices = list(range(len(nombres)))
+        nombres_salida = [nombres[i] for i in indices]
+        ancho = len(nombres)
+
+        lote = []
+        for fila in filas:
+            if len(fila) < ancho:
+                fila = tuple(fila) + (None,) * (ancho - len(fila))
+            # Filas completamente vacías se omiten, como en pd.read_excel
+            if all(v is None for v in fila):
+                continue
+            lote.append(fila)
+
+            if len(lote) >= tamano_lote:
+                almacen.agregar(_lote_a_dataframe(lote, indices, nombres_salida))
+                lote = []
+                segundos = time.perf_counter() - inicio
+                info.update({
+                    'filas': almacen.filas, 'lotes': info['lotes'] + 1, 'segundos': segundos,
+                    'filas_por_segundo': almacen.filas / segundos if segundos > 0 else 0.0
+                })
+                if progreso is not None:
+                    progreso(dict(info))
+
+        if lote:
+            almacen.agregar(_lote_a_dataframe(lote, indices, nombres_salida))
+            info['lotes'] += 1
+    finally:
+        libro.close()
+
+    segundos = time.perf_counter() - inicio
+    info.update({
+        'filas': almacen.filas, 'segundos': segundos,
+        'filas_por_segundo': almacen.filas / segundos if segundos > 0 else 0.0
+    })
+    if almacen.filas == 0:
+        return asignar_tipos_datos(pd.DataFrame(columns=nombres_salida)), info
+    return almacen.a_dataframe(), info
@@ -0,0 +1,203 @@
+"""
+Carga paginada y paralela de datos desde la API Socrata (SODA)
+"""
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import COLUMNAS_AGRUPACION, VARIABLES_ESTADISTICAS, aplicar_esquema_numerico
+
+# Parámetros por defecto de la descarga
+TAMANO_PAGINA = 50000
+MAX_WORKERS = 4
+MAX_REINTENTOS = 3
+BACKOFF_SEGUNDOS = 0.5
+TIMEOUT_SEGUNDOS = 60
+
+# Códigos HTTP que justifican reintentar la petición
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Campos de sistema de Socrata (identificador estable y fecha de última modificación)
+CAMPO_ID = ':id'
+CAMPO_ACTUALIZADO = ':updated_at'
+
+# Nombres de campo válidos en SoQL (los de la API son siempre snake_case)
+_PATRON_CAMPO = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+def construir_url_recurso(domain: str, dataset_id: str) -> str:
+    """
+    Construye la URL del endpoint SODA del dataset.
+    Si el dominio no trae esquema se asume https (permite servidores locales de prueba).
+    """
+    base = domain.strip().rstrip('/')
+    if not base.startswith(('http://', 'https://')):
+        base = f"https://{base}"
+    return f"{base}/resource/{dataset_id}.json"
+
+
+def crear_sesion(app_token: str = None, pool_size: int = MAX_WORKERS) -> requests.Session:
+    """Crea una sesión HTTP con un pool de conexiones compartido por todos los hilos"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept'] = 'application/json'
+    if app_token:
+        session.headers['X-App-Token'] = app_token
+    return session
+
+
+def _get_json(
+    session: requests.Session,
+    url: str,
+    params: Dict,
+    timeout: float = TIMEOUT_SEGUNDOS,
+    max_reintentos: int = MAX_REINTENTOS,
+    backoff: float = BACKOFF_SEGUNDOS
+) -> List[Dict]:
+    """GET con reintentos y espera exponencial ante errores de red o del servidor"""
+    for intento in range(max_reintentos + 1):
+        try:
+            resp = session.get(url, params=params, timeout=timeout)
+            if resp.status_code in CODIGOS_REINTENTABLES:
+                raise requests.HTTPError(f"HTTP {resp.status_code}", response=resp)
+            resp.raise_for_status()
+            return resp.json()
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            status = e.response.status_code if e.response is not None else None
+            reintentable = status is None or status in CODIGOS_REINTENTABLES
+            if not reintentable or intento == max_reintentos:
+                raise
+            time.sleep(backoff * (2 ** intento))
+
+
+def _validar_campo(campo: str) -> str:
+    if not _PATRON_CAMPO.match(campo):
+        raise ValueError(f"Nombre de columna no válido para SoQL: {campo!r}")
+    return campo
+
+
+def _literal_soql(valor) -> str:
+    """Literal de texto SoQL con comillas simples escapadas"""
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def construir_consulta_soql(
+    columnas: List[str] = None,
+    filtros: Dict[str, List[str]] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Construye los parámetros $select y $where para descargar solo lo necesario.
+
+    - columnas: lista de columnas a proyectar (None descarga todas).
+    - filtros: {columna: [valores]} combinados con AND entre columnas e IN dentro de cada una.
+    """
+    select = None
+    if columnas:
+        select = ', '.join(_validar_campo(c) for c in dict.fromkeys(columnas))
+
+    condiciones = []
+    for campo, valores in (filtros or {}).items():
+        valores = [v for v in (valores or []) if str(v).strip()]
+        if not valores:
+            continue
+        literales = ', '.join(_literal_soql(str(v).strip()) for v in valores)
+        condiciones.append(f"{_validar_campo(campo)} IN ({literales})")
+    where = ' AND '.join(condiciones) if condiciones else None
+
+    return {'select': select, 'where': where}
+
+
+def consulta_variables_analisis(filtros: Dict[str, List[str]] = None) -> Dict[str, Optional[str]]:
+    """Consulta con las variables de análisis y las columnas de agrupación de utils"""
+    return construir_consulta_soql(VARIABLES_ESTADISTICAS + COLUMNAS_AGRUPACION, filtros)
+
+
+def contar_registros(session: requests.Session, url: str, where: str = None, **kwargs) -> int:
+    """Obtiene el número total de registros del dataset con count(*)"""
+    params = {'$select': 'count(*)'}
+    if where:
+        params['$where'] = where
+    resultado = _get_json(session, url, params, **kwargs)
+    if not resultado:
+        return 0
+    return int(next(iter(resultado[0].values())))
+
+
+def cargar_dataset_socrata(
+    domain: str,
+    dataset_id: str,
+    limit: Optional[int] = None,
+    app_token: str = None,
+    tamano_pagina: int = TAMANO_PAGINA,
+    max_workers: int = MAX_WORKERS,
+    max_reintentos: int = MAX_REINTENTOS,
+    backoff: float = BACKOFF_SEGUNDOS,
+    timeout: float = TIMEOUT_SEGUNDOS,
+    progreso: Callable[[int, int], None] = None,
+    where: str = None,
+    campos_sistema: bool = False,
+    select: str = None
+) -> pd.DataFrame:
+    """
+    Descarga el dataset en páginas $limit/$offset concurrentes y las une en orden.
+    Con limit=None se descargan todos los registros reportados por count(*).
+    select/where se envían al servidor ($select/$where) para reducir la descarga.
+    Con campos_sistema=True se incluyen :id y :updated_at (necesarios para el caché).
+    """
+    url = construir_url_recurso(domain, dataset_id)
+    opciones_get = {'timeout': timeout, 'max_reintentos': max_reintentos, 'backoff': backoff}
+
+    with crear_sesion(app_token, pool_size=max_workers) as session:
+        total = contar_registros(session, url, where=where, **opciones_get)
+        if limit is not None:
+            total = min(total, int(limit))
+        if total <= 0:
+            return pd.DataFrame()
+
+        offsets = list(range(0, total, tamano_pagina))
+
+        def descargar_pagina(offset: int) -> pd.DataFrame:
+            params = {
+                '$limit': min(tamano_pagina, total - offset),
+                '$offset': offset,
+                # Orden estable para que las páginas no se solapen
+                '$order': CAMPO_ID
+            }
+            if where:
+                params['$where'] = where
+            if campos_sistema:
+                params['$select'] = f"{CAMPO_ID}, {CAMPO_ACTUALIZADO}, {select}" if select else ':*, *'
+            elif select:
+                params['$select'] = select
+            registros = _get_json(session, url, params, **opciones_get)
+            # Las columnas del esquema se convierten a float al construir cada página
+            return aplicar_esquema_numerico(pd.DataFrame.from_records(registros))
+
+        paginas = [None] * len(offsets)
+        filas_descargadas = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futuros = {executor.submit(descargar_pagina, off): i for i, off in enumerate(offsets)}
+            try:
+                for futuro in as_completed(futuros):
+                    i = futuros[futuro]
+                    paginas[i] = futuro.result()
+                    filas_descargadas += len(paginas[i])
+                    if progreso is not None:
+                        progreso(filas_descargadas, total)
+            except BaseException:
+                # Error o cancelación desde el callback: no se descargan las páginas pendientes
+                for pendiente in futuros:
+                    pendiente.cancel()
+                raise
+
+    paginas = [p for p in paginas if not p.empty]
+    if not paginas:
+        return pd.DataFrame()
+    return pd.concat(paginas, ignore_index=True)
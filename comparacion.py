@@ -0,0 +1,190 @@
+"""
+Comparación fila a fila entre los datos originales y los procesados mediante huellas de fila
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from normalizacion import NOMBRES_CANONICOS, VALORES_NULOS_TEXTO, codificar_texto, plegar_texto
+from utils import COLUMNAS_AGRUPACION, convertir_texto_a_numerico, restaurar_float64
+
+# Motivos de eliminación de una fila
+MOTIVO_VACIA = 'Fila vacía'
+MOTIVO_SIN_NUMERICOS = 'Sin datos numéricos válidos'
+MOTIVO_OTRO = 'Filtrada o modificada'
+
+
+def _es_numerica(serie: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie)
+
+
+def _a_float64(serie: pd.Series) -> pd.Series:
+    if serie.dtype == 'float32':
+        return restaurar_float64(serie)
+    return serie.astype(np.float64)
+
+
+def _clave_texto(serie: pd.Series, canonica: bool) -> Tuple[pd.Series, np.ndarray]:
+    """
+    Texto sin espacios sobrantes y con los textos nulos como None; con canonica=True
+    además en forma plegada y canónica. Devuelve también la máscara de nulos de texto.
+    """
+    codigos, textos = codificar_texto(serie)
+    claves = np.empty(len(textos), dtype=object)
+    for i, texto in enumerate(textos):
+        texto = texto.strip()
+        if texto in VALORES_NULOS_TEXTO:
+            claves[i] = None
+        elif canonica:
+            clave = plegar_texto(texto)
+            claves[i] = plegar_texto(NOMBRES_CANONICOS[clave]) if clave in NOMBRES_CANONICOS else clave
+        else:
+            claves[i] = texto
+    valores = claves.take(codigos)
+    return pd.Series(valores, index=serie.index, name=serie.name), pd.isna(valores)
+
+
+def normalizar_para_comparar(
+    df_original: pd.DataFrame, df_procesado: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Lleva las columnas comunes de ambos DataFrames a una forma comparable
+    (la conversión numérica del procesado se reproduce en el original; el texto se
+    compara sin espacios y, en las columnas de agrupación, en forma canónica).
+    Devuelve (original_normalizado, procesado_normalizado, celdas_a_nan por columna).
+    """
+    columnas = [c for c in df_original.columns if c in df_procesado.columns]
+    norm_original, norm_procesado, celdas_a_nan = {}, {}, {}
+    for col in columnas:
+        original, procesado = df_original[col], df_procesado[col]
+        if _es_numerica(procesado):
+            norm_procesado[col] = _a_float64(procesado)
+            if _es_numerica(original):
+                norm_original[col] = _a_float64(original)
+            else:
+                norm_original[col] = _a_float64(convertir_texto_a_numerico(original))
+                _, nulos_texto = _clave_texto(original, canonica=False)
+                a_nan = norm_original[col].isna().to_numpy() & ~nulos_texto
+                if a_nan.any():
+                    celdas_a_nan[col] = a_nan
+        else:
+            canonica = col in COLUMNAS_AGRUPACION
+            norm_original[col], _ = _clave_texto(original, canonica)
+            norm_procesado[col], _ = _clave_texto(procesado, canonica)
+
+    return (
+        pd.DataFrame(norm_original, index=df_original.index, columns=columnas),
+        pd.DataFrame(norm_procesado, index=df_procesado.index, columns=columnas),
+        celdas_a_nan
+    )
+
+
+def _huellas(df: pd.DataFrame) -> np.ndarray:
+    """Huella de 64 bits por fila (vectorizada, sin el índice)"""
+    if len(df.columns) == 0:
+        return np.zeros(len(df), dtype=np.uint64)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _ocurrencia(codigos: np.ndarray) -> np.ndarray:
+    """Número de ocurrencia (0, 1, 2...) de cada fila dentro de su huella"""
+    return pd.Series(codigos).groupby(codigos).cumcount().to_numpy()
+
+
+def comparar_dataframes(df_original: pd.DataFrame, df_procesado: pd.DataFrame) -> Dict:
+    """
+    Diferencias entre los datos originales y los procesados en tiempo lineal.
+
+    Cada fila se resume en una huella; las huellas del original se emparejan con las
+    del procesado por conteo (sin comparaciones entre pares de filas):
+    - Filas eliminadas: huellas ausentes del procesado, con su motivo.
+    - Duplicados eliminados: ocurrencias de una huella que sobran respecto al procesado.
+    - Celdas convertidas a NaN: texto no nulo que no pudo convertirse a número.
+    - Filas sin correspondencia: filas del procesado que no salen de ninguna original.
+    """
+    norm_original, norm_procesado, celdas_a_nan = normalizar_para_comparar(df_original, df_procesado)
+    n_original, n_procesado = len(df_original), len(df_procesado)
+
+    codigos, _ = pd.factorize(np.concatenate([_huellas(norm_original), _huellas(norm_procesado)]))
+    codigos_original, codigos_procesado = codigos[:n_original], codigos[n_original:]
+    n_huellas = int(codigos.max()) + 1 if len(codigos) else 0
+    conteo_original = np.bincount(codigos_original, minlength=n_huellas)
+    conteo_procesado = np.bincount(codigos_procesado, minlength=n_huellas)
+
+    ocurrencia_original = _ocurrencia(codigos_original)
+    conservada = ocurrencia_original < conteo_procesado[codigos_original]
+    sin_huella_procesada = conteo_procesado[codigos_original] == 0
+    eliminada = ~conservada & sin_huella_procesada
+    duplicada = ~conservada & ~sin_huella_procesada
+
+    # Primera aparición de cada huella en el original (asignación inversa: gana la primera)
+    primera = np.zeros(n_huellas, dtype=np.intp)
+    posiciones = np.arange(n_original)
+    primera[codigos_original[::-1]] = posiciones[::-1]
+
+    # Motivo de cada fila eliminada
+    numericas = [c for c in norm_original.columns if _es_numerica(norm_procesado[c])]
+    nulos = norm_original.isna().to_numpy()
+    motivos = np.full(n_original, MOTIVO_OTRO, dtype=object)
+    if numericas:
+        sin_numericos = norm_original[numericas].isna().all(axis=1).to_numpy()
+        motivos[sin_numericos] = MOTIVO_SIN_NUMERICOS
+    motivos[nulos.all(axis=1) if nulos.shape[1] else np.ones(n_original, dtype=bool)] = MOTIVO_VACIA
+
+    filas_eliminadas = df_original[eliminada].copy()
+    filas_eliminadas.insert(0, 'motivo', motivos[eliminada])
+
+    filas_duplicadas = df_original[duplicada].copy()
+    filas_duplicadas.insert(0, 'duplicado_de', df_original.index.to_numpy()[primera[codigos_original[duplicada]]])
+
+    ocurrencia_procesado = _ocurrencia(codigos_procesado)
+    sin_correspondencia = ocurrencia_procesado >= conteo_original[codigos_procesado]
+
+    # Celdas convertidas a NaN en formato largo
+    partes = []
+    for col, mascara in celdas_a_nan.items():
+        posiciones_col = np.flatnonzero(mascara)
+        partes.append(pd.DataFrame({
+            'fila': df_original.index.to_numpy()[posiciones_col],
+            'columna': col,
+            'valor_original': df_original[col].to_numpy()[posiciones_col].astype(str),
+            'fila_conservada': conservada[posiciones_col]
+        }))
+    celdas = (
+        pd.concat(partes, ignore_index=True) if partes
+        else pd.DataFrame(columns=['fila', 'columna', 'valor_original', 'fila_conservada'])
+    )
+
+    return {
+        'filas_original': n_original,
+        'filas_procesado': n_procesado,
+        'filas_conservadas': int(conservada.sum()),
+        'filas_eliminadas': filas_eliminadas,
+        'filas_duplicadas': filas_duplicadas,
+        'celdas_a_nan': celdas,
+        'celdas_a_nan_por_columna': {col: int(m.sum()) for col, m in celdas_a_nan.items()},
+        'filas_sin_correspondencia': df_procesado[sin_correspondencia],
+        'columnas_eliminadas': [c for c in df_original.columns if c not in df_procesado.columns],
+        'columnas_nuevas': [c for c in df_procesado.columns if c not in df_original.columns],
+    }
+
+
+def resumen_diferencias(diff: Dict) -> List[str]:
+    """Resumen en texto, con el mismo estilo del reporte de limpieza"""
+    resumen = [f"📊 Filas: {diff['filas_original']} → {diff['filas_procesado']}"]
+    if len(diff['filas_eliminadas']) > 0:
+        motivos = diff['filas_eliminadas']['motivo'].value_counts()
+        detalle = ', '.join(f"{m}: {n}" for m, n in motivos.items())
+        resumen.append(f"🗑️ {len(diff['filas_eliminadas'])} filas eliminadas ({detalle})")
+    if len(diff['filas_duplicadas']) > 0:
+        resumen.append(f"🗑️ {len(diff['filas_duplicadas'])} filas duplicadas eliminadas")
+    for col, n in diff['celdas_a_nan_por_columna'].items():
+        resumen.append(f"🔢 Columna '{col}': {n} valores convertidos a NaN")
+    if diff['columnas_eliminadas']:
+        resumen.append(f"🗑️ Columnas eliminadas: {', '.join(map(str, diff['columnas_eliminadas']))}")
+    if len(diff['filas_sin_correspondencia']) > 0:
+        resumen.append(
+            f"⚠️ {len(diff['filas_sin_correspondencia'])} filas procesadas sin correspondencia en el original"
+        )
+    return resumen
@@ -0,0 +1,382 @@
+"""
+Motor vectorizado de estadísticos descriptivos sobre la matriz de una VistaNumerica
+"""
+import warnings
+from typing import Dict, Tuple
+
+import numpy as np
+
+from utils import VistaNumerica
+
+# Probabilidades que se calculan juntas en una sola llamada a nanquantile
+PROBABILIDADES = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+# Celdas (filas × variables) por bloque al recalcular los rangos de cada par en Spearman
+CELDAS_BLOQUE_RANGOS = 4_000_000
+
+# Máscaras de nulos distintas hasta las que Spearman recalcula los rangos de cada par;
+# con más se usan los rangos de toda la columna (ver correlacion_spearman_por_pares)
+MAX_MASCARAS_SPEARMAN_EXACTO = 32
+
+
+def _cero_si_error_redondeo(valores: np.ndarray) -> np.ndarray:
+    """Igual que pandas: valores por debajo de 1e-14 se tratan como cero"""
+    with np.errstate(invalid='ignore'):
+        return np.where(np.abs(valores) < 1e-14, 0, valores)
+
+
+def varianza_muestral(conteo: np.ndarray, m2: np.ndarray) -> np.ndarray:
+    """Varianza con ddof=1 a partir de la suma de cuadrados centrada (NaN con menos de 2 datos)"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        varianza = m2 / (conteo - 1)
+    varianza[conteo - 1 <= 0] = np.nan
+    return varianza
+
+
+def asimetria_curtosis(conteo: np.ndarray, m2: np.ndarray, m3: np.ndarray,
+                       m4: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Asimetría y curtosis insesgadas (fórmulas de pandas) a partir del conteo y de
+    las sumas de potencias 2, 3 y 4 de las desviaciones respecto a la media
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m2_skew = _cero_si_error_redondeo(m2)
+        m3_skew = _cero_si_error_redondeo(m3)
+        asimetria = (conteo * (conteo - 1) ** 0.5 / (conteo - 2)) * (m3_skew / m2_skew ** 1.5)
+        asimetria = np.where(m2_skew == 0, 0, asimetria)
+        asimetria[conteo < 3] = np.nan
+
+        ajuste = 3 * (conteo - 1) ** 2 / ((conteo - 2) * (conteo - 3))
+        numerador = _cero_si_error_redondeo(conteo * (conteo + 1) * (conteo - 1) * m4)
+        denominador = _cero_si_error_redondeo((conteo - 2) * (conteo - 3) * m2 ** 2)
+        curtosis = numerador / denominador - ajuste
+        curtosis = np.where(denominador == 0, 0, curtosis)
+        curtosis[conteo < 4] = np.nan
+    return asimetria, curtosis
+
+
+def describir_matriz(matriz: np.ndarray, nulos: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Estadísticos por columna de una matriz float64 con NaN, con las mismas fórmulas
+    que pandas (media, desviación con ddof=1, asimetría y curtosis insesgadas,
+    cuantiles con interpolación lineal):
+
+    - Pasada 1: conteo y suma.
+    - Pasada 2: desviaciones respecto a la media y sus potencias 2, 3 y 4.
+    - Cuantiles: una sola llamada a nanquantile con todas las probabilidades.
+    """
+    conteo = (~nulos).sum(axis=0).astype(np.float64)
+    rellenos = np.where(nulos, 0.0, matriz)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = rellenos.sum(axis=0, dtype=np.float64) / conteo
+        desviacion = np.where(nulos, 0.0, rellenos - media)
+        d2 = desviacion ** 2
+        m2 = d2.sum(axis=0)
+        m3 = (d2 * desviacion).sum(axis=0)
+        m4 = (d2 ** 2).sum(axis=0)
+        del rellenos, desviacion, d2
+
+        std = np.sqrt(varianza_muestral(conteo, m2))
+        asimetria, curtosis = asimetria_curtosis(conteo, m2, m3, m4)
+
+    if matriz.shape[0] > 0 and matriz.shape[1] > 0:
+        with warnings.catch_warnings():
+            # Columnas sin datos: nanquantile devuelve NaN y avisa
+            warnings.simplefilter('ignore', RuntimeWarning)
+            cuantiles = np.nanquantile(matriz, PROBABILIDADES, axis=0)
+    else:
+        cuantiles = np.full((len(PROBABILIDADES), matriz.shape[1]), np.nan)
+
+    return {
+        'conteo': conteo.astype(np.int64),
+        'nulos': nulos.sum(axis=0),
+        'media': media,
+        'std': std,
+        'minimo': cuantiles[0],
+        'q1': cuantiles[1],
+        'mediana': cuantiles[2],
+        'q3': cuantiles[3],
+        'maximo': cuantiles[4],
+        'asimetria': asimetria,
+        'curtosis': curtosis,
+    }
+
+
+def obtener_descriptivos(vista: VistaNumerica) -> Dict[str, np.ndarray]:
+    """Estadísticos de la vista, calculados una sola vez y guardados en ella"""
+    if 'descriptivos' not in vista.cache:
+        vista.cache['descriptivos'] = describir_matriz(vista.matriz, vista.nulos)
+    return vista.cache['descriptivos']
+
+
+def correlacion_por_pares(matriz: np.ndarray, nulos: np.ndarray) -> np.ndarray:
+    """
+    Correlación de Pearson con pares completos (como DataFrame.corr): cada par
+    usa solo las filas donde ambas variables tienen dato. Conteos, sumas y sumas
+    de cuadrados por par salen de productos de matrices con la máscara de válidos,
+    sobre las columnas ya centradas y escaladas para evitar cancelaciones.
+    """
+    validos = (~nulos).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.where(nulos, 0.0, matriz).sum(axis=0) / validos.sum(axis=0)
+        centrados = np.where(nulos, 0.0, matriz - media)
+        escala = np.abs(centrados).max(axis=0, initial=0.0)
+        x = centrados / np.where(escala > 0, escala, 1.0)
+
+        n = validos.T @ validos
+        suma = x.T @ validos                 # suma[i, j]: suma de la variable i en las filas válidas de j
+        cuadrados = (x * x).T @ validos
+        covarianza = x.T @ x - suma * suma.T / n
+        varianza = cuadrados - suma ** 2 / n
+        correlacion = covarianza / np.sqrt(varianza * varianza.T)
+
+    # Sin variabilidad en las filas del par (salvo error de redondeo) no hay correlación
+    sin_variabilidad = varianza <= 1e-14 * cuadrados
+    correlacion[sin_variabilidad | sin_variabilidad.T] = np.nan
+    np.clip(correlacion, -1, 1, out=correlacion)
+    diagonal = np.diag_indices_from(correlacion)
+    correlacion[diagonal] = np.where(np.isnan(correlacion[diagonal]), np.nan, 1.0)
+    return correlacion
+
+
+def _rangos_promedio(condicion: np.ndarray, inicio: np.ndarray, fin: np.ndarray,
+                     empates: bool = True) -> np.ndarray:
+    """
+    Rangos promedio (como rank(method='average')) de columnas ya ordenadas, contando
+    solo las posiciones donde `condicion` es verdadera (cero en las demás).
+    `inicio` y `fin` delimitan el grupo de empates de cada posición [inicio, fin);
+    sin empates el rango es directamente la suma acumulada.
+    """
+    acumulado = np.zeros((condicion.shape[0] + 1, condicion.shape[1]), dtype=np.int32)
+    np.cumsum(condicion, axis=0, out=acumulado[1:])
+    if empates:
+        antes = np.take_along_axis(acumulado, inicio, axis=0)
+        hasta = np.take_along_axis(acumulado, fin, axis=0)
+        rangos = (antes + hasta + 1) / 2
+    else:
+        rangos = acumulado[1:].astype(np.float64)
+    rangos *= condicion
+    return rangos
+
+
+def mascaras_nulos(nulos: np.ndarray) -> np.ndarray:
+    """Etiqueta por columna de su máscara de nulos (columnas con los mismos nulos comparten etiqueta)"""
+    if nulos.shape[0] == 0:
+        return np.zeros(nulos.shape[1], dtype=np.intp)
+    _, etiquetas = np.unique(np.packbits(~nulos, axis=0).T, axis=0, return_inverse=True)
+    return etiquetas.ravel()
+
+
+def spearman_exacto(nulos: np.ndarray) -> bool:
+    """True si correlacion_spearman_por_pares calcula los rangos de cada par (pocas máscaras de nulos)"""
+    return len(np.unique(mascaras_nulos(nulos))) <= MAX_MASCARAS_SPEARMAN_EXACTO
+
+
+def _bloques(indices: np.ndarray, ancho: int):
+    return (indices[desde:desde + ancho] for desde in range(0, len(indices), ancho))
+
+
+def correlacion_spearman_por_pares(matriz: np.ndarray, nulos: np.ndarray) -> np.ndarray:
+    """
+    Correlación de Spearman con pares completos. Cada columna se ordena una sola
+    vez y los rangos promedio sobre un subconjunto de filas salen de la suma
+    acumulada de su máscara en ese orden.
+
+    - Pares con la misma máscara de nulos: rangos de toda la columna (exacto).
+    - Hasta MAX_MASCARAS_SPEARMAN_EXACTO máscaras distintas: para cada par de
+      máscaras se calculan juntos los rangos de todas sus columnas en las filas
+      comunes y las correlaciones salen de un producto de matrices. Coincide con
+      DataFrame.corr(method='spearman'), que recalcula los rangos de cada par.
+    - Con más máscaras: Pearson con pares completos sobre los rangos de toda la
+      columna (aproximado). La diferencia con los rangos por par crece con la
+      fracción de nulos y baja con las filas; con nulos independientes por variable
+      se midió ≤ 5e-4 (20.000 filas), ≤ 2,5e-3 (2.000) y ≤ 1,8e-2 (200) con 20 % de
+      nulos, y ≤ 4,5e-2 con 200 filas y 40 % de nulos.
+    """
+    n, m = matriz.shape
+    validos = ~nulos
+    orden = np.argsort(matriz, axis=0, kind='stable').astype(np.int32)   # NaN al final
+    ordenados = np.take_along_axis(matriz, orden, axis=0)
+    validos_ordenados = np.take_along_axis(validos, orden, axis=0)
+
+    # Grupo de empates de cada posición ordenada: [inicio, fin)
+    posiciones = np.arange(n, dtype=np.int32)[:, None]
+    nuevo = np.ones((n, m), dtype=bool)
+    nuevo[1:] = ordenados[1:] != ordenados[:-1]
+    ultimo = np.ones((n, m), dtype=bool)
+    ultimo[:-1] = nuevo[1:]
+    inicio = np.maximum.accumulate(np.where(nuevo, posiciones, 0), axis=0)
+    fin = np.minimum.accumulate(np.where(ultimo, posiciones, n - 1)[::-1], axis=0)[::-1] + 1
+    empates = ((fin - posiciones > 1) & validos_ordenados).any(axis=0)
+    del ordenados, nuevo, ultimo
+
+    rangos = np.full((n, m), np.nan)
+    np.put_along_axis(rangos, orden, _rangos_promedio(validos_ordenados, inicio, fin), axis=0)
+    rangos[nulos] = np.nan
+    correlacion = correlacion_por_pares(rangos, nulos)
+    del rangos
+
+    etiquetas = mascaras_nulos(nulos)
+    grupos = [np.flatnonzero(etiquetas == g) for g in range(etiquetas.max(initial=-1) + 1)]
+    if len(grupos) > MAX_MASCARAS_SPEARMAN_EXACTO:
+        np.clip(correlacion, -1, 1, out=correlacion)
+        return correlacion
+
+    ancho = max(1, CELDAS_BLOQUE_RANGOS // max(2 * n, 1))
+    for a, grupo_a in enumerate(grupos):
+        for grupo_b in grupos[a + 1:]:
+            filas = validos[:, grupo_a[0]] & validos[:, grupo_b[0]]
+            centro = (filas.sum() + 1) / 2
+            for columnas_a in _bloques(grupo_a, ancho):
+                for columnas_b in _bloques(grupo_b, ancho):
+                    # Rangos de ambos bloques en las filas comunes (cero fuera de ellas)
+                    columnas = np.concatenate([columnas_a, columnas_b])
+                    orden_bloque = orden[:, columnas]
+                    condicion = filas[orden_bloque] & validos_ordenados[:, columnas]
+                    ordenados_bloque = _rangos_promedio(condicion, inicio[:, columnas], fin[:, columnas],
+                                                        empates[columnas].any())
+                    rangos = np.empty((n, len(columnas)))
+                    np.put_along_axis(rangos, orden_bloque, ordenados_bloque, axis=0)
+
+                    x = rangos[filas] - centro
+                    xa, xb = x[:, :len(columnas_a)], x[:, len(columnas_a):]
+                    varianza_a, varianza_b = (xa * xa).sum(axis=0), (xb * xb).sum(axis=0)
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        r = (xa.T @ xb) / np.sqrt(np.outer(varianza_a, varianza_b))
+                    r[(varianza_a == 0)[:, None] | (varianza_b == 0)[None, :]] = np.nan
+                    correlacion[np.ix_(columnas_a, columnas_b)] = r
+                    correlacion[np.ix_(columnas_b, columnas_a)] = r.T
+
+    np.clip(correlacion, -1, 1, out=correlacion)
+    return correlacion
+
+
+def obtener_correlaciones(vista: VistaNumerica, metodo: str = 'pearson') -> np.ndarray:
+    """
+    Matriz de correlación de la vista ('pearson' o 'spearman'), calculada una sola
+    vez por método y guardada en ella. Ambas usan pares completos, igual que
+    DataFrame.corr (Spearman solo de forma aproximada con más de
+    MAX_MASCARAS_SPEARMAN_EXACTO máscaras de nulos, ver spearman_exacto).
+    """
+    clave = f'correlacion_{metodo}'
+    if clave not in vista.cache:
+        if metodo == 'pearson':
+            vista.cache[clave] = correlacion_por_pares(vista.matriz, vista.nulos)
+        elif metodo == 'spearman':
+            vista.cache[clave] = correlacion_spearman_por_pares(vista.matriz, vista.nulos)
+        else:
+            raise ValueError(f"Método de correlación desconocido: {metodo}")
+    return vista.cache[clave]
+
+
+def pares_mas_correlacionados(correlacion: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Posiciones (i, j), i < j, de los k pares con mayor correlación absoluta, de
+    mayor a menor: triángulo superior y selección parcial con argpartition (sin
+    ordenar todos los pares)
+    """
+    i, j = np.triu_indices(correlacion.shape[0], k=1)
+    valores = correlacion[i, j]
+    candidatos = np.flatnonzero(~np.isnan(valores))
+    absolutos = np.abs(valores[candidatos])
+    if k < len(candidatos):
+        mejores = np.argpartition(-absolutos, k - 1)[:k]
+        candidatos, absolutos = candidatos[mejores], absolutos[mejores]
+    # Empates en el orden de la matriz
+    orden = candidatos[np.lexsort((candidatos, -absolutos))]
+    return i[orden], j[orden]
+
+
+def cuantiles_por_segmentos(ordenados: np.ndarray, inicios: np.ndarray, conteos: np.ndarray,
+                            probabilidades) -> np.ndarray:
+    """
+    Cuantiles con interpolación lineal de segmentos ya ordenados de un arreglo
+    (segmento s: ordenados[inicios[s]:inicios[s] + conteos[s]]), con las mismas
+    operaciones que np.quantile. Devuelve (segmentos × probabilidades), NaN en
+    los segmentos vacíos.
+    """
+    probabilidades = np.asarray(probabilidades, dtype=np.float64)
+    conteos = np.asarray(conteos, dtype=np.float64)[:, np.newaxis]
+    if len(ordenados) == 0:
+        return np.full((len(conteos), len(probabilidades)), np.nan)
+
+    virtual = conteos * probabilidades + (1 - probabilidades) - 1
+    anterior = np.floor(virtual)
+    siguiente = anterior + 1
+    arriba = np.broadcast_to(virtual >= conteos - 1, virtual.shape)
+    anterior[arriba] = siguiente[arriba] = np.broadcast_to(conteos - 1, virtual.shape)[arriba]
+    anterior[virtual < 0] = siguiente[virtual < 0] = 0
+    gamma = virtual - anterior
+
+    inicios = np.asarray(inicios, dtype=np.intp)[:, np.newaxis]
+    limite = len(ordenados) - 1
+    a = ordenados[np.clip(inicios + anterior.astype(np.intp), 0, limite)]
+    b = ordenados[np.clip(inicios + siguiente.astype(np.intp), 0, limite)]
+    diferencia = b - a
+    cuantiles = np.where(gamma >= 0.5, b - diferencia * (1 - gamma), a + diferencia * gamma)
+    cuantiles[np.broadcast_to(conteos == 0, cuantiles.shape)] = np.nan
+    return cuantiles
+
+
+def describir_por_grupos(matriz: np.ndarray, nulos: np.ndarray, codigos: np.ndarray,
+                         factor_iqr: float = 1.5) -> Dict[str, np.ndarray]:
+    """
+    describir_matriz para cada grupo de filas en una sola pasada. codigos asigna
+    a cada fila su grupo (0..G-1, todos con al menos una fila, como ngroup):
+
+    - Las filas se ordenan por grupo una vez; conteo, suma y sumas de potencias
+      por grupo salen de np.add.reduceat sobre la matriz ordenada.
+    - Cuantiles: cada columna se ordena dentro de los grupos (lexsort) y se
+      interpolan todos los grupos a la vez (cuantiles_por_segmentos).
+    - Outliers IQR por grupo con los cuartiles de su propio grupo.
+
+    Devuelve arreglos (grupos × columnas) y 'filas', el tamaño de cada grupo.
+    """
+    orden = np.argsort(codigos, kind='stable')
+    grupos = codigos[orden]
+    filas = np.bincount(codigos)
+    inicios = np.concatenate([[0], np.cumsum(filas)[:-1]])
+    matriz, nulos = matriz[orden], nulos[orden]
+
+    conteo = np.add.reduceat(~nulos, inicios, axis=0, dtype=np.int64).astype(np.float64)
+    rellenos = np.where(nulos, 0.0, matriz)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.add.reduceat(rellenos, inicios, axis=0) / conteo
+        desviacion = np.where(nulos, 0.0, rellenos - media[grupos])
+        d2 = desviacion ** 2
+        m2 = np.add.reduceat(d2, inicios, axis=0)
+        m3 = np.add.reduceat(d2 * desviacion, inicios, axis=0)
+        m4 = np.add.reduceat(d2 ** 2, inicios, axis=0)
+        del rellenos, desviacion, d2
+
+        std = np.sqrt(varianza_muestral(conteo, m2))
+        asimetria, curtosis = asimetria_curtosis(conteo, m2, m3, m4)
+
+    # Dentro de cada grupo los NaN quedan al final, detrás de los conteo valores válidos
+    cuantiles = np.empty((len(PROBABILIDADES),) + conteo.shape)
+    for j in range(matriz.shape[1]):
+        ordenados = matriz[np.lexsort((matriz[:, j], grupos)), j]
+        cuantiles[:, :, j] = cuantiles_por_segmentos(ordenados, inicios, conteo[:, j], PROBABILIDADES).T
+
+    rango_iqr = cuantiles[3] - cuantiles[1]
+    with np.errstate(invalid='ignore'):
+        fuera = ((matriz < (cuantiles[1] - factor_iqr * rango_iqr)[grupos]) |
+                 (matriz > (cuantiles[3] + factor_iqr * rango_iqr)[grupos]))
+
+    return {
+        'filas': filas,
+        'conteo': conteo.astype(np.int64),
+        'nulos': filas[:, np.newaxis] - conteo.astype(np.int64),
+        'media': media,
+        'std': std,
+        'minimo': cuantiles[0],
+        'q1': cuantiles[1],
+        'mediana': cuantiles[2],
+        'q3': cuantiles[3],
+        'maximo': cuantiles[4],
+        'asimetria': asimetria,
+        'curtosis': curtosis,
+        'outliers_iqr': np.add.reduceat(fuera, inicios, axis=0, dtype=np.int64),
+    }
@@ -0,0 +1,186 @@
+"""
+Estadísticos e ICD de archivos CSV o Parquet más grandes que la memoria: el archivo
+se recorre por bloques y solo se guardan agregados parciales (ResumenSketches) y, en
+disco, una huella por fila para contar duplicados, así que el pico de memoria depende
+del tamaño de bloque y no del tamaño del archivo
+"""
+import os
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from calidad_datos import calcular_indice_calidad_desde_resumen
+from carga_archivos import TAMANO_BLOQUE, iterar_bloques_archivo
+from incremental import huellas_filas
+from outliers import PARAMETROS_OUTLIERS
+from sketches import ResumenSketches
+from utils import preparar_dataframe_numerico
+from visualizaciones import calcular_estadisticos_desde_resumen
+
+# Archivos temporales entre los que se reparten las huellas de fila al contar duplicados
+PARTICIONES_DUPLICADOS = 64
+
+# Tamaño (bytes) desde el que la carga de archivos ofrece el análisis por bloques
+TAMANO_MINIMO_FUERA_DE_MEMORIA = 100 * 1024 ** 2
+
+
+class ContadorDuplicados:
+    """
+    Conteo exacto de filas duplicadas sin tener todas las filas en memoria. La
+    huella de 64 bits de cada fila (incremental.huellas_filas: iguales para las
+    filas que df.duplicated considera repetidas, salvo colisiones) se añade al
+    archivo de su partición; al final cada partición se carga sola y se cuentan
+    sus huellas repetidas. Las filas iguales siempre caen en la misma partición.
+    """
+
+    def __init__(self, particiones: int = PARTICIONES_DUPLICADOS):
+        self.particiones = particiones
+        self._directorio = tempfile.TemporaryDirectory(prefix='huellas_')
+        self.filas = 0
+
+    def _ruta(self, particion: int) -> str:
+        return os.path.join(self._directorio.name, f'{particion}.bin')
+
+    def agregar(self, matriz: np.ndarray):
+        """Añade las filas de un bloque (matriz numérica con NaN)"""
+        huellas = huellas_filas(matriz)
+        particion = huellas % np.uint64(self.particiones)
+        orden = np.argsort(particion, kind='stable')
+        limites = np.searchsorted(particion[orden], np.arange(self.particiones + 1))
+        for p in np.flatnonzero(np.diff(limites)):
+            with open(self._ruta(p), 'ab') as archivo:
+                huellas[orden[limites[p]:limites[p + 1]]].tofile(archivo)
+        self.filas += len(huellas)
+
+    def contar(self) -> int:
+        """Filas repetidas (filas menos filas distintas); borra los archivos temporales"""
+        try:
+            distintas = 0
+            for p in range(self.particiones):
+                if os.path.exists(self._ruta(p)):
+                    distintas += len(np.unique(np.fromfile(self._ruta(p), dtype=np.uint64)))
+            return self.filas - distintas
+        finally:
+            self._directorio.cleanup()
+
+
+def escribir_outliers_iqr(bloques: Iterable[pd.DataFrame], resumen: ResumenSketches, limite_inferior: np.ndarray,
+                          limite_superior: np.ndarray, ruta_outliers: str,
+                          avance: Callable[[int], None] = None,
+                          duplicados: ContadorDuplicados = None) -> Dict[str, np.ndarray]:
+    """
+    Cuenta por variable los valores fuera de los límites IQR y escribe en
+    ruta_outliers (CSV) cada fila con algún outlier, con su posición en el archivo
+    ('fila') y la columna variables_con_outlier. Devuelve el formato de
+    ResumenSketches.outliers_iqr más mínimo y máximo de los outliers y filas_con_outliers.
+    Con duplicados, las filas de cada bloque se añaden también a ese contador.
+    """
+    variables = np.array(resumen.variables, dtype=object)
+    conteo = np.zeros(len(variables), dtype=np.int64)
+    minimo = np.full(len(variables), np.inf)
+    maximo = np.full(len(variables), -np.inf)
+    filas_con_outliers = 0
+
+    with open(ruta_outliers, 'w', newline='', encoding='utf-8') as salida:
+        encabezado = True
+        for bloque in bloques:
+            numerico = preparar_dataframe_numerico(bloque, resumen.variables_solicitadas)
+            matriz = numerico.reindex(columns=resumen.variables).to_numpy(dtype=np.float64)
+            if duplicados is not None:
+                duplicados.agregar(matriz)
+            with np.errstate(invalid='ignore'):
+                fuera = (matriz < limite_inferior) | (matriz > limite_superior)
+            conteo += fuera.sum(axis=0)
+            if len(bloque) > 0:
+                minimo = np.minimum(minimo, np.where(fuera, matriz, np.inf).min(axis=0))
+                maximo = np.maximum(maximo, np.where(fuera, matriz, -np.inf).max(axis=0))
+
+            filas = fuera.any(axis=1)
+            filas_outliers = bloque[filas].copy()
+            filas_outliers['variables_con_outlier'] = [', '.join(variables[f]) for f in fuera[filas]]
+            filas_outliers.to_csv(salida, header=encabezado, index_label='fila')
+            encabezado = False
+            filas_con_outliers += int(filas.sum())
+            if avance is not None:
+                avance(len(bloque))
+
+        if encabezado:
+            pd.DataFrame(columns=resumen.columnas_datos + ['variables_con_outlier']).to_csv(
+                salida, index_label='fila'
+            )
+
+    return {
+        'limite_inferior': limite_inferior, 'limite_superior': limite_superior, 'conteo': conteo,
+        'min_outlier': np.where(conteo > 0, minimo, np.nan),
+        'max_outlier': np.where(conteo > 0, maximo, np.nan),
+        'filas_con_outliers': filas_con_outliers
+    }
+
+
+def analizar_archivo_por_bloques(
+    ruta: str,
+    variables: List[str] = None,
+    columnas_esperadas: List[str] = None,
+    ruta_outliers: str = None,
+    tamano_bloque: int = TAMANO_BLOQUE,
+    factor_iqr: float = PARAMETROS_OUTLIERS['iqr']['factor'],
+    progreso: Callable[[Dict], None] = None,
+    cancelacion: Callable[[], None] = None,
+    **kwargs_csv
+) -> Dict:
+    """
+    Tabla de estadísticos e ICD de un CSV o Parquet en dos pasadas por bloques:
+
+    1. ResumenSketches del archivo (momentos exactos, cuantiles KLL, distintos
+       HLL): las seis dimensiones del ICD y la tabla, como calcular_*_desde_resumen.
+    2. Con los límites IQR del resumen se cuentan los outliers de forma exacta y las
+       filas con outliers se escriben en ruta_outliers (CSV; por defecto un temporal).
+       La misma pasada cuenta las filas duplicadas de forma exacta (ContadorDuplicados).
+
+    La precisión usa IQR (K-means y SVM necesitan todos los datos en memoria).
+    progreso recibe etapa, filas, bloques y segundos después de cada bloque;
+    cancelacion se pasa a iterar_bloques_archivo (interrumpe también la lectura de un bloque).
+    Devuelve estadisticos, icd, ruta_outliers, filas, filas_duplicadas y segundos.
+    """
+    inicio = time.perf_counter()
+    info = {'etapa': 'resumen', 'filas': 0, 'bloques': 0, 'segundos': 0.0}
+
+    def avance(filas: int):
+        info.update({
+            'filas': info['filas'] + filas, 'bloques': info['bloques'] + 1,
+            'segundos': time.perf_counter() - inicio
+        })
+        if progreso is not None:
+            progreso(dict(info))
+
+    def bloques() -> Iterable[pd.DataFrame]:
+        return iterar_bloques_archivo(ruta, tamano_bloque, cancelacion=cancelacion, **kwargs_csv)
+
+    resumen = ResumenSketches(variables)
+    for bloque in bloques():
+        resumen.actualizar(bloque)
+        avance(len(bloque))
+
+    if ruta_outliers is None:
+        with tempfile.NamedTemporaryFile(prefix='outliers_', suffix='.csv', delete=False) as temporal:
+            ruta_outliers = temporal.name
+    info.update({'etapa': 'outliers', 'filas': 0, 'bloques': 0})
+    iqr = resumen.outliers_iqr(factor_iqr)
+    duplicados = ContadorDuplicados()
+    outliers_iqr = escribir_outliers_iqr(
+        bloques() if resumen.variables else [], resumen,
+        iqr['limite_inferior'], iqr['limite_superior'], ruta_outliers, avance, duplicados
+    )
+    filas_duplicadas = duplicados.contar()
+
+    return {
+        'estadisticos': calcular_estadisticos_desde_resumen(resumen, outliers_iqr['conteo']),
+        'icd': calcular_indice_calidad_desde_resumen(resumen, columnas_esperadas, outliers_iqr, filas_duplicadas),
+        'ruta_outliers': ruta_outliers,
+        'filas': resumen.filas,
+        'filas_duplicadas': filas_duplicadas,
+        'segundos': time.perf_counter() - inicio
+    }
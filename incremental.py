@@ -0,0 +1,331 @@
+"""
+Refresco incremental de estadísticos e ICD cuando se agregan filas al final de un
+conjunto de datos: el estado de la versión actual se actualiza solo con las filas
+nuevas (ver calcular_estadisticos_incremental y calcular_indice_calidad_incremental)
+"""
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from estadisticas import PROBABILIDADES, cuantiles_por_segmentos
+from outliers import (MINIMO_VALORES, PARAMETROS_OUTLIERS, detectar_outliers, distancias_kmeans, outliers_columna,
+                      precalcular_outliers, predecir_svm)
+from sketches import Momentos
+from utils import obtener_vista_numerica, preparar_dataframe_numerico
+
+# K-means y SVM se reajustan cuando los valores agregados desde el último ajuste
+# superan esta fracción de los usados en él (0 = reajustar siempre: resultados exactos)
+UMBRAL_REAJUSTE = 0.1
+
+# Detectores con modelo ajustado que se aplica a las filas nuevas
+METODOS_CON_MODELO = ('kmeans', 'svm')
+
+
+class _Creciente:
+    """Arreglo que crece por el final duplicando su capacidad (agregar cuesta O(nuevos) amortizado)"""
+
+    def __init__(self, datos: np.ndarray):
+        self._datos = np.array(datos)
+        self.n = len(self._datos)
+
+    def agregar(self, nuevos: np.ndarray):
+        nuevos = np.asarray(nuevos)
+        tipo = np.result_type(self._datos, nuevos)
+        if self.n + len(nuevos) > len(self._datos) or tipo != self._datos.dtype:
+            capacidad = max(2 * len(self._datos), self.n + len(nuevos))
+            ampliado = np.empty((capacidad,) + self._datos.shape[1:], dtype=tipo)
+            ampliado[:self.n] = self._datos[:self.n]
+            self._datos = ampliado
+        self._datos[self.n:self.n + len(nuevos)] = nuevos
+        self.n += len(nuevos)
+
+    @property
+    def valores(self) -> np.ndarray:
+        return self._datos[:self.n]
+
+
+def _contar_distintos(ordenados: np.ndarray) -> int:
+    return int(len(ordenados) > 0) + int((ordenados[1:] != ordenados[:-1]).sum())
+
+
+def _insertar_ordenados(ordenados: np.ndarray, nuevos: np.ndarray) -> tuple:
+    """
+    Inserta nuevos en un arreglo ordenado (búsqueda binaria y un solo desplazamiento).
+    Devuelve el arreglo y cuántos valores distintos de nuevos no estaban.
+    """
+    nuevos = np.sort(nuevos)
+    posiciones = np.searchsorted(ordenados, nuevos)
+    if len(ordenados) > 0:
+        presentes = ordenados[np.minimum(posiciones, len(ordenados) - 1)] == nuevos
+    else:
+        presentes = np.zeros(len(nuevos), dtype=bool)
+    return np.insert(ordenados, posiciones, nuevos), _contar_distintos(nuevos[~presentes])
+
+
+def cuantiles_ordenados(ordenados: np.ndarray, probabilidades) -> np.ndarray:
+    """
+    Cuantiles con interpolación lineal de un arreglo ya ordenado, en O(1) por
+    probabilidad y con las mismas operaciones que np.quantile
+    """
+    return cuantiles_por_segmentos(ordenados, [0], [len(ordenados)], probabilidades)[0]
+
+
+def huellas_etiquetas(indice: pd.Index) -> np.ndarray:
+    """Huella de 64 bits por etiqueta del índice"""
+    return pd.util.hash_array(indice.to_numpy())
+
+
+def huellas_filas(matriz: np.ndarray) -> np.ndarray:
+    """Huella de 64 bits por fila (+ 0.0 unifica -0.0 y 0.0, iguales para duplicated)"""
+    return pd.util.hash_pandas_object(pd.DataFrame(matriz + 0.0), index=False).to_numpy()
+
+
+class EstadoIncremental:
+    """
+    Estado agregado de una versión de los datos para refrescar estadísticos e ICD
+    cuando se agregan filas al final, con un costo que crece con las filas nuevas:
+
+    - Por variable: nulos, nulos originales, momentos (Pébay), valores válidos
+      ordenados (cuantiles y outliers IQR exactos) y número de valores distintos.
+    - Por fila: huellas ordenadas, para contar filas duplicadas, y huellas de las
+      etiquetas del índice, para rechazar filas nuevas con etiquetas ya usadas.
+    - K-means y SVM: el modelo ajustado se aplica a los valores nuevos y se reajusta
+      cuando estos superan umbral_reajuste de los usados en el ajuste. Entre
+      reajustes el umbral de K-means (percentil de distancias) sí es exacto.
+
+    La versión inicial usa la vista numérica y el caché de outliers compartidos con
+    calcular_estadisticos y el ICD, así que no repite ajustes ya hechos.
+    """
+
+    def __init__(self, df: pd.DataFrame, variables: List[str] = None, parametros_outliers: Dict[str, Dict] = None,
+                 umbral_reajuste: float = UMBRAL_REAJUSTE, n_procesos: int = 1):
+        vista = obtener_vista_numerica(df, variables)
+        self.variables_solicitadas = variables
+        self.variables: List[str] = list(vista.columnas)
+        self.columnas_datos: List[str] = list(df.columns)
+        self.parametros_outliers = parametros_outliers or {}
+        self.umbral_reajuste = umbral_reajuste
+        self.version = 0
+        self.filas = len(df)
+
+        matriz = vista.matriz if not vista.vacia else np.empty((len(df), 0))
+        nulos = np.isnan(matriz)
+        self._matriz = _Creciente(matriz)
+        self._etiquetas = _Creciente(df.index.to_numpy())
+        self.nulos = nulos.sum(axis=0)
+        self.nulos_originales = df.reindex(columns=self.variables).isnull().to_numpy().sum(axis=0)
+        self.momentos = Momentos.desde_matriz(matriz, nulos)
+        self.ordenados = [np.sort(matriz[~nulos[:, j], j]) for j in range(len(self.variables))]
+        self.distintos = np.array([_contar_distintos(o) for o in self.ordenados], dtype=np.int64)
+        self._huellas = np.sort(huellas_filas(matriz)) if self.variables else np.empty(0, dtype=np.uint64)
+        self.filas_distintas = _contar_distintos(self._huellas)
+        self._huellas_etiquetas = np.sort(huellas_etiquetas(df.index))
+
+        if n_procesos > 1 and not vista.vacia:
+            precalcular_outliers(vista, list(METODOS_CON_MODELO), self.parametros_outliers, n_procesos)
+        self.modelos: Dict[str, List[Dict]] = {metodo: [] for metodo in METODOS_CON_MODELO}
+        for metodo in METODOS_CON_MODELO:
+            parametros = self.parametros_outliers.get(metodo, {})
+            for j, col in enumerate(self.variables):
+                resultado = outliers_columna(vista, col, metodo, **parametros)
+                self.modelos[metodo].append(self._estado_modelo(metodo, resultado, self.valores_validos(j)))
+
+    def _parametros(self, metodo: str) -> Dict:
+        return {**PARAMETROS_OUTLIERS[metodo], **self.parametros_outliers.get(metodo, {})}
+
+    @staticmethod
+    def _estado_modelo(metodo: str, resultado: Optional[Dict], valores: np.ndarray) -> Dict:
+        """Ajuste de un detector y su aplicación a los valores actuales (sin ajuste si falló o faltan datos)"""
+        estado = {'validos_ajuste': len(valores), 'resultado': None}
+        if resultado is None or resultado.get('error'):
+            return estado
+        estado['resultado'] = resultado
+        if metodo == 'kmeans':
+            distancias = distancias_kmeans(resultado, valores)
+            estado['distancias'] = _Creciente(distancias)
+            estado['ordenadas'] = np.sort(distancias)
+        else:
+            estado['mascara'] = _Creciente(resultado['mascara'])
+        return estado
+
+    @property
+    def filas_duplicadas(self) -> int:
+        return self.filas - self.filas_distintas if self.variables else 0
+
+    @property
+    def validos(self) -> np.ndarray:
+        return self.filas - self.nulos
+
+    def valores_validos(self, j: int) -> np.ndarray:
+        """Valores no nulos de la variable j en orden de fila"""
+        columna = self._matriz.valores[:, j]
+        return columna[~np.isnan(columna)]
+
+    def etiquetas_validas(self, j: int) -> np.ndarray:
+        """Índice (etiquetas de fila) de los valores no nulos de la variable j"""
+        return self._etiquetas.valores[~np.isnan(self._matriz.valores[:, j])]
+
+    def _requiere_ajuste(self, metodo: str, j: int) -> bool:
+        estado = self.modelos[metodo][j]
+        validos = self.validos[j]
+        if validos < MINIMO_VALORES[metodo] or validos == estado['validos_ajuste']:
+            return False
+        if estado['resultado'] is None:
+            return True
+        return validos - estado['validos_ajuste'] > self.umbral_reajuste * estado['validos_ajuste']
+
+    def _aplicar_modelo(self, metodo: str, j: int, nuevos: np.ndarray):
+        estado = self.modelos[metodo][j]
+        if estado['resultado'] is None or len(nuevos) == 0:
+            return
+        if metodo == 'kmeans':
+            distancias = distancias_kmeans(estado['resultado'], nuevos)
+            estado['distancias'].agregar(distancias)
+            estado['ordenadas'], _ = _insertar_ordenados(estado['ordenadas'], distancias)
+        else:
+            estado['mascara'].agregar(predecir_svm(estado['resultado'], nuevos))
+
+    def agregar_filas(self, delta: pd.DataFrame) -> Dict:
+        """
+        Actualiza el estado con filas agregadas al final de los datos (mismas columnas
+        y etiquetas de índice que no estén en los datos ni se repitan en delta).
+        Devuelve la nueva versión, filas nuevas y totales, las variables cuyo K-means
+        o SVM se reajustó y los segundos del refresco.
+        """
+        inicio = time.perf_counter()
+        if set(delta.columns) != set(self.columnas_datos):
+            raise ValueError("Las filas nuevas deben tener las mismas columnas que los datos")
+        etiquetas, nuevas = _insertar_ordenados(self._huellas_etiquetas, huellas_etiquetas(delta.index))
+        if nuevas != len(delta):
+            raise ValueError("Las filas nuevas repiten etiquetas del índice de los datos o entre ellas")
+
+        if self.variables:
+            numerico = preparar_dataframe_numerico(delta, self.variables_solicitadas).reindex(columns=self.variables)
+            matriz = numerico.to_numpy(dtype=np.float64)
+        else:
+            matriz = np.empty((len(delta), 0))
+        nulos = np.isnan(matriz)
+
+        self.version += 1
+        self.filas += len(delta)
+        self._matriz.agregar(matriz)
+        self._etiquetas.agregar(delta.index.to_numpy())
+        self._huellas_etiquetas = etiquetas
+        self.nulos += nulos.sum(axis=0)
+        self.nulos_originales += delta.reindex(columns=self.variables).isnull().to_numpy().sum(axis=0)
+        self.momentos = self.momentos.combinar(Momentos.desde_matriz(matriz, nulos))
+        if self.variables:
+            self._huellas, nuevas = _insertar_ordenados(self._huellas, huellas_filas(matriz))
+            self.filas_distintas += nuevas
+
+        reajustes = {metodo: [] for metodo in METODOS_CON_MODELO}
+        for j, col in enumerate(self.variables):
+            nuevos = matriz[~nulos[:, j], j]
+            self.ordenados[j], distintos = _insertar_ordenados(self.ordenados[j], nuevos)
+            self.distintos[j] += distintos
+            for metodo in METODOS_CON_MODELO:
+                if self._requiere_ajuste(metodo, j):
+                    valores = self.valores_validos(j)
+                    resultado = detectar_outliers(valores, metodo, **self.parametros_outliers.get(metodo, {}))
+                    self.modelos[metodo][j] = self._estado_modelo(metodo, resultado, valores)
+                    reajustes[metodo].append(col)
+                else:
+                    self._aplicar_modelo(metodo, j, nuevos)
+
+        return {
+            'version': self.version, 'filas_nuevas': len(delta), 'filas': self.filas,
+            'reajustes': reajustes, 'segundos': time.perf_counter() - inicio
+        }
+
+    def descriptivos(self) -> Dict[str, np.ndarray]:
+        """Mismo formato que estadisticas.describir_matriz"""
+        desc = self.momentos.describir()
+        cuantiles = np.array([cuantiles_ordenados(o, PROBABILIDADES) for o in self.ordenados])
+        cuantiles = cuantiles.reshape(-1, len(PROBABILIDADES))
+        desc.update({
+            'nulos': self.nulos.copy(),
+            'minimo': cuantiles[:, 0], 'q1': cuantiles[:, 1], 'mediana': cuantiles[:, 2],
+            'q3': cuantiles[:, 3], 'maximo': cuantiles[:, 4],
+        })
+        return desc
+
+    def outliers_iqr(self, factor: float = 1.5) -> Dict[str, np.ndarray]:
+        """Límites IQR por variable y número exacto de valores fuera de ellos (búsqueda binaria)"""
+        cuartiles = np.array([cuantiles_ordenados(o, [0.25, 0.75]) for o in self.ordenados]).reshape(-1, 2)
+        iqr = cuartiles[:, 1] - cuartiles[:, 0]
+        inferior, superior = cuartiles[:, 0] - factor * iqr, cuartiles[:, 1] + factor * iqr
+        conteos = np.array([
+            np.searchsorted(o, a, side='left') + len(o) - np.searchsorted(o, b, side='right')
+            for o, a, b in zip(self.ordenados, inferior, superior)
+        ], dtype=np.int64)
+        return {'q1': cuartiles[:, 0], 'q3': cuartiles[:, 1],
+                'limite_inferior': inferior, 'limite_superior': superior, 'conteo': conteos}
+
+    def _threshold_kmeans(self, j: int) -> float:
+        """Percentil de las distancias de todos los valores (como np.percentile en el ajuste)"""
+        percentil = self._parametros('kmeans')['percentil']
+        return cuantiles_ordenados(self.modelos['kmeans'][j]['ordenadas'], [percentil / 100])[0]
+
+    def conteo_outliers(self, metodo: str) -> np.ndarray:
+        """Outliers por variable de K-means o SVM con el modelo vigente"""
+        conteos = np.zeros(len(self.variables), dtype=np.int64)
+        for j, estado in enumerate(self.modelos[metodo]):
+            if estado['resultado'] is None or self.validos[j] < MINIMO_VALORES[metodo]:
+                continue
+            if metodo == 'kmeans':
+                ordenadas = estado['ordenadas']
+                conteos[j] = len(ordenadas) - np.searchsorted(ordenadas, self._threshold_kmeans(j), side='right')
+            else:
+                conteos[j] = estado['mascara'].valores.sum()
+        return conteos
+
+    def resultado_outliers(self, metodo: str, j: int) -> Optional[Dict]:
+        """
+        Outliers de la variable j con el mismo formato que outliers.outliers_columna
+        (máscara alineada con valores_validos(j)); None si no hay valores suficientes
+        """
+        validos = self.validos[j]
+        if validos < MINIMO_VALORES[metodo]:
+            return None
+        if metodo == 'iqr':
+            factor = self._parametros('iqr')['factor']
+            q1, q3 = cuantiles_ordenados(self.ordenados[j], [0.25, 0.75])
+            limite_inferior, limite_superior = q1 - factor * (q3 - q1), q3 + factor * (q3 - q1)
+            valores = self.valores_validos(j)
+            return {
+                'mascara': (valores < limite_inferior) | (valores > limite_superior),
+                'q1': q1, 'q3': q3, 'limite_inferior': limite_inferior, 'limite_superior': limite_superior
+            }
+        estado = self.modelos[metodo][j]
+        if estado['resultado'] is None:
+            return {'mascara': np.zeros(validos, dtype=bool), 'error': True}
+        if metodo == 'kmeans':
+            threshold = self._threshold_kmeans(j)
+            return {'mascara': estado['distancias'].valores > threshold, 'threshold': threshold}
+        return {'mascara': estado['mascara'].valores}
+
+
+def reporte_cambios(estadisticos_antes: pd.DataFrame, estadisticos_despues: pd.DataFrame,
+                    icd_antes: Dict, icd_despues: Dict) -> Dict[str, pd.DataFrame]:
+    """
+    Qué cambió entre dos versiones: estadísticos por variable (solo los que
+    cambiaron) y el ICD total con su desglose por dimensión
+    """
+    antes = estadisticos_antes.set_index('Variable').stack().rename('Antes')
+    despues = estadisticos_despues.set_index('Variable').stack().rename('Después')
+    estadisticos = pd.concat([antes, despues], axis=1)
+    estadisticos.index.names = ['Variable', 'Estadístico']
+    estadisticos['Cambio'] = estadisticos['Después'] - estadisticos['Antes']
+    cambiaron = ~np.isclose(estadisticos['Antes'], estadisticos['Después'], rtol=1e-12, atol=0, equal_nan=True)
+    estadisticos = estadisticos[cambiaron].reset_index()
+
+    dimensiones = {'ICD total': (icd_antes['icd_total'], icd_despues['icd_total'])}
+    for dimension, puntaje in icd_despues['desglose'].items():
+        dimensiones[dimension] = (icd_antes['desglose'][dimension], puntaje)
+    icd = pd.DataFrame(
+        [(dimension, a, d, d - a) for dimension, (a, d) in dimensiones.items()],
+        columns=['Dimensión', 'Antes', 'Después', 'Cambio']
+    )
+    return {'estadisticos': estadisticos, 'icd': icd}
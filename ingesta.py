@@ -0,0 +1,157 @@
+"""
+Flujos de ingesta (lectura, tipado, limpieza y compactación) sin dependencias de la interfaz
+"""
+import io
+import os
+import tempfile
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from cache_ingesta import CACHE_INGESTA
+from calidad_datos import calcular_indice_calidad_incremental
+from cache_socrata import cargar_dataset_con_cache
+from carga_archivos import LecturaCancelable, leer_csv, leer_csv_por_bloques, leer_excel_por_bloques
+from fuera_de_memoria import analizar_archivo_por_bloques
+from incremental import EstadoIncremental, reporte_cambios
+from limpieza import PipelineLimpieza
+from tareas import TareaIngesta
+from utils import asignar_tipos_datos, compactar_dataframe, memoria_dataframe
+from visualizaciones import calcular_estadisticos_incremental
+
+
+def compactar_frames(df_original: pd.DataFrame, df: pd.DataFrame) -> tuple:
+    """Compacta ambos DataFrames y devuelve (df_original, df, (bytes_antes, bytes_despues))"""
+    mismo = df is df_original
+    antes = memoria_dataframe(df_original) + (0 if mismo else memoria_dataframe(df))
+    df_original = compactar_dataframe(df_original)
+    df = df_original if mismo else compactar_dataframe(df)
+    despues = memoria_dataframe(df_original) + (0 if mismo else memoria_dataframe(df))
+    return df_original, df, (antes, despues)
+
+
+def _limpiar_y_compactar(df_raw: pd.DataFrame, limpieza: bool, compacto: bool,
+                         tarea: Optional[TareaIngesta], pasos_limpieza: List[str] = None) -> Dict:
+    report = None
+    reporte_pasos = None
+    df = df_raw
+    if limpieza:
+        with _etapa(tarea, 'limpieza'):
+            pipeline = PipelineLimpieza(pasos_limpieza)
+            df, report = pipeline.ejecutar(df_raw)
+            reporte_pasos = pipeline.tabla_reportes()
+
+    memoria = None
+    if compacto:
+        with _etapa(tarea, 'compactación'):
+            df_raw, df, memoria = compactar_frames(df_raw, df)
+
+    return {
+        'df_original': df_raw, 'df': df, 'report': report,
+        'reporte_pasos': reporte_pasos, 'memoria': memoria
+    }
+
+
+def _etapa(tarea: Optional[TareaIngesta], nombre: str):
+    return tarea.medir_etapa(nombre) if tarea is not None else nullcontext()
+
+
+def ingerir_archivo(contenido: bytes, nombre: str, opciones: Dict,
+                    tarea: TareaIngesta = None, clave_cache: str = None) -> Dict:
+    """
+    Lee, tipa, limpia y compacta un archivo subido según las opciones.
+    Si se indica clave_cache, el resultado se guarda en CACHE_INGESTA.
+    """
+    archivo = io.BytesIO(contenido)
+    if tarea is not None:
+        # Cada búfer leído atiende la cancelación, también en lecturas de una sola llamada
+        archivo = LecturaCancelable(archivo, tarea.comprobar_cancelacion)
+    info_lectura = None
+    reportar = (lambda info: tarea.reportar(filas=info['filas'])) if tarea is not None else None
+
+    with _etapa(tarea, 'lectura'):
+        if nombre.endswith('.csv') and opciones.get('por_bloques'):
+            df_raw, info_lectura = leer_csv_por_bloques(archivo, progreso=reportar)
+        elif nombre.endswith('.csv'):
+            df_raw = leer_csv(archivo)
+        elif nombre.endswith('.xlsx') and opciones.get('por_bloques'):
+            df_raw, info_lectura = leer_excel_por_bloques(
+                archivo, hoja=opciones.get('hoja'), columnas=opciones.get('columnas') or None,
+                progreso=reportar
+            )
+        else:
+            df_raw = asignar_tipos_datos(pd.read_excel(archivo))
+    if tarea is not None:
+        tarea.reportar(filas=len(df_raw), total=len(df_raw))
+
+    resultado = _limpiar_y_compactar(
+        df_raw, opciones.get('limpieza'), opciones.get('compacto'), tarea, opciones.get('pasos_limpieza')
+    )
+    resultado['info_lectura'] = info_lectura
+
+    if clave_cache is not None:
+        CACHE_INGESTA.guardar(clave_cache, resultado)
+    return resultado
+
+
+def ingerir_socrata(domain: str, dataset_id: str, opciones: Dict, tarea: TareaIngesta = None) -> Dict:
+    """Descarga (con caché e incrementales), tipa y compacta un dataset Socrata"""
+    reportar = (lambda filas, total: tarea.reportar(filas=filas, total=total)) if tarea is not None else None
+
+    with _etapa(tarea, 'descarga'):
+        df_raw, info_carga = cargar_dataset_con_cache(
+            domain, dataset_id, limit=opciones.get('limit'), app_token=opciones.get('app_token'),
+            progreso=reportar, forzar_completa=opciones.get('forzar_completa', False),
+            consulta=opciones.get('consulta')
+        )
+    with _etapa(tarea, 'tipado'):
+        df_raw = asignar_tipos_datos(df_raw)
+
+    resultado = _limpiar_y_compactar(df_raw, False, opciones.get('compacto'), tarea)
+    resultado['info_carga'] = info_carga
+    return resultado
+
+
+def analizar_archivo_fuera_de_memoria(contenido: bytes, nombre: str, tarea: TareaIngesta = None) -> Dict:
+    """
+    Estadísticos e ICD de un CSV subido sin construir el DataFrame
+    (fuera_de_memoria.analizar_archivo_por_bloques sobre una copia temporal en disco).
+    Las filas con outliers quedan en el CSV de resultado['ruta_outliers'].
+    """
+    reportar = (lambda info: tarea.reportar(filas=info['filas'])) if tarea is not None else None
+    cancelacion = tarea.comprobar_cancelacion if tarea is not None else None
+    with tempfile.NamedTemporaryFile(prefix='subida_', suffix=os.path.splitext(nombre)[1], delete=False) as temporal:
+        temporal.write(contenido)
+    with tempfile.NamedTemporaryFile(prefix='outliers_', suffix='.csv', delete=False) as temporal_outliers:
+        ruta_outliers = temporal_outliers.name
+    try:
+        with _etapa(tarea, 'análisis por bloques'):
+            return analizar_archivo_por_bloques(
+                temporal.name, ruta_outliers=ruta_outliers, progreso=reportar, cancelacion=cancelacion
+            )
+    except BaseException:
+        os.remove(ruta_outliers)
+        raise
+    finally:
+        os.remove(temporal.name)
+
+
+def agregar_filas_nuevas(df: pd.DataFrame, delta: pd.DataFrame, estado: EstadoIncremental,
+                         columnas_esperadas: List[str] = None, metodo_outliers: str = 'iqr') -> Dict:
+    """
+    Agrega delta al final de df (del que estado es la versión actual) y refresca
+    estadísticos e ICD con el estado incremental, sin reajustar los detectores salvo
+    que lo pida su umbral. Devuelve el DataFrame ampliado, el refresco
+    (EstadoIncremental.agregar_filas), estadísticos, ICD y el reporte de cambios.
+    """
+    estadisticos_antes = calcular_estadisticos_incremental(estado)
+    icd_antes = calcular_indice_calidad_incremental(estado, df, columnas_esperadas, metodo_outliers)
+    refresco = estado.agregar_filas(delta)
+    df = pd.concat([df, delta])
+    estadisticos = calcular_estadisticos_incremental(estado)
+    icd = calcular_indice_calidad_incremental(estado, df, columnas_esperadas, metodo_outliers)
+    return {
+        'df': df, 'refresco': refresco, 'estadisticos': estadisticos, 'icd': icd,
+        'cambios': reporte_cambios(estadisticos_antes, estadisticos, icd_antes, icd)
+    }
@@ -0,0 +1,95 @@
+"""
+K-means óptimo en una dimensión (programación dinámica estilo Ckmeans.1d.dp):
+determinista, sin reinicios aleatorios y O(k · n log n) sobre los valores distintos
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def _costos(S1: np.ndarray, S2: np.ndarray, W: np.ndarray, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Suma de cuadrados dentro del segmento [i, j) a partir de sumas acumuladas"""
+    peso = W[j] - W[i]
+    suma = S1[j] - S1[i]
+    return np.maximum(S2[j] - S2[i] - suma * suma / peso, 0.0)
+
+
+def _capa(D_anterior: np.ndarray, S1: np.ndarray, S2: np.ndarray, W: np.ndarray,
+          m: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    D[j] = min_{m-1 <= i < j} D_anterior[i] + costo(i, j) para todo j >= m.
+    El óptimo i(j) es monótono en j, así que se usa divide y vencerás; cada nivel
+    de la recursión se evalúa a la vez con operaciones vectorizadas.
+    """
+    n = len(W) - 1
+    D = np.full(n + 1, np.inf)
+    B = np.zeros(n + 1, dtype=np.intp)
+    lo, hi = np.array([m]), np.array([n])
+    opt_lo, opt_hi = np.array([m - 1]), np.array([n - 1])
+
+    while len(lo) > 0:
+        medio = (lo + hi) // 2
+        cand_hi = np.minimum(opt_hi, medio - 1)
+        largos = cand_hi - opt_lo + 1
+        inicios = np.concatenate([[0], np.cumsum(largos)[:-1]])
+        segmento = np.repeat(np.arange(len(lo)), largos)
+        i = opt_lo[segmento] + np.arange(len(segmento)) - inicios[segmento]
+        j = medio[segmento]
+        valores = D_anterior[i] + _costos(S1, S2, W, i, j)
+
+        minimos = np.minimum.reduceat(valores, inicios)
+        # Primer candidato que alcanza el mínimo de cada segmento
+        posiciones = np.flatnonzero(valores == minimos[segmento])
+        _, primeras = np.unique(segmento[posiciones], return_index=True)
+        mejores = i[posiciones[primeras]]
+        D[medio], B[medio] = minimos, mejores
+
+        izquierda, derecha = lo <= medio - 1, medio + 1 <= hi
+        lo, hi, opt_lo, opt_hi = (
+            np.concatenate([lo[izquierda], medio[derecha] + 1]),
+            np.concatenate([medio[izquierda] - 1, hi[derecha]]),
+            np.concatenate([opt_lo[izquierda], mejores[derecha]]),
+            np.concatenate([mejores[izquierda], opt_hi[derecha]]),
+        )
+    return D, B
+
+
+def kmeans_optimo_1d(valores: np.ndarray, k: int) -> Tuple[np.ndarray, float]:
+    """
+    Centroides (ordenados) de la partición en k grupos con mínima suma de
+    cuadrados, y esa inercia. Si hay menos de k valores distintos, cada valor
+    distinto es su propio grupo.
+    """
+    x, pesos = np.unique(np.asarray(valores, dtype=np.float64), return_counts=True)
+    n = len(x)
+    k = max(1, min(k, n))
+    # Se centra para que las sumas acumuladas no pierdan precisión
+    x_centrado = x - np.average(x, weights=pesos)
+    W = np.concatenate([[0.0], np.cumsum(pesos, dtype=np.float64)])
+    S1 = np.concatenate([[0.0], np.cumsum(pesos * x_centrado)])
+    S2 = np.concatenate([[0.0], np.cumsum(pesos * x_centrado ** 2)])
+
+    todos = np.arange(n + 1)
+    D = np.full(n + 1, np.inf)
+    D[1:] = _costos(S1, S2, W, np.zeros(n, dtype=np.intp), todos[1:])
+    cortes_por_capa = []
+    for m in range(2, k):
+        D, B = _capa(D, S1, S2, W, m)
+        cortes_por_capa.append(B)
+
+    # Última capa: solo interesa j = n
+    if k > 1:
+        i = np.arange(k - 1, n)
+        totales = D[i] + _costos(S1, S2, W, i, np.full(len(i), n))
+        ultimo_corte = i[np.argmin(totales)]
+        inercia = float(totales.min())
+        cortes = [ultimo_corte]
+        for B in reversed(cortes_por_capa):
+            cortes.append(B[cortes[-1]])
+        limites = np.array([0] + cortes[::-1] + [n])
+    else:
+        inercia = float(D[n])
+        limites = np.array([0, n])
+
+    centroides = (S1[limites[1:]] - S1[limites[:-1]]) / (W[limites[1:]] - W[limites[:-1]])
+    return centroides + np.average(x, weights=pesos), inercia
@@ -0,0 +1,250 @@
+"""
+Pipeline de limpieza configurable, con pasos fusionados y reporte por paso
+"""
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from normalizacion import limpiar_texto, normalizar_nombres
+from utils import (
+    COLUMNAS_AGRUPACION, TAMANO_MUESTRA_INFERENCIA, convertir_texto_a_numerico, es_columna_texto,
+    evaluar_muestras_numericas
+)
+
+# Pasos disponibles, en el orden en que se aplican
+PASOS_LIMPIEZA = {
+    'filas_vacias': '🗑️ Filas completamente vacías',
+    'columnas_vacias': '🗑️ Columnas completamente vacías',
+    'conversion_numerica': '🔢 Conversión de columnas numéricas',
+    'filas_sin_numericos': '🗑️ Filas sin datos numéricos',
+    'duplicados': '🗑️ Filas duplicadas',
+    'texto': '✨ Espacios en columnas de texto',
+    'nombres_canonicos': '🏷️ Nombres canónicos (departamento, municipio, cultivo)',
+}
+
+# Pasos que se aplican si no se indica otra cosa
+PASOS_POR_DEFECTO = [
+    'filas_vacias', 'columnas_vacias', 'conversion_numerica', 'filas_sin_numericos', 'duplicados', 'texto'
+]
+
+
+@dataclass
+class ReportePaso:
+    """Resultado de un paso: tiempo, filas eliminadas, columnas afectadas y mensajes"""
+    paso: str
+    segundos: float = 0.0
+    filas_eliminadas: int = 0
+    columnas_afectadas: int = 0
+    mensajes: List[str] = field(default_factory=list)
+
+
+class PipelineLimpieza:
+    """
+    Limpieza por pasos configurables con el mismo resultado que aplicarlos en
+    secuencia, pero planificada para recorrer los datos las menos veces posible:
+
+    - Filas y columnas vacías salen de un único recorrido de notna().
+    - Los filtros de filas (vacías, sin numéricos, duplicadas) se combinan en una
+      máscara que se aplica una sola vez; como dependen solo de los valores de la
+      fila, duplicated() se calcula una vez sobre todas las filas.
+    - La conversión numérica y la limpieza de texto son por columna; el texto se
+      procesa sobre valores únicos (ver normalizacion).
+
+    Puede alimentarse por bloques (procesar_bloque + finalizar): filas vacías y
+    conversión se aplican bloque a bloque; duplicados y columnas vacías se
+    resuelven al final sobre el total.
+    """
+
+    def __init__(self, pasos: List[str] = None):
+        pasos = PASOS_POR_DEFECTO if pasos is None else list(pasos)
+        desconocidos = [p for p in pasos if p not in PASOS_LIMPIEZA]
+        if desconocidos:
+            raise ValueError(f"Pasos de limpieza desconocidos: {desconocidos}")
+        self.pasos = [p for p in PASOS_LIMPIEZA if p in pasos]
+        self.reportes: Dict[str, ReportePaso] = {p: ReportePaso(p) for p in self.pasos}
+        self._columnas: List[str] = None
+        self._filas_entrada = 0
+        self._bloques: List[pd.DataFrame] = []
+        self._con_datos: pd.Series = None
+        # Conversión numérica: muestras pendientes, decisión e inválidos por columna
+        self._muestras: Dict[str, pd.Series] = {}
+        self._numericas: Dict[str, bool] = {}
+        self._invalidos: Dict[str, int] = {}
+        self._variantes_unificadas = 0
+
+    @contextmanager
+    def _medir(self, paso: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            if paso in self.reportes:
+                self.reportes[paso].segundos += time.perf_counter() - inicio
+
+    def _convertir(self, bloque: pd.DataFrame, col: str) -> pd.DataFrame:
+        original = bloque[col]
+        bloque[col] = convertir_texto_a_numerico(original)
+        self._invalidos[col] += int((bloque[col].isna() & original.notna()).sum())
+        return bloque
+
+    def _decidir(self, columnas: List[str]):
+        """Decide las columnas con muestra completa (o todas al finalizar) y convierte lo ya guardado"""
+        reporte = evaluar_muestras_numericas({c: self._muestras.pop(c) for c in columnas})
+        for col in columnas:
+            self._numericas[col] = bool(reporte.at[col, 'es_numerica'])
+            if self._numericas[col]:
+                self._invalidos[col] = 0
+                self._bloques = [self._convertir(b, col) for b in self._bloques]
+
+    def procesar_bloque(self, bloque: pd.DataFrame):
+        """Aplica al bloque los pasos que no dependen del resto de filas y lo guarda"""
+        if self._columnas is None:
+            self._columnas = list(bloque.columns)
+            self._con_datos = pd.Series(False, index=bloque.columns)
+            if 'conversion_numerica' in self.pasos:
+                self._muestras = {
+                    c: bloque[c].iloc[:0] for c in bloque.columns if es_columna_texto(bloque[c])
+                }
+        self._filas_entrada += len(bloque)
+        bloque = bloque.copy(deep=False)
+
+        if 'filas_vacias' in self.pasos or 'columnas_vacias' in self.pasos:
+            with self._medir('filas_vacias' if 'filas_vacias' in self.pasos else 'columnas_vacias'):
+                presentes = bloque.notna()
+                self._con_datos |= presentes.any(axis=0)
+                if 'filas_vacias' in self.pasos:
+                    con_datos = presentes.any(axis=1)
+                    eliminadas = int((~con_datos).sum())
+                    if eliminadas > 0:
+                        bloque = bloque[con_datos]
+                        self.reportes['filas_vacias'].filas_eliminadas += eliminadas
+
+        with self._medir('conversion_numerica'):
+            completas = []
+            for col, muestra in self._muestras.items():
+                faltan = TAMANO_MUESTRA_INFERENCIA - len(muestra)
+                nuevos = bloque[col].dropna().head(faltan)
+                if len(nuevos) > 0:
+                    self._muestras[col] = muestra = pd.concat([muestra, nuevos])
+                if len(muestra) >= TAMANO_MUESTRA_INFERENCIA:
+                    completas.append(col)
+            for col, es_numerica in self._numericas.items():
+                if es_numerica:
+                    bloque = self._convertir(bloque, col)
+            self._bloques.append(bloque)
+            if completas:
+                self._decidir(completas)
+
+    def finalizar(self) -> Tuple[pd.DataFrame, List[str]]:
+        """Resuelve los pasos globales y devuelve (df_limpio, cleaning_report)"""
+        with self._medir('conversion_numerica'):
+            if self._muestras:
+                self._decidir(list(self._muestras))
+
+        columnas_entrada = len(self._columnas or [])
+        if not self._bloques:
+            df = pd.DataFrame(columns=self._columnas)
+        elif len(self._bloques) == 1:
+            df = self._bloques[0]
+        else:
+            df = pd.concat(self._bloques)
+        self._bloques = []
+
+        if 'columnas_vacias' in self.pasos:
+            with self._medir('columnas_vacias'):
+                conservar = [c for c in df.columns if self._con_datos.get(c, False)]
+                self.reportes['columnas_vacias'].columnas_afectadas = len(df.columns) - len(conservar)
+                if len(conservar) < len(df.columns):
+                    df = df[conservar]
+
+        conservar_filas = np.ones(len(df), dtype=bool)
+        if 'filas_sin_numericos' in self.pasos:
+            with self._medir('filas_sin_numericos'):
+                numeric_columns = df.select_dtypes(include=[np.number]).columns
+                if len(numeric_columns) > 0:
+                    conservar_filas = df[numeric_columns].notna().any(axis=1).to_numpy()
+                    self.reportes['filas_sin_numericos'].filas_eliminadas = int((~conservar_filas).sum())
+
+        if 'duplicados' in self.pasos:
+            with self._medir('duplicados'):
+                duplicadas = df.duplicated().to_numpy() & conservar_filas
+                self.reportes['duplicados'].filas_eliminadas = int(duplicadas.sum())
+                conservar_filas = conservar_filas & ~duplicadas
+
+        if not conservar_filas.all():
+            df = df[conservar_filas]
+
+        if 'texto' in self.pasos:
+            with self._medir('texto'):
+                columnas_texto = [c for c in df.columns if es_columna_texto(df[c])]
+                for col in columnas_texto:
+                    df[col] = limpiar_texto(df[col])
+                self.reportes['texto'].columnas_afectadas = len(columnas_texto)
+
+        if 'nombres_canonicos' in self.pasos:
+            with self._medir('nombres_canonicos'):
+                variantes = 0
+                for col in [c for c in COLUMNAS_AGRUPACION if c in df.columns and es_columna_texto(df[c])]:
+                    df[col], unificadas = normalizar_nombres(df[col])
+                    variantes += unificadas
+                    self.reportes['nombres_canonicos'].columnas_afectadas += 1
+                self._variantes_unificadas = variantes
+
+        df = df.reset_index(drop=True)
+        return df, self._cleaning_report((self._filas_entrada, columnas_entrada), df.shape)
+
+    def ejecutar(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+        """Limpia un DataFrame completo"""
+        self.procesar_bloque(df)
+        return self.finalizar()
+
+    def _cleaning_report(self, original_shape: tuple, final_shape: tuple) -> List[str]:
+        """Mensajes en el formato histórico de DataCleaner.clean_dataframe"""
+        r = self.reportes
+        if 'filas_vacias' in r and r['filas_vacias'].filas_eliminadas > 0:
+            r['filas_vacias'].mensajes = [
+                f"🗑️ Eliminadas {r['filas_vacias'].filas_eliminadas} filas completamente vacías"
+            ]
+        if 'columnas_vacias' in r and r['columnas_vacias'].columnas_afectadas > 0:
+            r['columnas_vacias'].mensajes = [
+                f"🗑️ Eliminadas {r['columnas_vacias'].columnas_afectadas} columnas completamente vacías"
+            ]
+        if 'conversion_numerica' in r:
+            convertidas = [c for c in self._columnas if self._numericas.get(c)]
+            r['conversion_numerica'].columnas_afectadas = len(convertidas)
+            r['conversion_numerica'].mensajes = [
+                f"🔢 Columna '{col}': convertida a numérica ({self._invalidos[col]} valores inválidos → NaN)"
+                for col in convertidas if self._invalidos[col] > 0
+            ]
+        if 'filas_sin_numericos' in r and r['filas_sin_numericos'].filas_eliminadas > 0:
+            r['filas_sin_numericos'].mensajes = [
+                f"🗑️ Eliminadas {r['filas_sin_numericos'].filas_eliminadas} filas sin datos numéricos válidos"
+            ]
+        if 'duplicados' in r and r['duplicados'].filas_eliminadas > 0:
+            r['duplicados'].mensajes = [f"🗑️ Eliminadas {r['duplicados'].filas_eliminadas} filas duplicadas"]
+        if 'texto' in r and r['texto'].columnas_afectadas > 0:
+            r['texto'].mensajes = [f"✨ Limpiados espacios en {r['texto'].columnas_afectadas} columnas de texto"]
+        if 'nombres_canonicos' in r and self._variantes_unificadas > 0:
+            r['nombres_canonicos'].mensajes = [
+                f"🏷️ Unificadas {self._variantes_unificadas} variantes de nombres en "
+                f"{r['nombres_canonicos'].columnas_afectadas} columnas"
+            ]
+
+        cleaning_report = [f"📊 Dimensiones: {original_shape} → {final_shape}"]
+        for paso in self.pasos:
+            cleaning_report.extend(r[paso].mensajes)
+        return cleaning_report
+
+    def tabla_reportes(self) -> pd.DataFrame:
+        """Reporte por paso para mostrar en la interfaz"""
+        return pd.DataFrame([
+            {
+                'Paso': PASOS_LIMPIEZA[p], 'Segundos': round(r.segundos, 4),
+                'Filas eliminadas': r.filas_eliminadas, 'Columnas afectadas': r.columnas_afectadas
+            }
+            for p, r in self.reportes.items()
+        ])
@@ -0,0 +1,152 @@
+"""
+Normalización de columnas de texto evaluada sobre valores únicos:
+el costo crece con la cardinalidad de la columna y no con el número de filas
+"""
+import re
+import unicodedata
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Textos que la limpieza trata como nulos (tras quitar espacios)
+VALORES_NULOS_TEXTO = ['nan', 'None', 'NaN', '']
+
+_PATRON_PUNTUACION = re.compile(r'[^\w\s]')
+
+
+def plegar_texto(texto: str) -> str:
+    """Forma de comparación: sin tildes, mayúsculas, sin puntuación y con espacios simples"""
+    sin_tildes = ''.join(
+        c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c)
+    )
+    return ' '.join(_PATRON_PUNTUACION.sub(' ', sin_tildes).upper().split())
+
+
+def _diccionario_canonico(canonicos: list, alias: Dict[str, str]) -> Dict[str, str]:
+    diccionario = {plegar_texto(nombre): nombre for nombre in canonicos}
+    diccionario.update({plegar_texto(a): nombre for a, nombre in alias.items()})
+    return diccionario
+
+
+# Departamentos de Colombia (forma plegada → nombre canónico), con alias frecuentes
+_SAN_ANDRES = 'ARCHIPIÉLAGO DE SAN ANDRÉS, PROVIDENCIA Y SANTA CATALINA'
+NOMBRES_CANONICOS: Dict[str, str] = _diccionario_canonico(
+    [
+        'AMAZONAS', 'ANTIOQUIA', 'ARAUCA', 'ATLÁNTICO', 'BOGOTÁ, D.C.', 'BOLÍVAR', 'BOYACÁ',
+        'CALDAS', 'CAQUETÁ', 'CASANARE', 'CAUCA', 'CESAR', 'CHOCÓ', 'CÓRDOBA', 'CUNDINAMARCA',
+        'GUAINÍA', 'GUAVIARE', 'HUILA', 'LA GUAJIRA', 'MAGDALENA', 'META', 'NARIÑO',
+        'NORTE DE SANTANDER', 'PUTUMAYO', 'QUINDÍO', 'RISARALDA', _SAN_ANDRES, 'SANTANDER',
+        'SUCRE', 'TOLIMA', 'VALLE DEL CAUCA', 'VAUPÉS', 'VICHADA'
+    ],
+    {
+        'BOGOTA': 'BOGOTÁ, D.C.', 'BOGOTA DC': 'BOGOTÁ, D.C.', 'SANTAFE DE BOGOTA': 'BOGOTÁ, D.C.',
+        'SANTA FE DE BOGOTA': 'BOGOTÁ, D.C.', 'GUAJIRA': 'LA GUAJIRA', 'VALLE': 'VALLE DEL CAUCA',
+        'NORTE SANTANDER': 'NORTE DE SANTANDER', 'SAN ANDRES': _SAN_ANDRES,
+        'SAN ANDRES Y PROVIDENCIA': _SAN_ANDRES, 'SAN ANDRES PROVIDENCIA Y SANTA CATALINA': _SAN_ANDRES
+    }
+)
+
+
+def codificar_texto(serie: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Devuelve (codigos, textos) tales que textos[codigos] equivale a serie.astype(str).
+    Las categóricas reutilizan sus categorías; el resto se factoriza una vez.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy().astype(np.intp)
+        textos = pd.Series(serie.cat.categories).astype(str).to_numpy(dtype=object)
+        faltantes = codigos < 0
+        if faltantes.any():
+            textos = np.append(textos, np.array(['nan'], dtype=object))
+            codigos[faltantes] = len(textos) - 1
+        return codigos, textos
+
+    if pd.api.types.infer_dtype(serie, skipna=True) not in ('string', 'empty'):
+        # Tipos mezclados (1, 1.0 y True se factorizarían juntos): primero a texto
+        serie = serie.astype(str)
+    codigos, unicos = pd.factorize(serie)
+    codigos = codigos.astype(np.intp)
+    textos = np.asarray(unicos, dtype=object)
+    faltantes = codigos < 0
+    if faltantes.any():
+        # Los nulos se convierten como lo haría astype(str): 'nan', 'None', '<NA>'...
+        codigos_nulos, textos_nulos = pd.factorize(serie[faltantes].astype(str))
+        codigos[faltantes] = codigos_nulos + len(textos)
+        textos = np.concatenate([textos, np.asarray(textos_nulos, dtype=object)])
+    return codigos, textos
+
+
+def _reconstruir(serie: pd.Series, valores_unicos: list, codigos: np.ndarray) -> pd.Series:
+    valores = np.empty(len(valores_unicos), dtype=object)
+    valores[:] = valores_unicos
+    return pd.Series(valores.take(codigos), index=serie.index, name=serie.name)
+
+
+def mapear_texto(serie: pd.Series, funcion: Callable[[str], object]) -> pd.Series:
+    """Equivale a serie.astype(str).map(funcion), evaluando funcion una vez por valor distinto"""
+    codigos, textos = codificar_texto(serie)
+    return _reconstruir(serie, [funcion(t) for t in textos], codigos)
+
+
+def a_texto(serie: pd.Series) -> pd.Series:
+    """Equivale a serie.astype(str); las columnas que ya son solo texto se devuelven sin copiar"""
+    if serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) == 'string':
+        faltantes = serie.isna().to_numpy()
+        if not faltantes.any():
+            return serie
+        valores = serie.to_numpy(copy=True)
+        valores[faltantes] = serie[faltantes].astype(str).to_numpy()
+        return pd.Series(valores, index=serie.index, name=serie.name)
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return mapear_texto(serie, str)
+    return serie.astype(str)
+
+
+def _limpiar_valor(texto: str):
+    texto = texto.strip()
+    return np.nan if texto in VALORES_NULOS_TEXTO else texto
+
+
+def limpiar_texto(serie: pd.Series) -> pd.Series:
+    """
+    Quita espacios y convierte a NaN los textos nulos ('nan', 'None', 'NaN', '').
+    Equivale a serie.astype(str).str.strip().replace(VALORES_NULOS_TEXTO, np.nan).
+    """
+    # infer_objects: como replace, una columna que queda toda nula pasa a float64
+    return mapear_texto(serie, _limpiar_valor).infer_objects()
+
+
+def normalizar_nombres(
+    serie: pd.Series,
+    nombres_canonicos: Dict[str, str] = None
+) -> Tuple[pd.Series, int]:
+    """
+    Unifica variantes de un mismo nombre (espacios, mayúsculas, tildes, puntuación).
+    Las variantes se agrupan por su forma plegada; cada grupo toma el nombre del
+    diccionario canónico (claves plegadas) o, si no está, su variante más frecuente.
+    Devuelve la serie normalizada y el número de variantes unificadas.
+    """
+    if nombres_canonicos is None:
+        nombres_canonicos = NOMBRES_CANONICOS
+    codigos, textos = codificar_texto(serie)
+    limpios = [_limpiar_valor(t) for t in textos]
+    frecuencias = np.bincount(codigos, minlength=len(textos))
+
+    claves = [plegar_texto(l) if isinstance(l, str) else None for l in limpios]
+
+    # Por forma plegada: variante de mayor frecuencia
+    elegidos: Dict[str, tuple] = {}
+    for limpio, clave, frecuencia in zip(limpios, claves, frecuencias):
+        if clave is not None and (clave not in elegidos or frecuencia > elegidos[clave][1]):
+            elegidos[clave] = (' '.join(limpio.split()), frecuencia)
+
+    resultado = [
+        nombres_canonicos.get(clave, elegidos[clave][0]) if clave is not None else limpio
+        for limpio, clave in zip(limpios, claves)
+    ]
+
+    presentes = frecuencias > 0
+    distintos_antes = len({l for l, p in zip(limpios, presentes) if p and isinstance(l, str)})
+    distintos_despues = len({r for r, p in zip(resultado, presentes) if p and isinstance(r, str)})
+    return _reconstruir(serie, resultado, codigos), distintos_antes - distintos_despues
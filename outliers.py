@@ -0,0 +1,323 @@
+"""
+Detección de outliers por columna (IQR, K-means, SVM) con un caché de resultados
+compartido por los estadísticos, el ICD y los cambios de método
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import OneClassSVM
+
+from cache_ingesta import CacheLRU
+from kmeans_1d import kmeans_optimo_1d
+from utils import VistaNumerica
+
+# Parámetros por defecto de cada detector (forman parte de la clave del caché).
+# SVM: max_filas=None es el ajuste exacto; el modo escalable se activa con un presupuesto de filas
+PARAMETROS_OUTLIERS: Dict[str, Dict] = {
+    'iqr': {'factor': 1.5},
+    'kmeans': {'n_clusters': 3, 'percentil': 90, 'backend': 'exacto', 'n_init': 10, 'random_state': 42},
+    'svm': {'nu': 0.1, 'gamma': 'auto', 'max_filas': None},
+}
+
+# 'exacto': k-means óptimo 1-D (kmeans_1d.py); 'sklearn': KMeans con n_init reinicios
+BACKENDS_KMEANS = ('exacto', 'sklearn')
+
+# Predicción del SVM escalable por lotes de valores distintos
+TAMANO_LOTE_SVM = 50000
+
+# Valores válidos mínimos para aplicar cada detector
+MINIMO_VALORES = {'iqr': 1, 'kmeans': 3, 'svm': 10}
+
+# Procesos disponibles para el cálculo paralelo por columnas (por defecto se ajusta en serie)
+PROCESOS_OUTLIERS = os.cpu_count() or 1
+
+# Valores a ajustar (suma de los ajustes pendientes) a partir de los que compensa repartirlos entre procesos
+MIN_VALORES_PARALELO = 100_000
+
+# Pool de procesos compartido por todas las llamadas y sesiones (ver _obtener_pool)
+_POOL: Optional[ProcessPoolExecutor] = None
+_PROCESOS_POOL = 0
+_LOCK_POOL = threading.Lock()
+
+# Máscaras de 21 variables × 3 métodos para varias versiones de los datos
+CACHE_OUTLIERS = CacheLRU(max_bytes=256 * 1024 ** 2, max_entradas=512)
+
+
+def huella_valores(valores: np.ndarray) -> str:
+    """Huella de los datos de una columna (valores válidos, en orden)"""
+    contenido = np.ascontiguousarray(valores, dtype=np.float64)
+    return f"{hashlib.blake2b(contenido.tobytes(), digest_size=16).hexdigest()}:{len(contenido)}"
+
+
+def _escalar(valores: np.ndarray) -> tuple:
+    """Datos estandarizados, media y escala (para aplicar el ajuste a valores nuevos)"""
+    escalador = StandardScaler()
+    datos = escalador.fit_transform(valores.reshape(-1, 1))
+    return datos, escalador.mean_[0], escalador.scale_[0]
+
+
+def _detectar_iqr(valores: np.ndarray, factor: float) -> Dict:
+    q1, q3 = np.quantile(valores, [0.25, 0.75])
+    iqr = q3 - q1
+    limite_inferior, limite_superior = q1 - factor * iqr, q3 + factor * iqr
+    return {
+        'mascara': (valores < limite_inferior) | (valores > limite_superior),
+        'q1': q1, 'q3': q3, 'limite_inferior': limite_inferior, 'limite_superior': limite_superior
+    }
+
+
+def _detectar_kmeans(valores: np.ndarray, n_clusters: int, percentil: float, backend: str,
+                     n_init: int, random_state: int) -> Dict:
+    """Distancia de cada valor al centroide más cercano; outliers por encima del percentil"""
+    datos, media, escala = _escalar(valores)
+    if backend == 'exacto':
+        centroides, _ = kmeans_optimo_1d(datos.ravel(), n_clusters)
+        distancias = np.min(np.abs(datos - centroides), axis=1)
+    else:
+        kmeans = KMeans(n_clusters=min(n_clusters, len(valores)), random_state=random_state, n_init=n_init)
+        kmeans.fit(datos)
+        centroides = kmeans.cluster_centers_.ravel()
+        distancias = np.min(kmeans.transform(datos), axis=1)
+    threshold = np.percentile(distancias, percentil)
+    return {
+        'mascara': distancias > threshold, 'threshold': threshold,
+        'media': media, 'escala': escala, 'centroides': centroides
+    }
+
+
+def _submuestra_estratificada(valores: np.ndarray, tamano: int) -> np.ndarray:
+    """Posiciones de tamano estadísticos de orden equiespaciados (un estrato por cuantil)"""
+    orden = np.argsort(valores, kind='stable')
+    return orden[np.linspace(0, len(valores) - 1, tamano).round().astype(np.intp)]
+
+
+def _detectar_svm(valores: np.ndarray, nu: float, gamma, max_filas: Optional[int]) -> Dict:
+    """
+    One-Class SVM sobre los datos estandarizados. Con más de max_filas valores
+    (presupuesto de filas) el modelo se ajusta sobre una submuestra estratificada
+    y se predice por lotes sobre los valores distintos; max_filas=None fuerza el
+    ajuste exacto sobre todas las filas.
+    """
+    datos, media, escala = _escalar(valores)
+    svm = OneClassSVM(nu=nu, kernel='rbf', gamma=gamma)
+    if max_filas is None or len(valores) <= max_filas:
+        mascara = svm.fit_predict(datos) == -1
+        filas_ajuste = len(valores)
+    else:
+        svm.fit(datos[_submuestra_estratificada(datos.ravel(), max_filas)])
+        mascara = _predecir_svm(svm, datos.ravel())
+        filas_ajuste = max_filas
+    return {'mascara': mascara, 'filas_ajuste': filas_ajuste, 'media': media, 'escala': escala, 'modelo': svm}
+
+
+def _predecir_svm(svm: OneClassSVM, datos: np.ndarray) -> np.ndarray:
+    """Outliers según un SVM ajustado, prediciendo por lotes sobre los valores distintos"""
+    unicos, inversa = np.unique(datos, return_inverse=True)
+    predicciones = np.concatenate([
+        svm.predict(unicos[inicio:inicio + TAMANO_LOTE_SVM].reshape(-1, 1))
+        for inicio in range(0, len(unicos), TAMANO_LOTE_SVM)
+    ])
+    return predicciones[inversa] == -1
+
+
+_DETECTORES = {'iqr': _detectar_iqr, 'kmeans': _detectar_kmeans, 'svm': _detectar_svm}
+
+
+def _parametros(metodo: str, parametros: Dict) -> Dict:
+    parametros = {**PARAMETROS_OUTLIERS[metodo], **parametros}
+    if metodo == 'kmeans' and parametros['backend'] not in BACKENDS_KMEANS:
+        raise ValueError(f"Backend de K-means desconocido: {parametros['backend']}")
+    return parametros
+
+
+def _clave(huella: str, metodo: str, parametros: Dict) -> str:
+    return f"{huella}:{metodo}:{json.dumps(parametros, sort_keys=True, default=str)}"
+
+
+def _ajustar(valores: np.ndarray, metodo: str, parametros: Dict) -> Dict:
+    """Ajuste sin caché; si falla, la máscara queda vacía como en los cálculos originales"""
+    try:
+        return _DETECTORES[metodo](np.asarray(valores, dtype=np.float64), **parametros)
+    except Exception:
+        return {'mascara': np.zeros(len(valores), dtype=bool), 'error': True}
+
+
+def _guardar(clave: str, resultado: Dict) -> Dict:
+    # Los resultados se comparten entre llamadas: la máscara no debe modificarse
+    resultado['mascara'].flags.writeable = False
+    CACHE_OUTLIERS.guardar(clave, resultado)
+    return resultado
+
+
+def detectar_outliers(valores: np.ndarray, metodo: str, huella: str = None, **parametros) -> Optional[Dict]:
+    """
+    Outliers de una columna (valores válidos) con el método indicado.
+    Devuelve un dict con 'mascara' (alineada con valores) y los umbrales o límites
+    del método, o None si no hay valores suficientes. El resultado se guarda en
+    CACHE_OUTLIERS por huella de los datos, método y parámetros: cada detector se
+    ajusta una sola vez por columna y versión de los datos.
+    """
+    if len(valores) < MINIMO_VALORES[metodo]:
+        return None
+    parametros = _parametros(metodo, parametros)
+    clave = _clave(huella if huella is not None else huella_valores(valores), metodo, parametros)
+
+    resultado = CACHE_OUTLIERS.obtener(clave)
+    if resultado is not None:
+        return resultado
+    return _guardar(clave, _ajustar(valores, metodo, parametros))
+
+
+def _valores_columna(vista: VistaNumerica, columna: str) -> tuple:
+    """(valores válidos, huella) de una columna de la vista; la huella se memoriza en la vista"""
+    j = vista.posicion(columna)
+    valores = vista.matriz[~vista.nulos[:, j], j]
+    huellas = vista.cache.setdefault('huellas', {})
+    if columna not in huellas:
+        huellas[columna] = huella_valores(valores)
+    return valores, huellas[columna]
+
+
+def outliers_columna(vista: VistaNumerica, columna: str, metodo: str, **parametros) -> Optional[Dict]:
+    """detectar_outliers sobre los valores válidos de una columna de la vista"""
+    valores, huella = _valores_columna(vista, columna)
+    return detectar_outliers(valores, metodo, huella=huella, **parametros)
+
+
+def _ajustar_en_proceso(nombre_memoria: str, forma: tuple, j: int, metodo: str, parametros: Dict) -> Dict:
+    """Ajuste en un proceso del pool: lee la columna j de la matriz en memoria compartida"""
+    memoria = shared_memory.SharedMemory(name=nombre_memoria)
+    try:
+        matriz = np.ndarray(forma, dtype=np.float64, buffer=memoria.buf)
+        columna = matriz[:, j]
+        valores = columna[~np.isnan(columna)]
+        del matriz, columna
+    finally:
+        memoria.close()
+    return _ajustar(valores, metodo, parametros)
+
+
+def _obtener_pool(n_procesos: int) -> ProcessPoolExecutor:
+    """
+    Pool de procesos del módulo, creado la primera vez y reutilizado en las llamadas
+    siguientes; solo se sustituye si cambia el número de procesos
+    """
+    global _POOL, _PROCESOS_POOL
+    with _LOCK_POOL:
+        if _POOL is None or _PROCESOS_POOL != n_procesos:
+            if _POOL is not None:
+                # Los ajustes ya enviados al pool anterior terminan igualmente
+                _POOL.shutdown(wait=False)
+            # spawn: los procesos no heredan los hilos del servidor de Streamlit
+            _POOL = ProcessPoolExecutor(max_workers=n_procesos, mp_context=multiprocessing.get_context('spawn'))
+            _PROCESOS_POOL = n_procesos
+        return _POOL
+
+
+def _descartar_pool(pool: ProcessPoolExecutor):
+    """Olvida un pool roto (p. ej. un proceso terminó de forma abrupta) para crear otro la próxima vez"""
+    global _POOL, _PROCESOS_POOL
+    with _LOCK_POOL:
+        if _POOL is pool:
+            _POOL, _PROCESOS_POOL = None, 0
+    pool.shutdown(wait=False)
+
+
+def precalcular_outliers(vista: VistaNumerica, metodos: List[str], parametros_outliers: Dict[str, Dict] = None,
+                         n_procesos: int = 1) -> int:
+    """
+    Ajusta en paralelo (hasta n_procesos, con el pool compartido del módulo) los
+    detectores de cada columna y método que aún no estén en CACHE_OUTLIERS.
+    Con pocos valores a ajustar (MIN_VALORES_PARALELO) se ajusta en serie, que es
+    más rápido que repartir. La matriz se comparte con los procesos una sola vez
+    (memoria compartida) y los resultados se guardan en orden fijo de columna y
+    método, así que las llamadas posteriores a outliers_columna dan lo mismo que
+    el cálculo en serie. Devuelve el número de ajustes realizados.
+    """
+    parametros_outliers = parametros_outliers or {}
+    pendientes = []
+    valores_pendientes = 0
+    for j, col in enumerate(vista.columnas):
+        valores, huella = _valores_columna(vista, col)
+        for metodo in metodos:
+            if len(valores) < MINIMO_VALORES[metodo]:
+                continue
+            parametros = _parametros(metodo, parametros_outliers.get(metodo, {}))
+            clave = _clave(huella, metodo, parametros)
+            if CACHE_OUTLIERS.obtener(clave) is None:
+                pendientes.append((j, metodo, parametros, clave))
+                valores_pendientes += len(valores)
+
+    if n_procesos <= 1 or len(pendientes) <= 1 or valores_pendientes < MIN_VALORES_PARALELO:
+        for j, metodo, parametros, clave in pendientes:
+            _guardar(clave, _ajustar(vista.matriz[~vista.nulos[:, j], j], metodo, parametros))
+        return len(pendientes)
+
+    memoria = shared_memory.SharedMemory(create=True, size=max(vista.matriz.nbytes, 1))
+    try:
+        np.ndarray(vista.matriz.shape, dtype=np.float64, buffer=memoria.buf)[:] = vista.matriz
+        pool = _obtener_pool(min(n_procesos, PROCESOS_OUTLIERS))
+        try:
+            futuros = [
+                pool.submit(_ajustar_en_proceso, memoria.name, vista.matriz.shape, j, metodo, parametros)
+                for j, metodo, parametros, _ in pendientes
+            ]
+            resultados = [futuro.result() for futuro in futuros]
+        except BrokenProcessPool:
+            _descartar_pool(pool)
+            resultados = [
+                _ajustar(vista.matriz[~vista.nulos[:, j], j], metodo, parametros)
+                for j, metodo, parametros, _ in pendientes
+            ]
+        for (_, _, _, clave), resultado in zip(pendientes, resultados):
+            _guardar(clave, resultado)
+    finally:
+        memoria.close()
+        memoria.unlink()
+    return len(pendientes)
+
+
+def distancias_kmeans(resultado: Dict, valores: np.ndarray) -> np.ndarray:
+    """Distancia de valores (nuevos o no) al centroide más cercano de un ajuste de K-means"""
+    datos = (np.asarray(valores, dtype=np.float64) - resultado['media']) / resultado['escala']
+    return np.min(np.abs(datos[:, np.newaxis] - resultado['centroides']), axis=1)
+
+
+def predecir_svm(resultado: Dict, valores: np.ndarray) -> np.ndarray:
+    """Máscara de outliers de valores (nuevos o no) según un ajuste de SVM"""
+    datos = (np.asarray(valores, dtype=np.float64) - resultado['media']) / resultado['escala']
+    return _predecir_svm(resultado['modelo'], datos)
+
+
+def concordancia_svm(valores: np.ndarray, max_filas: int, nu: float = 0.1, gamma='auto') -> Dict:
+    """
+    Compara el SVM escalable (presupuesto max_filas) con el exacto sobre los
+    mismos valores: outliers de cada uno, proporción de filas con la misma
+    clasificación, Jaccard de los outliers y segundos de cada ajuste.
+    """
+    inicio = time.perf_counter()
+    exacto = _detectar_svm(valores, nu, gamma, max_filas=None)['mascara']
+    segundos_exacto = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    escalable = _detectar_svm(valores, nu, gamma, max_filas=max_filas)['mascara']
+    segundos_escalable = time.perf_counter() - inicio
+
+    union = (exacto | escalable).sum()
+    return {
+        'filas': len(valores), 'max_filas': max_filas,
+        'outliers_exacto': int(exacto.sum()), 'outliers_escalable': int(escalable.sum()),
+        'concordancia': float((exacto == escalable).mean()),
+        'jaccard': float((exacto & escalable).sum() / union) if union > 0 else 1.0,
+        'segundos_exacto': segundos_exacto, 'segundos_escalable': segundos_escalable,
+    }
@@ -6,21 +6,18 @@ import pandas as pd
 import numpy as np
 import os
 import sys
-import importlib
-
-import utils          
-import calidad_datos
-import visualizaciones
-
-importlib.reload(utils)
-importlib.reload(calidad_datos)
-importlib.reload(visualizaciones)
 
 # Agregar path del proyecto
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import VARIABLES_ESTADISTICAS, preparar_dataframe_numerico
+from utils import COLUMNAS_AGRUPACION, VARIABLES_ESTADISTICAS, obtener_vista_numerica
 from calidad_datos import calcular_indice_calidad_datos, generar_recomendaciones
-from visualizaciones import calcular_estadisticos, crear_histogramas, crear_boxplots, crear_matriz_correlacion
+from estadisticas import spearman_exacto
+from incremental import UMBRAL_REAJUSTE, EstadoIncremental
+from ingesta import agregar_filas_nuevas, ingerir_archivo
+from visualizaciones import (MIN_FILAS_GRUPO, calcular_correlaciones_fuertes, calcular_estadisticos,
+                             calcular_estadisticos_por_grupo, crear_histogramas, crear_boxplots,
+                             crear_matriz_correlacion)
+from outliers import PARAMETROS_OUTLIERS, PROCESOS_OUTLIERS
 
 st.set_page_config(page_title="Estadísticos", page_icon="📊", layout="wide")
 
@@ -106,6 +103,45 @@ with col1:
         }[x],
         help="Selecciona el método para calcular la dimensión de Precisión en el ICD"
     )
+    
+    max_filas_svm = st.number_input(
+        "🤖 Presupuesto de filas para SVM (0 = ajuste exacto):",
+        min_value=0, value=PARAMETROS_OUTLIERS['svm']['max_filas'] or 0, step=1000,
+        help="Opcional. Con más filas válidas que este presupuesto, el SVM se ajusta sobre una submuestra "
+             "estratificada y se predice por lotes (aproximado); el ajuste exacto crece de forma cuadrática"
+    )
+    parametros_outliers = {'svm': {'max_filas': int(max_filas_svm) or None}}
+    
+    n_procesos = st.number_input(
+        "⚙️ Procesos para detectar outliers:",
+        min_value=1, max_value=PROCESOS_OUTLIERS, value=1, step=1,
+        help="Con datos grandes las variables se reparten entre procesos; el resultado es el mismo que en serie"
+    )
+    
+    claves_grupo = st.multiselect(
+        "📍 Estadísticos por grupo:",
+        options=[c for c in COLUMNAS_AGRUPACION if c in df.columns],
+        help="Calcula la tabla de estadísticos para cada combinación de las columnas elegidas "
+             "(p. ej. departamento y municipio)"
+    )
+    
+    min_filas_grupo = st.number_input(
+        "🔢 Filas mínimas por grupo:",
+        min_value=1, value=MIN_FILAS_GRUPO, step=1,
+        help="Los grupos con menos filas se omiten de la tabla por grupo"
+    )
+    
+    metodo_correlacion = st.selectbox(
+        "🔥 Método de correlación:",
+        options=['pearson', 'spearman'],
+        format_func=lambda x: {
+            'pearson': '📈 Pearson - Relación lineal',
+            'spearman': '📶 Spearman - Relación monótona (rangos)'
+        }[x],
+        help="Correlación por pares completos: cada par usa las filas donde ambas variables tienen dato. "
+             "Spearman calcula los rangos sobre esas filas salvo con muchos patrones de nulos distintos, "
+             "donde usa los rangos de toda la variable (aproximado)"
+    )
 
 # ============================================================================
 # ANÁLISIS
@@ -113,7 +149,12 @@ with col1:
 
 if analizar_btn and variables_seleccionadas:
     with st.spinner("📊 Generando análisis..."):
-        stats_df = calcular_estadisticos(df, variables_seleccionadas)
+        # Conversión numérica única, compartida por estadísticos, ICD y gráficos
+        vista = obtener_vista_numerica(df, variables_seleccionadas)
+        stats_df = calcular_estadisticos(
+            df, variables_seleccionadas, vista=vista,
+            parametros_outliers=parametros_outliers, n_procesos=int(n_procesos)
+        )
         
         if stats_df is not None:
             st.divider()
@@ -153,6 +194,33 @@ if analizar_btn and variables_seleccionadas:
                 use_container_width=True
             )
             
+            # Estadísticos por grupo (departamento, municipio, cultivo)
+            if claves_grupo:
+                st.markdown(f"### 📍 Estadísticos por {', '.join(claves_grupo)}")
+                
+                with st.spinner("Calculando estadísticos por grupo..."):
+                    stats_grupo = calcular_estadisticos_por_grupo(
+                        df, variables_seleccionadas, claves_grupo,
+                        min_filas=int(min_filas_grupo), vista=vista
+                    )
+                
+                if stats_grupo is None:
+                    st.info(f"ℹ️ Ningún grupo tiene al menos {int(min_filas_grupo)} filas")
+                else:
+                    for col in numeric_columns:
+                        stats_grupo[col] = stats_grupo[col].round(3)
+                    n_grupos = len(stats_grupo) // len(vista.columnas)
+                    st.caption(f"{n_grupos} grupos con al menos {int(min_filas_grupo)} filas")
+                    st.dataframe(stats_grupo, use_container_width=True, hide_index=True, height=400)
+                    
+                    st.download_button(
+                        label="📥 Descargar estadísticos por grupo como CSV",
+                        data=stats_grupo.to_csv(index=False).encode('utf-8'),
+                        file_name=f"estadisticos_por_{'_'.join(claves_grupo)}.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+            
             st.divider()
             
             # SECCIÓN 2: ÍNDICE DE CALIDAD DE DATOS
@@ -163,7 +231,10 @@ if analizar_btn and variables_seleccionadas:
                     df=df,
                     variables_numericas=variables_seleccionadas,
                     columnas_esperadas=VARIABLES_ESTADISTICAS,
-                    metodo_outliers=metodo_outliers
+                    metodo_outliers=metodo_outliers,
+                    vista=vista,
+                    parametros_outliers=parametros_outliers,
+                    n_procesos=int(n_procesos)
                 )
             
             # Métrica principal
@@ -376,7 +447,7 @@ if analizar_btn and variables_seleccionadas:
             
             with viz_tab1:
                 st.markdown("#### Distribución de Variables")
-                fig_hist = crear_histogramas(df, variables_seleccionadas)
+                fig_hist = crear_histogramas(df, variables_seleccionadas, vista=vista)
                 if fig_hist:
                     st.plotly_chart(fig_hist, use_container_width=True)
                 else:
@@ -384,7 +455,7 @@ if analizar_btn and variables_seleccionadas:
             
             with viz_tab2:
                 st.markdown("#### Detección de Valores Atípicos")
-                fig_box = crear_boxplots(df, variables_seleccionadas)
+                fig_box = crear_boxplots(df, variables_seleccionadas, vista=vista)
                 if fig_box:
                     st.plotly_chart(fig_box, use_container_width=True)
                 else:
@@ -393,36 +464,24 @@ if analizar_btn and variables_seleccionadas:
             with viz_tab3:
                 st.markdown("#### Relaciones entre Variables")
                 if len(variables_seleccionadas) >= 2:
-                    fig_corr = crear_matriz_correlacion(df, variables_seleccionadas)
+                    fig_corr = crear_matriz_correlacion(df, variables_seleccionadas, vista=vista, metodo=metodo_correlacion)
                     if fig_corr:
                         st.plotly_chart(fig_corr, use_container_width=True)
+                        if metodo_correlacion == 'spearman' and not spearman_exacto(vista.nulos):
+                            st.caption(
+                                "📶 Spearman aproximado: demasiados patrones de nulos distintos para recalcular "
+                                "los rangos de cada par; se usan los rangos de toda la variable (diferencia típica "
+                                "< 0,001 con miles de filas, mayor con pocas filas en común)"
+                            )
                         
-                        df_numeric = preparar_dataframe_numerico(df, variables_seleccionadas)
+                        # Misma matriz que el mapa de calor (guardada en la vista)
+                        df_corr = calcular_correlaciones_fuertes(
+                            df, variables_seleccionadas, vista=vista, metodo=metodo_correlacion, k=10
+                        )
                         
-                        if len(df_numeric.columns) >= 2:
-                            corr_matrix = df_numeric.corr()
-                            
-                            correlaciones = []
-                            for i in range(len(corr_matrix.columns)):
-                                for j in range(i+1, len(corr_matrix.columns)):
-                                    corr_val = corr_matrix.iloc[i, j]
-                                    if not pd.isna(corr_val):
-                                        correlaciones.append({
-                                            'Variable 1': corr_matrix.columns[i],
-                                            'Variable 2': corr_matrix.columns[j],
-                                            'Correlación': corr_val
-                                        })
-                            
-                            if correlaciones:
-                                df_corr = pd.DataFrame(correlaciones)
-                                df_corr['Correlacion_abs'] = df_corr['Correlación'].abs()
-                                df_corr = df_corr.sort_values('Correlacion_abs', ascending=False)
-                                
-                                st.markdown("##### Top 10 Correlaciones más Fuertes")
-                                st.dataframe(
-                                    df_corr.head(10)[['Variable 1', 'Variable 2', 'Correlación']].round(3),
-                                    use_container_width=True, hide_index=True
-                                )
+                        if df_corr is not None and len(df_corr) > 0:
+                            st.markdown("##### Top 10 Correlaciones más Fuertes")
+                            st.dataframe(df_corr.round(3), use_container_width=True, hide_index=True)
                     else:
                         st.warning("No se pudo generar la matriz de correlación")
                 else:
@@ -433,3 +492,79 @@ if analizar_btn and variables_seleccionadas:
 
 elif analizar_btn:
     st.warning("⚠️ Por favor selecciona al menos una variable para analizar")
+
+# ============================================================================
+# FILAS NUEVAS (REFRESCO INCREMENTAL)
+# ============================================================================
+
+st.divider()
+with st.expander("➕ Agregar filas nuevas"):
+    st.caption(
+        "Agrega al final de los datos las filas de un archivo con las mismas columnas y actualiza "
+        "estadísticos e ICD solo con ellas. K-means y SVM aplican su último ajuste a las filas nuevas y se "
+        f"reajustan cuando los valores agregados superan el {UMBRAL_REAJUSTE:.0%} de los usados en el ajuste."
+    )
+    archivo_filas = st.file_uploader(
+        "Archivo con las filas nuevas:", type=['csv', 'xlsx', 'xls'], key="archivo_filas_nuevas"
+    )
+    agregar_btn = st.button(
+        "➕ Agregar filas", disabled=archivo_filas is None or not variables_seleccionadas,
+        use_container_width=True, help="Usa las variables, el método de outliers y el presupuesto SVM de arriba"
+    )
+    
+    # El estado se reutiliza mientras no cambien los datos, las variables ni el presupuesto SVM
+    clave_estado = (st.session_state.get('clave_datos'), tuple(variables_seleccionadas), int(max_filas_svm))
+    if agregar_btn:
+        registro = st.session_state.get('estado_incremental')
+        try:
+            with st.spinner("🔁 Refrescando estadísticos e ICD..."):
+                delta = ingerir_archivo(archivo_filas.getvalue(), archivo_filas.name, {})['df_original']
+                # Las filas del archivo continúan el índice de los datos
+                inicio_indice = int(df.index.max()) + 1 if len(df) else 0
+                delta.index = pd.RangeIndex(inicio_indice, inicio_indice + len(delta))
+                
+                if registro is None or registro[0] != clave_estado:
+                    estado = EstadoIncremental(
+                        df, variables_seleccionadas, parametros_outliers, n_procesos=int(n_procesos)
+                    )
+                else:
+                    estado = registro[1]
+                # Si algo falla tras modificar el estado, se reconstruye en el próximo intento
+                st.session_state.estado_incremental = None
+                refresco = agregar_filas_nuevas(df, delta, estado, VARIABLES_ESTADISTICAS, metodo_outliers)
+            
+            df_procesado = st.session_state.df
+            st.session_state.df_original = refresco['df']
+            # Las filas nuevas se agregan sin limpieza también a los datos procesados
+            st.session_state.df = refresco['df'] if df_procesado is df else pd.concat([df_procesado, delta])
+            st.session_state.clave_datos = (st.session_state.get('clave_datos'), 'filas', estado.version)
+            st.session_state.diff_datos = None
+            clave_estado = (st.session_state.clave_datos,) + clave_estado[1:]
+            st.session_state.estado_incremental = (clave_estado, estado, refresco)
+        except Exception as e:
+            st.error(f"❌ No se pudieron agregar las filas: {str(e)}")
+    
+    registro = st.session_state.get('estado_incremental')
+    if registro is not None and registro[0] == clave_estado and registro[2] is not None:
+        refresco = registro[2]
+        info = refresco['refresco']
+        col1, col2, col3 = st.columns(3)
+        col1.metric("🔢 Versión", info['version'])
+        col2.metric("➕ Filas nuevas", f"{info['filas_nuevas']:,}", help=f"{info['filas']:,} filas en total")
+        col3.metric("⏱️ Refresco", f"{info['segundos']:.2f} s")
+        
+        reajustadas = {metodo: cols for metodo, cols in info['reajustes'].items() if cols}
+        if reajustadas:
+            st.caption("🔄 Detectores reajustados: " + "; ".join(
+                f"{metodo}: {', '.join(cols)}" for metodo, cols in reajustadas.items()
+            ))
+        
+        st.markdown("#### 🎯 Cambios en el ICD")
+        st.dataframe(refresco['cambios']['icd'].round(2), use_container_width=True, hide_index=True)
+        
+        st.markdown("#### 📋 Estadísticos que cambiaron")
+        cambios_estadisticos = refresco['cambios']['estadisticos']
+        if len(cambios_estadisticos) > 0:
+            st.dataframe(cambios_estadisticos.round(3), use_container_width=True, hide_index=True, height=400)
+        else:
+            st.info("📊 Ningún estadístico cambió")
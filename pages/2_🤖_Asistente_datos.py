@@ -75,9 +75,11 @@ def create_agent():
         temperature=temperature,
         openai_api_key=openai_api_key
     )
+    # Copia superficial (Copy-on-Write, activado en Inicio.py): el código del agente
+    # no puede alterar el DataFrame compartido de la sesión
     return create_pandas_dataframe_agent(
         llm,
-        st.session_state.df,
+        st.session_state.df.copy(deep=False),
         verbose=False,
         agent_type=AgentType.OPENAI_FUNCTIONS,
         allow_dangerous_code=True
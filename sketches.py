@@ -0,0 +1,338 @@
+"""
+Resúmenes (sketches) combinables para datos que llegan por bloques, particiones o procesos:
+momentos (Welford/Pébay), cuantiles (KLL) y conteo de distintos (HyperLogLog).
+
+Cotas de error:
+- Momentos: exactos salvo redondeo; la combinación por pares de Pébay es estable.
+- KLL: error de rango normalizado O(1/k). Medido sobre 300.000 datos lognormales por
+  bloques (máximo en 999 cuantiles, 20 repeticiones): k=200 → ≤ 1,1 %, k=1000 → ≤ 0,25 %.
+  Mientras un sketch no ha compactado (menos de k datos) los cuantiles son exactos.
+  Los conteos fuera de un rango tienen error absoluto del mismo orden (ε · n).
+- HyperLogLog: error relativo estándar 1,04/√(2^p) (p=14 → 0,81 %; 16 KB por sketch).
+  Las filas duplicadas se estiman como filas − filas distintas, así que su error
+  absoluto es el de las filas distintas y no el de los duplicados: una diferencia
+  dentro de SIGMAS_DUPLICADOS errores estándar (3 · 0,81 % de las filas con p=14)
+  no se distingue del error de conteo y se da como 0.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from estadisticas import PROBABILIDADES, asimetria_curtosis, varianza_muestral
+from utils import preparar_dataframe_numerico
+
+# Parámetros por defecto (ver cotas de error arriba)
+K_KLL = 1000
+PRECISION_HLL = 14
+
+# Errores estándar del HLL dentro de los cuales filas − filas distintas se da como 0 duplicados
+SIGMAS_DUPLICADOS = 3
+
+
+class Momentos:
+    """Conteo, media y sumas centradas M2, M3, M4 por columna, combinables por pares"""
+
+    def __init__(self, n_columnas: int):
+        self.conteo = np.zeros(n_columnas)
+        self.media = np.zeros(n_columnas)
+        self.m2 = np.zeros(n_columnas)
+        self.m3 = np.zeros(n_columnas)
+        self.m4 = np.zeros(n_columnas)
+
+    @classmethod
+    def desde_matriz(cls, matriz: np.ndarray, nulos: np.ndarray) -> 'Momentos':
+        """Momentos de un bloque en dos pasadas (media y luego desviaciones)"""
+        momentos = cls(matriz.shape[1])
+        momentos.conteo = (~nulos).sum(axis=0).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = np.where(nulos, 0.0, matriz).sum(axis=0) / momentos.conteo
+        momentos.media = np.where(momentos.conteo > 0, media, 0.0)
+        desviacion = np.where(nulos, 0.0, matriz - momentos.media)
+        d2 = desviacion ** 2
+        momentos.m2 = d2.sum(axis=0)
+        momentos.m3 = (d2 * desviacion).sum(axis=0)
+        momentos.m4 = (d2 ** 2).sum(axis=0)
+        return momentos
+
+    def combinar(self, otro: 'Momentos') -> 'Momentos':
+        """Momentos de la unión de ambos conjuntos (fórmulas de Pébay, 2008)"""
+        na, nb = self.conteo, otro.conteo
+        n = na + nb
+        n_seguro = np.where(n > 0, n, 1.0)
+        delta = otro.media - self.media
+        combinado = Momentos(len(n))
+        combinado.conteo = n
+        combinado.media = self.media + delta * nb / n_seguro
+        combinado.m2 = self.m2 + otro.m2 + delta ** 2 * na * nb / n_seguro
+        combinado.m3 = (
+            self.m3 + otro.m3 + delta ** 3 * na * nb * (na - nb) / n_seguro ** 2
+            + 3 * delta * (na * otro.m2 - nb * self.m2) / n_seguro
+        )
+        combinado.m4 = (
+            self.m4 + otro.m4 + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / n_seguro ** 3
+            + 6 * delta ** 2 * (na * na * otro.m2 + nb * nb * self.m2) / n_seguro ** 2
+            + 4 * delta * (na * otro.m3 - nb * self.m3) / n_seguro
+        )
+        return combinado
+
+    def describir(self) -> Dict[str, np.ndarray]:
+        """Media, desviación (ddof=1), asimetría y curtosis con las fórmulas de pandas"""
+        asimetria, curtosis = asimetria_curtosis(self.conteo, self.m2, self.m3, self.m4)
+        return {
+            'conteo': self.conteo.astype(np.int64),
+            'media': np.where(self.conteo > 0, self.media, np.nan),
+            'std': np.sqrt(varianza_muestral(self.conteo, self.m2)),
+            'asimetria': asimetria,
+            'curtosis': curtosis,
+        }
+
+
+class SketchKLL:
+    """
+    Sketch KLL de cuantiles (Karnin, Lang y Liberty, 2016). El nivel h guarda
+    elementos de peso 2^h; al llenarse un nivel se ordena y se promueve uno de
+    cada dos elementos (desfase aleatorio) al nivel siguiente. Las capacidades
+    decrecen en proporción 2/3 hacia los niveles bajos.
+    """
+
+    def __init__(self, k: int = K_KLL, semilla: int = 0):
+        self.k = k
+        self.n = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self.niveles: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(semilla)
+
+    def _capacidad(self, nivel: int) -> int:
+        return max(8, int(np.ceil(self.k * (2 / 3) ** (len(self.niveles) - 1 - nivel))))
+
+    def _compactar(self):
+        nivel = 0
+        while nivel < len(self.niveles):
+            if len(self.niveles[nivel]) > self._capacidad(nivel):
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0))
+                elementos = np.sort(self.niveles[nivel])
+                # Con cantidad impar, el menor se queda en este nivel
+                resto, elementos = elementos[:len(elementos) % 2], elementos[len(elementos) % 2:]
+                promovidos = elementos[self._rng.integers(2)::2]
+                self.niveles[nivel + 1] = np.concatenate([self.niveles[nivel + 1], promovidos])
+                self.niveles[nivel] = resto
+            nivel += 1
+
+    def actualizar(self, valores: np.ndarray):
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if len(valores) == 0:
+            return
+        self.n += len(valores)
+        self.minimo = min(self.minimo, valores.min())
+        self.maximo = max(self.maximo, valores.max())
+        self.niveles[0] = np.concatenate([self.niveles[0], valores])
+        self._compactar()
+
+    def combinar(self, otro: 'SketchKLL') -> 'SketchKLL':
+        combinado = SketchKLL(self.k, semilla=int(self._rng.integers(2 ** 31)))
+        combinado.n = self.n + otro.n
+        combinado.minimo, combinado.maximo = min(self.minimo, otro.minimo), max(self.maximo, otro.maximo)
+        alto = max(len(self.niveles), len(otro.niveles))
+        combinado.niveles = [
+            np.concatenate([a[h] for a in (self.niveles, otro.niveles) if h < len(a)]) for h in range(alto)
+        ]
+        combinado._compactar()
+        return combinado
+
+    @property
+    def exacto(self) -> bool:
+        """True si no se ha compactado nada (el sketch guarda todos los datos)"""
+        return len(self.niveles) == 1
+
+    def _ponderados(self) -> Tuple[np.ndarray, np.ndarray]:
+        elementos = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(nivel), 2.0 ** h) for h, nivel in enumerate(self.niveles)])
+        orden = np.argsort(elementos, kind='stable')
+        return elementos[orden], pesos[orden]
+
+    def cuantiles(self, probabilidades) -> np.ndarray:
+        """Cuantiles aproximados (exactos, con interpolación lineal, mientras no haya compactación)"""
+        probabilidades = np.asarray(probabilidades, dtype=np.float64)
+        if self.n == 0:
+            return np.full(len(probabilidades), np.nan)
+        if self.exacto:
+            return np.quantile(self.niveles[0], probabilidades)
+        elementos, pesos = self._ponderados()
+        # Cada elemento representa la posición central de los datos que resume
+        posiciones = np.cumsum(pesos) - pesos / 2
+        resultado = np.interp(probabilidades * pesos.sum(), posiciones, elementos)
+        resultado[probabilidades <= 0] = self.minimo
+        resultado[probabilidades >= 1] = self.maximo
+        return resultado
+
+    def contar_fuera(self, limite_inferior: float, limite_superior: float) -> float:
+        """Datos estimados por debajo de limite_inferior o por encima de limite_superior"""
+        if self.n == 0:
+            return 0.0
+        elementos, pesos = self._ponderados()
+        fuera = (elementos < limite_inferior) | (elementos > limite_superior)
+        return float(pesos[fuera].sum())
+
+
+def _longitud_bits(valores: np.ndarray) -> np.ndarray:
+    """Bits significativos de cada uint64 (0 para el cero), sin pérdidas por redondeo"""
+    alto = (valores >> np.uint64(32)).astype(np.float64)
+    bajo = (valores & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(alto > 0, 32 + np.frexp(alto)[1], np.frexp(bajo)[1])
+
+
+class SketchHLL:
+    """HyperLogLog (Flajolet et al., 2007) con 2^p registros sobre hashes de 64 bits"""
+
+    def __init__(self, p: int = PRECISION_HLL):
+        self.p = p
+        self.registros = np.zeros(1 << p, dtype=np.uint8)
+
+    def actualizar_hashes(self, hashes: np.ndarray):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return
+        indices = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        resto = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        rangos = (64 - self.p) - _longitud_bits(resto) + 1
+        np.maximum.at(self.registros, indices, rangos.astype(np.uint8))
+
+    def actualizar(self, valores: np.ndarray):
+        """Añade valores (no nulos) mediante su hash"""
+        valores = np.asarray(valores)
+        if valores.dtype.kind == 'f':
+            # + 0.0 unifica -0.0 y 0.0, que nunique cuenta como el mismo valor
+            valores = valores[~np.isnan(valores)] + 0.0
+        self.actualizar_hashes(pd.util.hash_array(valores))
+
+    def combinar(self, otro: 'SketchHLL') -> 'SketchHLL':
+        combinado = SketchHLL(self.p)
+        combinado.registros = np.maximum(self.registros, otro.registros)
+        return combinado
+
+    def estimar(self) -> float:
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimacion = alfa * m * m / np.sum(2.0 ** -self.registros.astype(np.float64))
+        ceros = int((self.registros == 0).sum())
+        if estimacion <= 2.5 * m and ceros > 0:
+            # Rango bajo: conteo lineal
+            estimacion = m * np.log(m / ceros)
+        return float(estimacion)
+
+
+class ResumenSketches:
+    """
+    Resumen combinable de un conjunto de datos para estadísticos e ICD sin tener
+    todas las filas en memoria. Las variables se fijan con el primer bloque (las
+    disponibles de la lista, o todas las columnas como en preparar_dataframe_numerico).
+    Son exactos: filas, nulos, nulos originales, mínimo, máximo y momentos.
+    Son aproximados: cuantiles (KLL), valores distintos y filas distintas (HLL).
+    """
+
+    def __init__(self, variables: List[str] = None, k: int = K_KLL, p: int = PRECISION_HLL):
+        self.variables_solicitadas = variables
+        self.k, self.p = k, p
+        self.filas = 0
+        self.iniciado = False
+        self._crear_sketches([], [])
+
+    def _crear_sketches(self, columnas_datos: List[str], variables: List[str]):
+        self.columnas_datos, self.variables = columnas_datos, variables
+        n = len(variables)
+        self.nulos = np.zeros(n, dtype=np.int64)
+        self.nulos_originales = np.zeros(n, dtype=np.int64)
+        self.momentos = Momentos(n)
+        self.cuantiles = [SketchKLL(self.k, semilla=j) for j in range(n)]
+        self.distintos = [SketchHLL(self.p) for _ in range(n)]
+        self.filas_distintas = SketchHLL(self.p)
+
+    def actualizar(self, bloque: pd.DataFrame) -> 'ResumenSketches':
+        """Añade un bloque de filas (mismas columnas que el primero)"""
+        if not self.iniciado:
+            variables = preparar_dataframe_numerico(bloque.head(0), self.variables_solicitadas).columns
+            self._crear_sketches(list(bloque.columns), list(variables))
+            self.iniciado = True
+        if not self.variables:
+            self.filas += len(bloque)
+            return self
+        numerico = preparar_dataframe_numerico(bloque, self.variables_solicitadas)
+        numerico = numerico.reindex(columns=self.variables)
+        matriz = numerico.to_numpy(dtype=np.float64)
+        nulos = np.isnan(matriz)
+
+        self.filas += len(bloque)
+        self.nulos += nulos.sum(axis=0)
+        self.nulos_originales += bloque.reindex(columns=self.variables).isnull().to_numpy().sum(axis=0)
+        self.momentos = self.momentos.combinar(Momentos.desde_matriz(matriz, nulos))
+        for j in range(len(self.variables)):
+            validos = matriz[~nulos[:, j], j]
+            self.cuantiles[j].actualizar(validos)
+            self.distintos[j].actualizar(validos)
+        self.filas_distintas.actualizar_hashes(pd.util.hash_pandas_object(numerico, index=False).to_numpy())
+        return self
+
+    def combinar(self, otro: 'ResumenSketches') -> 'ResumenSketches':
+        """Resumen de la unión de dos particiones con las mismas variables"""
+        if not otro.iniciado:
+            return self
+        if not self.iniciado:
+            return otro
+        if otro.variables != self.variables:
+            raise ValueError("Los resúmenes tienen variables distintas")
+        combinado = ResumenSketches(self.variables_solicitadas, self.k, self.p)
+        combinado.columnas_datos, combinado.variables = self.columnas_datos, self.variables
+        combinado.iniciado = True
+        combinado.filas = self.filas + otro.filas
+        combinado.nulos = self.nulos + otro.nulos
+        combinado.nulos_originales = self.nulos_originales + otro.nulos_originales
+        combinado.momentos = self.momentos.combinar(otro.momentos)
+        combinado.cuantiles = [a.combinar(b) for a, b in zip(self.cuantiles, otro.cuantiles)]
+        combinado.distintos = [a.combinar(b) for a, b in zip(self.distintos, otro.distintos)]
+        combinado.filas_distintas = self.filas_distintas.combinar(otro.filas_distintas)
+        return combinado
+
+    def descriptivos(self) -> Dict[str, np.ndarray]:
+        """Mismo formato que estadisticas.describir_matriz"""
+        desc = self.momentos.describir()
+        cuantiles = np.array([s.cuantiles(PROBABILIDADES) for s in self.cuantiles]).reshape(-1, len(PROBABILIDADES))
+        desc.update({
+            'nulos': self.nulos.copy(),
+            'minimo': cuantiles[:, 0], 'q1': cuantiles[:, 1], 'mediana': cuantiles[:, 2],
+            'q3': cuantiles[:, 3], 'maximo': cuantiles[:, 4],
+        })
+        return desc
+
+    def outliers_iqr(self, factor: float = 1.5) -> Dict[str, np.ndarray]:
+        """
+        Límites IQR por variable (cuartiles del KLL) y número estimado de valores
+        fuera de ellos (error absoluto del orden de ε · n, ver cotas arriba)
+        """
+        desc = self.descriptivos()
+        iqr = desc['q3'] - desc['q1']
+        inferior, superior = desc['q1'] - factor * iqr, desc['q3'] + factor * iqr
+        conteos = np.array([
+            s.contar_fuera(a, b) for s, a, b in zip(self.cuantiles, inferior, superior)
+        ])
+        return {'limite_inferior': inferior, 'limite_superior': superior, 'conteo': np.round(conteos)}
+
+    def valores_distintos(self) -> np.ndarray:
+        return np.array([min(s.estimar(), n) for s, n in zip(self.distintos, self.filas - self.nulos)])
+
+    def cota_filas_duplicadas(self) -> float:
+        """Error absoluto de filas_duplicadas: SIGMAS_DUPLICADOS errores estándar del HLL"""
+        return SIGMAS_DUPLICADOS * 1.04 / np.sqrt(1 << self.p) * self.filas
+
+    def filas_duplicadas(self) -> int:
+        """
+        Filas repetidas estimadas (filas menos filas distintas según HLL); 0 si la
+        diferencia no supera cota_filas_duplicadas
+        """
+        diferencia = self.filas - min(self.filas_distintas.estimar(), self.filas)
+        if diferencia <= self.cota_filas_duplicadas():
+            return 0
+        return int(round(diferencia))
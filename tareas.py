@@ -0,0 +1,165 @@
+"""
+Ejecución de tareas de ingesta en segundo plano con progreso y cancelación
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+# Hilos para tareas en segundo plano (compartidos por todas las sesiones)
+MAX_TAREAS_SIMULTANEAS = 2
+
+# Segundos que se conserva una tarea terminada para que la sesión lea su estado
+TTL_TAREAS_TERMINADAS = 600
+
+
+class IngestaCancelada(Exception):
+    """Se lanza dentro de la tarea cuando el usuario la cancela"""
+
+
+class TareaIngesta:
+    """
+    Estado compartido entre el hilo que ejecuta la tarea y la interfaz:
+    etapa actual, filas procesadas, tiempos por etapa, resultado o error.
+    La cancelación es cooperativa: se comprueba en cada reporte de progreso y, al
+    leer archivos, en cada búfer leído (carga_archivos.LecturaCancelable).
+    """
+
+    def __init__(self, clave: str, descripcion: str = ''):
+        self.clave = clave
+        self.descripcion = descripcion
+        self.estado = 'pendiente'
+        self.etapa = ''
+        self.filas = 0
+        self.total = None
+        self.tiempos: Dict[str, float] = {}
+        self.resultado: Any = None
+        self.error: Optional[str] = None
+        self.creada_en = time.time()
+        self.terminada_en: Optional[float] = None
+        self.suscriptores = 0
+        self._cancelar = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def en_curso(self) -> bool:
+        return self.estado in ('pendiente', 'ejecutando')
+
+    def comprobar_cancelacion(self):
+        if self._cancelar.is_set():
+            raise IngestaCancelada()
+
+    def reportar(self, filas: int = None, total: int = None):
+        """Actualiza el progreso (se usa como callback de los lectores) y atiende la cancelación"""
+        with self._lock:
+            if filas is not None:
+                self.filas = filas
+            if total is not None:
+                self.total = total
+        self.comprobar_cancelacion()
+
+    @contextmanager
+    def medir_etapa(self, nombre: str):
+        """Marca la etapa actual y registra su duración"""
+        self.comprobar_cancelacion()
+        with self._lock:
+            self.etapa = nombre
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.tiempos[nombre] = time.perf_counter() - inicio
+        self.comprobar_cancelacion()
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def instantanea(self) -> Dict:
+        """Copia coherente del estado para mostrar en la interfaz"""
+        with self._lock:
+            return {
+                'estado': self.estado, 'etapa': self.etapa, 'filas': self.filas,
+                'total': self.total, 'tiempos': dict(self.tiempos), 'error': self.error,
+                'segundos': (self.terminada_en or time.time()) - self.creada_en
+            }
+
+
+class GestorTareas:
+    """
+    Registro de tareas por clave. Una petición idéntica a otra en curso
+    se suscribe a la existente en lugar de repetir el trabajo.
+    """
+
+    def __init__(self, max_workers: int = MAX_TAREAS_SIMULTANEAS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingesta')
+        self._tareas: Dict[str, TareaIngesta] = {}
+        self._lock = threading.Lock()
+
+    def _ejecutar(self, tarea: TareaIngesta, funcion: Callable[[TareaIngesta], Any]):
+        tarea.estado = 'ejecutando'
+        try:
+            tarea.comprobar_cancelacion()
+            tarea.resultado = funcion(tarea)
+            tarea.estado = 'completada'
+        except IngestaCancelada:
+            tarea.estado = 'cancelada'
+        except Exception as e:
+            tarea.error = str(e)
+            tarea.estado = 'error'
+        finally:
+            tarea.terminada_en = time.time()
+
+    def _purgar(self):
+        ahora = time.time()
+        for clave in [
+            c for c, t in self._tareas.items()
+            if not t.en_curso and ahora - t.terminada_en > TTL_TAREAS_TERMINADAS
+        ]:
+            del self._tareas[clave]
+
+    def lanzar(self, clave: str, funcion: Callable[[TareaIngesta], Any], descripcion: str = '') -> TareaIngesta:
+        """
+        Lanza la tarea o devuelve la existente con la misma clave
+        (en curso, o terminada con error/cancelación hasta que se descarte).
+        """
+        with self._lock:
+            self._purgar()
+            tarea = self._tareas.get(clave)
+            if tarea is not None and tarea.estado != 'completada':
+                if tarea.en_curso:
+                    tarea.suscriptores += 1
+                return tarea
+            tarea = TareaIngesta(clave, descripcion)
+            tarea.suscriptores = 1
+            self._tareas[clave] = tarea
+        self._executor.submit(self._ejecutar, tarea, funcion)
+        return tarea
+
+    def obtener(self, clave: str) -> Optional[TareaIngesta]:
+        with self._lock:
+            # Las consultas de las sesiones también liberan las tareas vencidas
+            self._purgar()
+            return self._tareas.get(clave)
+
+    def cancelar(self, clave: str):
+        """Retira una suscripción; la tarea se cancela cuando ninguna sesión la espera"""
+        with self._lock:
+            tarea = self._tareas.get(clave)
+            if tarea is None or not tarea.en_curso:
+                return
+            tarea.suscriptores = max(0, tarea.suscriptores - 1)
+            if tarea.suscriptores == 0:
+                tarea.cancelar()
+
+    def descartar(self, clave: str):
+        """Olvida una tarea terminada (p. ej. para reintentar tras un error)"""
+        with self._lock:
+            tarea = self._tareas.get(clave)
+            if tarea is not None and not tarea.en_curso:
+                del self._tareas[clave]
+
+
+# Instancia única del proceso
+GESTOR_TAREAS = GestorTareas()
@@ -1,13 +1,19 @@
 """
 Utilidades compartidas para la aplicación Agrosavia
 """
+import re
+import threading
+import weakref
 import pandas as pd
 import numpy as np
-from typing import Dict, List
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 from sklearn.cluster import KMeans
 from sklearn.svm import OneClassSVM
 from sklearn.preprocessing import StandardScaler
 
+from normalizacion import a_texto
+
 # Lista de variables para análisis estadístico
 VARIABLES_ESTADISTICAS = [
     'ph_agua_suelo',
@@ -33,43 +39,157 @@ VARIABLES_ESTADISTICAS = [
     'zinc_disponible_doble_acido'
 ]
 
-# Columnas numéricas para tipado
-COLUMNAS_NUMERICAS = [
-    "ph_agua_suelo", "materia_organica", "fosforo_bray_ii",
-    "azufre_fosfato_monocalcico", "acidez_kcl",
-    "aluminio_intercambiable", "calcio_intercambiable",
-    "magnesio_intercambiable", "potasio_intercambiable",
-    "sodio_intercambiable", "capacidad_de_intercambio_cationico",
-    "conductividad_electrica", "hierro_disponible_olsen",
-    "cobre_disponible", "manganeso_disponible_olsen",
-    "zinc_disponible_olsen", "boro_disponible",
-    "hierro_disponible_doble_acido", "cobre_disponible_doble_acido",
-    "manganeso_disponible_doble_acido", "zinc_disponible_doble_acido"
+# Columnas categóricas usadas para agrupar y filtrar
+COLUMNAS_AGRUPACION = ['departamento', 'municipio', 'cultivo']
+
+# Esquema de las columnas numéricas: tipo, separador decimal de la fuente y rango
+# admisible (None: sin límite; solo se fijan los que tienen respaldo físico)
+@dataclass(frozen=True)
+class ColumnaNumerica:
+    nombre: str
+    dtype: str = 'float64'
+    separador_decimal: str = ','
+    minimo: Optional[float] = None
+    maximo: Optional[float] = None
+
+
+ESQUEMA_NUMERICO = [
+    ColumnaNumerica("ph_agua_suelo", minimo=0.0, maximo=14.0),
+    ColumnaNumerica("materia_organica", minimo=0.0, maximo=100.0),
+    ColumnaNumerica("fosforo_bray_ii"),
+    ColumnaNumerica("azufre_fosfato_monocalcico"),
+    ColumnaNumerica("acidez_kcl"),
+    ColumnaNumerica("aluminio_intercambiable"),
+    ColumnaNumerica("calcio_intercambiable"),
+    ColumnaNumerica("magnesio_intercambiable"),
+    ColumnaNumerica("potasio_intercambiable"),
+    ColumnaNumerica("sodio_intercambiable"),
+    ColumnaNumerica("capacidad_de_intercambio_cationico"),
+    ColumnaNumerica("conductividad_electrica"),
+    ColumnaNumerica("hierro_disponible_olsen"),
+    ColumnaNumerica("cobre_disponible"),
+    ColumnaNumerica("manganeso_disponible_olsen"),
+    ColumnaNumerica("zinc_disponible_olsen"),
+    ColumnaNumerica("boro_disponible"),
+    ColumnaNumerica("hierro_disponible_doble_acido"),
+    ColumnaNumerica("cobre_disponible_doble_acido"),
+    ColumnaNumerica("manganeso_disponible_doble_acido"),
+    ColumnaNumerica("zinc_disponible_doble_acido"),
 ]
 
+ESQUEMA_POR_COLUMNA = {c.nombre: c for c in ESQUEMA_NUMERICO}
+
+# Columnas numéricas para tipado
+COLUMNAS_NUMERICAS = [c.nombre for c in ESQUEMA_NUMERICO]
+
+
+def separador_decimal_esquema(columnas: List[str]) -> str:
+    """Separador decimal común de las columnas del esquema ('.' si no hay o no coinciden)"""
+    separadores = {ESQUEMA_POR_COLUMNA[c].separador_decimal for c in columnas if c in ESQUEMA_POR_COLUMNA}
+    return separadores.pop() if len(separadores) == 1 else '.'
+
+
+def opciones_lectura_csv(columnas: List[str], usecols: List[str] = None, separador_decimal: str = None) -> Dict:
+    """
+    Argumentos de pd.read_csv derivados del esquema: las columnas numéricas se dejan
+    al parser C con el separador decimal de la fuente (float nativo) y el resto se
+    lee como texto. Las numéricas que el parser no pueda leer como número llegan
+    como texto y asignar_tipos_datos las convierte con parsear_numerico.
+    """
+    seleccion = [c for c in columnas if usecols is None or c in usecols]
+    opciones = {
+        'dtype': {c: str for c in seleccion if c not in ESQUEMA_POR_COLUMNA},
+        'decimal': separador_decimal or separador_decimal_esquema(seleccion)
+    }
+    if usecols is not None:
+        opciones['usecols'] = seleccion
+    return opciones
+
+
+def es_columna_texto(serie: pd.Series) -> bool:
+    """True para texto en cualquier representación: object, string (Arrow) o categórica"""
+    return (
+        serie.dtype == 'object'
+        or pd.api.types.is_string_dtype(serie.dtype)
+        or isinstance(serie.dtype, pd.CategoricalDtype)
+    )
+
+
+def parsear_numerico(serie: pd.Series, separador_decimal: str = ',', dtype: str = 'float64') -> pd.Series:
+    """
+    Convierte una serie a float. Los valores que ya son numéricos se interpretan
+    en una sola pasada; solo los que fallan se reintentan con el separador decimal.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Se convierten solo las categorías y se expanden por código
+        categorias = parsear_numerico(pd.Series(serie.cat.categories.astype(object)), separador_decimal, dtype)
+        valores = categorias.to_numpy()[serie.cat.codes.to_numpy()]
+        valores[serie.cat.codes.to_numpy() == -1] = np.nan
+        return pd.Series(valores, index=serie.index, name=serie.name, dtype=dtype)
+    if es_columna_texto(serie) and serie.dtype != 'object':
+        serie = serie.astype(object)
+    if serie.dtype != 'object':
+        return pd.to_numeric(serie, errors='coerce').astype(dtype)
+
+    resultado = pd.to_numeric(serie, errors='coerce')
+    pendientes = resultado.isna() & serie.notna()
+    if pendientes.any():
+        resultado = resultado.astype('float64')
+        resultado[pendientes] = pd.to_numeric(
+            serie[pendientes].astype(str).str.replace(separador_decimal, '.', regex=False).str.strip(),
+            errors='coerce'
+        )
+    return resultado.astype(dtype)
+
+
+def aplicar_esquema_numerico(df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte en sitio las columnas del esquema presentes en df (p. ej. registros JSON de la API)"""
+    for columna in ESQUEMA_NUMERICO:
+        if columna.nombre in df.columns and df[columna.nombre].dtype != columna.dtype:
+            df[columna.nombre] = parsear_numerico(df[columna.nombre], columna.separador_decimal, columna.dtype)
+    return df
+
+
+def validar_rangos(df: pd.DataFrame) -> Dict[str, Dict]:
+    """Cuenta por columna del esquema los valores fuera del rango admisible (los límites None no se validan)"""
+    fuera_de_rango = {}
+    for columna in ESQUEMA_NUMERICO:
+        if columna.nombre not in df.columns or (columna.minimo is None and columna.maximo is None):
+            continue
+        serie = df[columna.nombre]
+        if es_columna_texto(serie):
+            serie = parsear_numerico(serie, columna.separador_decimal)
+        mascara = pd.Series(False, index=serie.index)
+        if columna.minimo is not None:
+            mascara |= serie < columna.minimo
+        if columna.maximo is not None:
+            mascara |= serie > columna.maximo
+        n = int(mascara.sum())
+        if n > 0:
+            fuera_de_rango[columna.nombre] = {
+                'cantidad': n, 'minimo': columna.minimo, 'maximo': columna.maximo
+            }
+    return fuera_de_rango
+
 
 def asignar_tipos_datos(df: pd.DataFrame) -> pd.DataFrame:
     """
     Asigna correctamente los tipos de datos a las columnas del DataFrame.
     Columnas numéricas específicas se convierten a float, el resto a string.
     """
-    df_typed = df.copy()
+    # Copia superficial: cada columna se sustituye, el DataFrame de entrada no se modifica
+    df_typed = df.copy(deep=False)
     
-    # Convertir columnas numéricas
-    for col in COLUMNAS_NUMERICAS:
-        if col in df_typed.columns:
-            if df_typed[col].dtype == 'object':
-                df_typed[col] = pd.to_numeric(
-                    df_typed[col].astype(str).str.replace(',', '.').str.strip(),
-                    errors='coerce'
-                )
-            else:
-                df_typed[col] = pd.to_numeric(df_typed[col], errors='coerce')
+    # Convertir columnas numéricas según el esquema
+    for columna in ESQUEMA_NUMERICO:
+        col = columna.nombre
+        if col in df_typed.columns and df_typed[col].dtype != columna.dtype:
+            df_typed[col] = parsear_numerico(df_typed[col], columna.separador_decimal, columna.dtype)
     
-    # Convertir el resto de columnas a string
+    # Convertir el resto de columnas a string (las que ya son texto no se recorren)
     for col in df_typed.columns:
         if col not in COLUMNAS_NUMERICAS:
-            df_typed[col] = df_typed[col].astype(str)
+            df_typed[col] = a_texto(df_typed[col])
     
     return df_typed
 
@@ -81,104 +201,280 @@ def preparar_dataframe_numerico(df: pd.DataFrame, variables: List[str] = None) -
     if variables is not None and len(variables) > 0:
         vars_disponibles = [v for v in variables if v in df.columns]
         if vars_disponibles:
-            df_work = df[vars_disponibles].copy()
+            df_work = df[vars_disponibles]
         else:
             return pd.DataFrame()
     else:
-        df_work = df.copy()
+        df_work = df.copy(deep=False)
     
     for col in df_work.columns:
-        if df_work[col].dtype == 'object':
-            df_work[col] = pd.to_numeric(
-                df_work[col].astype(str).str.replace(',', '.').str.strip(),
-                errors='coerce'
-            )
+        if es_columna_texto(df_work[col]):
+            columna = ESQUEMA_POR_COLUMNA.get(col)
+            df_work[col] = parsear_numerico(df_work[col], columna.separador_decimal if columna else ',')
+        elif df_work[col].dtype == 'float32':
+            # Modo compacto: los cálculos se hacen siempre sobre los float64 originales
+            df_work[col] = restaurar_float64(df_work[col])
     
     return df_work
 
 
+class VistaNumerica:
+    """
+    Vista numérica compartida de un conjunto de variables: matriz float64
+    (filas × variables), máscara de nulos e índice de filas. Se construye una
+    sola vez por DataFrame y conjunto de variables (ver obtener_vista_numerica).
+    """
+
+    def __init__(self, df_numerico: pd.DataFrame):
+        self.columnas: List[str] = list(df_numerico.columns)
+        self.indice: pd.Index = df_numerico.index
+        self.matriz: np.ndarray = (
+            df_numerico.to_numpy(dtype=np.float64) if len(self.columnas) > 0
+            else np.empty((len(self.indice), 0))
+        )
+        self.matriz.flags.writeable = False
+        self.nulos: np.ndarray = np.isnan(self.matriz)
+        self.nulos.flags.writeable = False
+        self._df = None
+        # Resultados derivados de la vista (estadísticos, outliers...), ver estadisticas.py
+        self.cache: Dict = {}
+
+    @property
+    def vacia(self) -> bool:
+        return len(self.columnas) == 0
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """DataFrame de solo lectura sobre la misma matriz (sin copiar)"""
+        if self._df is None:
+            if self.vacia:
+                self._df = pd.DataFrame()
+            else:
+                self._df = pd.DataFrame(self.matriz, index=self.indice, columns=self.columnas, copy=False)
+        return self._df
+
+    def posicion(self, columna: str) -> int:
+        return self.columnas.index(columna)
+
+    def valores_validos(self, columna: str) -> pd.Series:
+        """Valores no nulos de la columna (equivalente a df[col].dropna())"""
+        j = self.posicion(columna)
+        validos = ~self.nulos[:, j]
+        return pd.Series(self.matriz[validos, j], index=self.indice[validos], name=columna)
+
+
+# Vistas por DataFrame, indexadas por id(); la entrada se elimina cuando el DataFrame se libera
+_VISTAS_NUMERICAS: Dict[int, Dict] = {}
+_MAX_VISTAS_POR_DATAFRAME = 8
+_LOCK_VISTAS = threading.Lock()
+
+
+def huella_dataframe(df: pd.DataFrame) -> tuple:
+    """Huella barata de la estructura del DataFrame (dimensiones, columnas y tipos)"""
+    return (df.shape, tuple(map(str, df.columns)), tuple(map(str, df.dtypes)))
+
+
+def _olvidar_vistas(id_df: int):
+    with _LOCK_VISTAS:
+        _VISTAS_NUMERICAS.pop(id_df, None)
+
+
+def obtener_vista_numerica(df: pd.DataFrame, variables: List[str] = None) -> VistaNumerica:
+    """
+    Devuelve la VistaNumerica de df para las variables, construyéndola con
+    preparar_dataframe_numerico solo la primera vez. Si la estructura del
+    DataFrame cambia (huella distinta) las vistas anteriores se descartan;
+    los cambios de valores sin cambio de estructura no se detectan, por lo que
+    los DataFrames de la sesión se reemplazan en lugar de modificarse.
+    """
+    clave = tuple(variables) if variables else None
+    huella = huella_dataframe(df)
+    with _LOCK_VISTAS:
+        entrada = _VISTAS_NUMERICAS.get(id(df))
+        if entrada is not None and entrada['huella'] == huella and clave in entrada['vistas']:
+            return entrada['vistas'][clave]
+
+    vista = VistaNumerica(preparar_dataframe_numerico(df, variables))
+
+    with _LOCK_VISTAS:
+        entrada = _VISTAS_NUMERICAS.get(id(df))
+        if entrada is None:
+            entrada = _VISTAS_NUMERICAS[id(df)] = {'huella': huella, 'vistas': {}}
+            weakref.finalize(df, _olvidar_vistas, id(df))
+        elif entrada['huella'] != huella:
+            entrada['huella'], entrada['vistas'] = huella, {}
+        if len(entrada['vistas']) >= _MAX_VISTAS_POR_DATAFRAME:
+            entrada['vistas'].pop(next(iter(entrada['vistas'])))
+        entrada['vistas'][clave] = vista
+    return vista
+
+
+# Máximo de decimales que se intentan recuperar al pasar de float32 a float64
+_MAX_DECIMALES_FLOAT32 = 6
+
+
+def _decimales_float32(valores32: np.ndarray) -> Optional[int]:
+    """Menor número de decimales d tal que redondear a d reproduce exactamente los float32"""
+    finitos = valores32[np.isfinite(valores32)]
+    valores64 = finitos.astype(np.float64)
+    for d in range(_MAX_DECIMALES_FLOAT32 + 1):
+        if np.array_equal(np.round(valores64, d).astype(np.float32), finitos):
+            return d
+    return None
+
+
+def restaurar_float64(serie: pd.Series) -> pd.Series:
+    """
+    Recupera los float64 originales de una columna compactada a float32.
+    compactar_dataframe solo usa float32 cuando este redondeo es exacto.
+    """
+    valores32 = serie.to_numpy()
+    decimales = _decimales_float32(valores32)
+    valores64 = valores32.astype(np.float64)
+    if decimales is not None:
+        valores64 = np.round(valores64, decimales)
+    return pd.Series(valores64, index=serie.index, name=serie.name)
+
+
+def _float32_sin_perdida(serie: pd.Series) -> bool:
+    """True si la columna float64 se puede guardar en float32 y restaurarse exactamente"""
+    valores32 = serie.to_numpy().astype(np.float32)
+    restaurada = restaurar_float64(pd.Series(valores32)).to_numpy()
+    return np.array_equal(restaurada, serie.to_numpy(), equal_nan=True)
+
+
+def memoria_dataframe(df: pd.DataFrame) -> int:
+    """Memoria ocupada por el DataFrame en bytes (incluye el contenido de objetos)"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def compactar_dataframe(
+    df: pd.DataFrame,
+    umbral_cardinalidad: float = 0.5,
+    usar_float32: bool = True
+) -> pd.DataFrame:
+    """
+    Representación compacta con los mismos valores:
+    - texto de baja cardinalidad (únicos/filas <= umbral) → category
+    - resto del texto → string respaldado por Arrow (si pyarrow está disponible)
+    - mediciones de laboratorio del esquema → float32, solo si restaurar_float64
+      recupera exactamente los valores (hasta 6 decimales y ~7 cifras significativas)
+    """
+    try:
+        import pyarrow  # noqa: F401
+        dtype_texto = 'string[pyarrow]'
+    except ImportError:
+        dtype_texto = None
+
+    n_filas = len(df)
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        if es_columna_texto(serie) and not isinstance(serie.dtype, pd.CategoricalDtype):
+            if n_filas > 0 and serie.nunique(dropna=False) / n_filas <= umbral_cardinalidad:
+                columnas[col] = serie.astype('category')
+            elif dtype_texto is not None and serie.map(lambda v: isinstance(v, str) or pd.isna(v)).all():
+                columnas[col] = serie.astype(dtype_texto)
+            else:
+                columnas[col] = serie
+        elif (usar_float32 and col in ESQUEMA_POR_COLUMNA and serie.dtype == 'float64'
+              and _float32_sin_perdida(serie)):
+            columnas[col] = serie.astype('float32')
+        else:
+            columnas[col] = serie
+    return pd.DataFrame(columnas, index=df.index)
+
+
+def convertir_texto_a_numerico(serie: pd.Series) -> pd.Series:
+    """
+    Equivale a pd.to_numeric(serie.astype(str).str.replace(',', '.').str.strip(),
+    errors='coerce'), pero para categorías y columnas de solo texto convierte
+    una vez cada valor distinto y reconstruye la columna por códigos.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos, unicos = serie.cat.codes.to_numpy(), serie.cat.categories
+    elif pd.api.types.infer_dtype(serie, skipna=True) in ('string', 'empty'):
+        codigos, unicos = pd.factorize(serie)
+    else:
+        return pd.to_numeric(serie.astype(str).str.replace(',', '.').str.strip(), errors='coerce')
+
+    convertidos = pd.to_numeric(
+        pd.Series(unicos, dtype=object).astype(str).str.replace(',', '.').str.strip(),
+        errors='coerce'
+    ).to_numpy()
+    faltantes = codigos < 0
+    if faltantes.any():
+        # Los nulos originales ('nan'/'None' como texto) también terminan en NaN
+        convertidos = np.append(convertidos.astype(np.float64), np.nan)
+        codigos = np.where(faltantes, len(convertidos) - 1, codigos)
+    return pd.Series(convertidos.take(codigos), index=serie.index, name=serie.name)
+
+
+# Texto que float() acepta (tras cambiar ',' por '.' y quitar espacios), incluidos
+# separadores '_', exponentes, inf/infinity y nan
+_DIGITOS = r'\d(?:_?\d)*'
+_PATRON_FLOAT = re.compile(
+    rf'[+-]?(?:(?:{_DIGITOS}(?:\.(?:{_DIGITOS})?)?|\.{_DIGITOS})(?:[eE][+-]?{_DIGITOS})?|inf(?:inity)?|nan)',
+    re.IGNORECASE
+)
+
+# Valores no nulos por columna usados para decidir si es numérica
+TAMANO_MUESTRA_INFERENCIA = 100
+
+# Filas iniciales donde se buscan las muestras antes de recorrer la columna completa
+_VENTANA_MUESTRA_INFERENCIA = 1000
+
+
+def evaluar_muestras_numericas(muestras: Dict[str, pd.Series], umbral: float = 0.8) -> pd.DataFrame:
+    """
+    Evalúa juntas, con una sola expresión regular, las muestras de texto de
+    varias columnas. Devuelve un reporte por columna: muestra, valores_numericos,
+    proporcion_numerica y es_numerica (proporción mayor que el umbral).
+    """
+    reporte = pd.DataFrame(
+        {'muestra': 0, 'valores_numericos': 0, 'proporcion_numerica': 0.0, 'es_numerica': False},
+        index=pd.Index(list(muestras.keys()), dtype=object)
+    )
+    no_vacias = {col: m.astype(str).astype(object) for col, m in muestras.items() if len(m) > 0}
+    if no_vacias:
+        valores = pd.concat(no_vacias.values(), keys=no_vacias.keys())
+        es_numero = valores.str.replace(',', '.').str.strip().str.fullmatch(_PATRON_FLOAT)
+        conteos = es_numero.groupby(level=0, sort=False).agg(['size', 'sum'])
+        reporte.loc[conteos.index, 'muestra'] = conteos['size'].astype(int)
+        reporte.loc[conteos.index, 'valores_numericos'] = conteos['sum'].astype(int)
+        reporte['proporcion_numerica'] = (
+            reporte['valores_numericos'] / reporte['muestra'].where(reporte['muestra'] > 0)
+        ).fillna(0.0)
+        reporte['es_numerica'] = reporte['proporcion_numerica'] > umbral
+    return reporte
+
+
 class DataCleaner:
     """Limpiador automático de datos"""
     
     @staticmethod
-    def clean_dataframe(df: pd.DataFrame) -> tuple:
-        """Limpia el DataFrame eliminando filas/columnas vacías, duplicados, etc."""
-        original_shape = df.shape
-        cleaning_report = []
-        
-        # Eliminar filas vacías
-        rows_before = len(df)
-        df = df.dropna(how='all')
-        rows_removed = rows_before - len(df)
-        if rows_removed > 0:
-            cleaning_report.append(f"🗑️ Eliminadas {rows_removed} filas completamente vacías")
-        
-        # Eliminar columnas vacías
-        cols_before = len(df.columns)
-        df = df.dropna(axis=1, how='all')
-        cols_removed = cols_before - len(df.columns)
-        if cols_removed > 0:
-            cleaning_report.append(f"🗑️ Eliminadas {cols_removed} columnas completamente vacías")
-        
-        # Convertir columnas numéricas
-        numeric_cols_cleaned = 0
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                sample = df[col].dropna().head(100)
-                if len(sample) > 0:
-                    numeric_count = 0
-                    for val in sample:
-                        try:
-                            float(str(val).replace(',', '.').strip())
-                            numeric_count += 1
-                        except:
-                            pass
-                    
-                    if numeric_count / len(sample) > 0.8:
-                        original_nulls = df[col].isna().sum()
-                        df[col] = pd.to_numeric(
-                            df[col].astype(str).str.replace(',', '.').str.strip(),
-                            errors='coerce'
-                        )
-                        new_nulls = df[col].isna().sum()
-                        invalid_values = new_nulls - original_nulls
-                        
-                        if invalid_values > 0:
-                            cleaning_report.append(
-                                f"🔢 Columna '{col}': convertida a numérica ({invalid_values} valores inválidos → NaN)"
-                            )
-                            numeric_cols_cleaned += 1
-        
-        # Eliminar filas sin datos numéricos
-        numeric_columns = df.select_dtypes(include=[np.number]).columns
-        if len(numeric_columns) > 0:
-            rows_before = len(df)
-            df = df.dropna(subset=numeric_columns, how='all')
-            rows_removed = rows_before - len(df)
-            if rows_removed > 0:
-                cleaning_report.append(
-                    f"🗑️ Eliminadas {rows_removed} filas sin datos numéricos válidos"
-                )
-        
-        # Eliminar duplicados
-        duplicates = df.duplicated().sum()
-        if duplicates > 0:
-            df = df.drop_duplicates()
-            cleaning_report.append(f"🗑️ Eliminadas {duplicates} filas duplicadas")
-        
-        # Limpiar texto
-        text_cols_cleaned = 0
-        for col in df.select_dtypes(include=['object']).columns:
-            df[col] = df[col].astype(str).str.strip()
-            df[col] = df[col].replace(['nan', 'None', 'NaN', ''], np.nan)
-            text_cols_cleaned += 1
-        
-        if text_cols_cleaned > 0:
-            cleaning_report.append(f"✨ Limpiados espacios en {text_cols_cleaned} columnas de texto")
-        
-        df = df.reset_index(drop=True)
-        
-        final_shape = df.shape
-        cleaning_report.insert(0, f"📊 Dimensiones: {original_shape} → {final_shape}")
-        
-        return df, cleaning_report
+    def infer_numeric_columns(df: pd.DataFrame, umbral: float = 0.8) -> pd.DataFrame:
+        """
+        Infiere qué columnas de texto son numéricas a partir de sus primeros
+        TAMANO_MUESTRA_INFERENCIA valores no nulos (ver evaluar_muestras_numericas).
+        """
+        columnas = [c for c in df.columns if es_columna_texto(df[c])]
+        ventana = df[columnas].iloc[:_VENTANA_MUESTRA_INFERENCIA]
+        muestras = {}
+        for col in columnas:
+            muestra = ventana[col].dropna()
+            if len(muestra) < TAMANO_MUESTRA_INFERENCIA and len(df) > len(ventana):
+                muestra = df[col].dropna()
+            muestras[col] = muestra.head(TAMANO_MUESTRA_INFERENCIA)
+
+        return evaluar_muestras_numericas(muestras, umbral)
+    
+    @staticmethod
+    def clean_dataframe(df: pd.DataFrame, pasos: List[str] = None) -> tuple:
+        """
+        Limpia el DataFrame eliminando filas/columnas vacías, duplicados, etc.
+        Los pasos se pueden elegir (ver limpieza.PASOS_LIMPIEZA y PASOS_POR_DEFECTO).
+        """
+        # Import diferido: limpieza depende de este módulo
+        from limpieza import PipelineLimpieza
+        return PipelineLimpieza(pasos).ejecutar(df)
@@ -3,115 +3,178 @@ Funciones para estadísticos y visualizaciones
 """
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import Dict, List
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from sklearn.cluster import KMeans
-from sklearn.svm import OneClassSVM
-from sklearn.preprocessing import StandardScaler
 
-from utils import preparar_dataframe_numerico
+from estadisticas import describir_por_grupos, obtener_correlaciones, obtener_descriptivos, pares_mas_correlacionados
+from incremental import EstadoIncremental
+from outliers import outliers_columna, precalcular_outliers
+from sketches import ResumenSketches
+from utils import VistaNumerica, obtener_vista_numerica
 
+# Filas mínimas de un grupo para reportar sus estadísticos
+MIN_FILAS_GRUPO = 10
 
-def calcular_estadisticos(df: pd.DataFrame, variables: list) -> pd.DataFrame:
+# Variables hasta las que se escribe el valor en cada celda del mapa de calor
+MAX_VARIABLES_TEXTO_CORRELACION = 30
+
+
+def calcular_estadisticos(df: pd.DataFrame, variables: list, vista: VistaNumerica = None,
+                          parametros_outliers: Dict[str, Dict] = None, n_procesos: int = 1) -> pd.DataFrame:
     """Calcula estadísticos descriptivos para las variables especificadas"""
-    df_numeric = preparar_dataframe_numerico(df, variables)
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables)
+    parametros_outliers = parametros_outliers or {}
+    df_numeric = vista.df
     
     if df_numeric.empty:
         return None
     
-    means = df_numeric.mean()
-    stds = df_numeric.std()
+    desc = obtener_descriptivos(vista)
     
-    # Calcular CV evitando división por cero
-    cv_values = []
-    for col in df_numeric.columns:
-        if means[col] != 0:
-            cv_values.append((stds[col] / means[col]) * 100)
-        else:
-            cv_values.append(np.nan)
+    # Outliers IQR de todas las variables a la vez con los cuartiles ya calculados
+    iqr = desc['q3'] - desc['q1']
+    with np.errstate(invalid='ignore'):
+        fuera_iqr = (vista.matriz < desc['q1'] - 1.5 * iqr) | (vista.matriz > desc['q3'] + 1.5 * iqr)
+    conteo_outliers_iqr = fuera_iqr.sum(axis=0)
     
-    # Detección de outliers por variable
+    # Detección de outliers por variable (con n_procesos > 1 los ajustes se hacen antes en paralelo)
+    if n_procesos > 1:
+        precalcular_outliers(vista, ['kmeans', 'svm'], parametros_outliers, n_procesos)
     outliers_iqr = []
     outliers_kmeans = []
     outliers_svm = []
-    outliers_total = []
     
-    for col in df_numeric.columns:
-        data = df_numeric[col].dropna()
+    for j, col in enumerate(vista.columnas):
+        data = vista.valores_validos(col)
         n_outliers_iqr = 0
         n_outliers_kmeans = 0
         n_outliers_svm = 0
         
         if len(data) > 0:
             # Método IQR
-            Q1 = data.quantile(0.25)
-            Q3 = data.quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            n_outliers_iqr = ((data < lower_bound) | (data > upper_bound)).sum()
+            n_outliers_iqr = conteo_outliers_iqr[j]
             
-            # Método K-MEANS
-            if len(data) >= 3:
-                try:
-                    data_reshaped = data.values.reshape(-1, 1)
-                    scaler = StandardScaler()
-                    data_scaled = scaler.fit_transform(data_reshaped)
-                    
-                    kmeans = KMeans(n_clusters=min(3, len(data)), random_state=42, n_init=10)
-                    kmeans.fit(data_scaled)
-                    distances = np.min(kmeans.transform(data_scaled), axis=1)
-                    threshold = np.percentile(distances, 90)
-                    n_outliers_kmeans = (distances > threshold).sum()
-                except:
-                    n_outliers_kmeans = 0
+            # Métodos K-MEANS y SVM (ajustes compartidos con el ICD, ver outliers.py)
+            resultado_kmeans = outliers_columna(vista, col, 'kmeans', **parametros_outliers.get('kmeans', {}))
+            if resultado_kmeans is not None:
+                n_outliers_kmeans = resultado_kmeans['mascara'].sum()
             
-            # Método SVM
-            if len(data) >= 10:
-                try:
-                    data_reshaped = data.values.reshape(-1, 1)
-                    scaler = StandardScaler()
-                    data_scaled = scaler.fit_transform(data_reshaped)
-                    
-                    svm = OneClassSVM(nu=0.1, kernel='rbf', gamma='auto')
-                    predictions = svm.fit_predict(data_scaled)
-                    n_outliers_svm = (predictions == -1).sum()
-                except:
-                    n_outliers_svm = 0
+            resultado_svm = outliers_columna(vista, col, 'svm', **parametros_outliers.get('svm', {}))
+            if resultado_svm is not None:
+                n_outliers_svm = resultado_svm['mascara'].sum()
         
         outliers_iqr.append(n_outliers_iqr)
         outliers_kmeans.append(n_outliers_kmeans)
         outliers_svm.append(n_outliers_svm)
-        outliers_total.append(n_outliers_iqr + n_outliers_kmeans + n_outliers_svm)
     
-    stats = pd.DataFrame({
-        'Variable': df_numeric.columns,
-        'Count': df_numeric.count().values,
-        'Media': means.values,
-        'Mediana': df_numeric.median().values,
-        'Desv. Std': stds.values,
-        'Mínimo': df_numeric.min().values,
-        'Q1 (25%)': df_numeric.quantile(0.25).values,
-        'Q3 (75%)': df_numeric.quantile(0.75).values,
-        'Máximo': df_numeric.max().values,
-        'Rango': (df_numeric.max() - df_numeric.min()).values,
-        'CV (%)': cv_values,
-        'Asimetría': df_numeric.skew().values,
-        'Curtosis': df_numeric.kurtosis().values,
-        'Valores nulos': df_numeric.isnull().sum().values,
+    return _tabla_estadisticos(vista.columnas, desc, {
         'Outliers IQR': outliers_iqr,
         'Outliers K-means': outliers_kmeans,
-        'Outliers SVM': outliers_svm,
-        'Total Outliers': outliers_total
+        'Outliers SVM': outliers_svm
+    })
+
+
+def _tabla_estadisticos(columnas: List[str], desc: Dict[str, np.ndarray], outliers: Dict[str, list]) -> pd.DataFrame:
+    """Tabla de estadísticos a partir de los descriptivos y de los conteos de outliers por método"""
+    means = desc['media']
+    stds = desc['std']
+    
+    # CV evitando división por cero
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cv_values = np.where(means != 0, stds / means * 100, np.nan)
+    
+    stats = pd.DataFrame({
+        'Variable': columnas,
+        'Count': desc['conteo'],
+        'Media': means,
+        'Mediana': desc['mediana'],
+        'Desv. Std': stds,
+        'Mínimo': desc['minimo'],
+        'Q1 (25%)': desc['q1'],
+        'Q3 (75%)': desc['q3'],
+        'Máximo': desc['maximo'],
+        'Rango': desc['maximo'] - desc['minimo'],
+        'CV (%)': cv_values,
+        'Asimetría': desc['asimetria'],
+        'Curtosis': desc['curtosis'],
+        'Valores nulos': desc['nulos'],
+        **outliers,
+        'Total Outliers': np.sum([np.asarray(conteos) for conteos in outliers.values()], axis=0)
     })
     
     return stats
 
 
-def crear_histogramas(df: pd.DataFrame, variables: list):
+def calcular_estadisticos_desde_resumen(resumen: ResumenSketches,
+                                       conteo_outliers_iqr: np.ndarray = None) -> pd.DataFrame:
+    """
+    Estadísticos a partir de un ResumenSketches (datos por bloques): momentos
+    exactos, cuantiles del KLL y outliers IQR estimados, o conteo_outliers_iqr si
+    se contaron en una segunda pasada. K-means y SVM necesitan todos los datos y
+    no se incluyen.
+    """
+    if not resumen.variables:
+        return None
+    if conteo_outliers_iqr is None:
+        conteo_outliers_iqr = resumen.outliers_iqr()['conteo']
+    return _tabla_estadisticos(resumen.variables, resumen.descriptivos(), {
+        'Outliers IQR': np.asarray(conteo_outliers_iqr).astype(np.int64)
+    })
+
+
+def calcular_estadisticos_incremental(estado: EstadoIncremental) -> pd.DataFrame:
+    """
+    Estadísticos a partir de un EstadoIncremental (filas agregadas): momentos
+    combinados, cuantiles y outliers IQR exactos; K-means y SVM con el último
+    ajuste de cada variable (ver incremental.py).
+    """
+    if not estado.variables:
+        return None
+    return _tabla_estadisticos(estado.variables, estado.descriptivos(), {
+        'Outliers IQR': estado.outliers_iqr()['conteo'],
+        'Outliers K-means': estado.conteo_outliers('kmeans'),
+        'Outliers SVM': estado.conteo_outliers('svm')
+    })
+
+
+def calcular_estadisticos_por_grupo(df: pd.DataFrame, variables: list, claves: List[str],
+                                    min_filas: int = MIN_FILAS_GRUPO, vista: VistaNumerica = None) -> pd.DataFrame:
+    """
+    Estadísticos de calcular_estadisticos (con outliers IQR) para cada grupo de
+    las columnas claves, p. ej. ['departamento', 'municipio'], en una sola pasada
+    vectorizada (estadisticas.describir_por_grupos). Los grupos con menos de
+    min_filas filas se omiten. Formato largo: claves, 'Filas del grupo' y una fila
+    por variable de cada grupo.
+    """
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables)
+    claves = [c for c in claves if c in df.columns]
+    if vista.df.empty or not claves:
+        return None
+    
+    agrupado = df[claves].groupby(claves, dropna=False, sort=True, observed=True)
+    desc = describir_por_grupos(vista.matriz, vista.nulos, agrupado.ngroup().to_numpy())
+    grupos = np.flatnonzero(desc['filas'] >= min_filas)
+    if len(grupos) == 0:
+        return None
+    
+    n_variables = len(vista.columnas)
+    desc = {k: v[grupos].ravel() if v.ndim == 2 else np.repeat(v[grupos], n_variables) for k, v in desc.items()}
+    tabla_grupos = agrupado.size().index.to_frame(index=False).iloc[np.repeat(grupos, n_variables)]
+    tabla_grupos = tabla_grupos.reset_index(drop=True)
+    tabla_grupos['Filas del grupo'] = desc['filas']
+    
+    stats = _tabla_estadisticos(np.tile(vista.columnas, len(grupos)), desc, {'Outliers IQR': desc['outliers_iqr']})
+    return pd.concat([tabla_grupos, stats.drop(columns='Total Outliers')], axis=1)
+
+
+def crear_histogramas(df: pd.DataFrame, variables: list, vista: VistaNumerica = None):
     """Crea histogramas para las variables seleccionadas"""
-    df_numeric = preparar_dataframe_numerico(df, variables)
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables)
+    df_numeric = vista.df
     
     if df_numeric.empty:
         return None
@@ -129,7 +192,7 @@ def crear_histogramas(df: pd.DataFrame, variables: list):
     for idx, col in enumerate(df_numeric.columns):
         row = idx // n_cols + 1
         col_pos = idx % n_cols + 1
-        data = df_numeric[col].dropna()
+        data = vista.valores_validos(col)
         
         fig.add_trace(
             go.Histogram(x=data, name=col, marker_color='steelblue', showlegend=False),
@@ -140,9 +203,11 @@ def crear_histogramas(df: pd.DataFrame, variables: list):
     return fig
 
 
-def crear_boxplots(df: pd.DataFrame, variables: list):
+def crear_boxplots(df: pd.DataFrame, variables: list, vista: VistaNumerica = None):
     """Crea boxplots para las variables seleccionadas"""
-    df_numeric = preparar_dataframe_numerico(df, variables)
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables)
+    df_numeric = vista.df
     
     if df_numeric.empty:
         return None
@@ -160,7 +225,7 @@ def crear_boxplots(df: pd.DataFrame, variables: list):
     for idx, col in enumerate(df_numeric.columns):
         row = idx // n_cols + 1
         col_pos = idx % n_cols + 1
-        data = df_numeric[col].dropna()
+        data = vista.valores_validos(col)
         
         fig.add_trace(
             go.Box(y=data, name=col, marker_color='lightseagreen', showlegend=False),
@@ -171,31 +236,54 @@ def crear_boxplots(df: pd.DataFrame, variables: list):
     return fig
 
 
-def crear_matriz_correlacion(df: pd.DataFrame, variables: list):
-    """Crea matriz de correlación para las variables seleccionadas"""
-    df_numeric = preparar_dataframe_numerico(df, variables)
+def crear_matriz_correlacion(df: pd.DataFrame, variables: list, vista: VistaNumerica = None,
+                             metodo: str = 'pearson'):
+    """Crea matriz de correlación (pearson o spearman) para las variables seleccionadas"""
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables)
     
-    if df_numeric.empty or len(df_numeric.columns) < 2:
+    if vista.df.empty or len(vista.columnas) < 2:
         return None
     
-    corr_matrix = df_numeric.corr()
+    corr_matrix = obtener_correlaciones(vista, metodo)
+    # Con muchas variables el texto de cada celda no se lee y vuelve lento el gráfico
+    texto = {}
+    if len(vista.columnas) <= MAX_VARIABLES_TEXTO_CORRELACION:
+        texto = dict(text=corr_matrix.round(2), texttemplate='%{text}', textfont={"size": 8})
     
     fig = go.Figure(data=go.Heatmap(
-        z=corr_matrix.values,
-        x=corr_matrix.columns,
-        y=corr_matrix.columns,
+        z=corr_matrix,
+        x=vista.columnas,
+        y=vista.columnas,
         colorscale='RdBu',
         zmid=0,
-        text=corr_matrix.values.round(2),
-        texttemplate='%{text}',
-        textfont={"size": 8},
+        **texto,
         colorbar=dict(title="Correlación")
     ))
     
     fig.update_layout(
-        title="Matriz de Correlación",
+        title=f"Matriz de Correlación ({metodo.capitalize()})",
         xaxis_title="Variables", yaxis_title="Variables",
         height=600, width=800
     )
     
     return fig
+
+
+def calcular_correlaciones_fuertes(df: pd.DataFrame, variables: list, vista: VistaNumerica = None,
+                                   metodo: str = 'pearson', k: int = 10) -> pd.DataFrame:
+    """Los k pares de variables con mayor correlación absoluta (misma matriz que el mapa de calor)"""
+    if vista is None:
+        vista = obtener_vista_numerica(df, variables)
+    
+    if vista.df.empty or len(vista.columnas) < 2:
+        return None
+    
+    corr_matrix = obtener_correlaciones(vista, metodo)
+    i, j = pares_mas_correlacionados(corr_matrix, k)
+    columnas = np.array(vista.columnas, dtype=object)
+    return pd.DataFrame({
+        'Variable 1': columnas[i],
+        'Variable 2': columnas[j],
+        'Correlación': corr_matrix[i, j]
+    })